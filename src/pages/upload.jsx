@@ -24,6 +24,9 @@ export default function UploadPage(){
       if(res.ok){
         setMsg("Saved: " + j.saved);
         setTimeout(()=>window.location.reload(), 1200);
+      }else if(res.status === 429 || res.status === 503){
+        const retry = res.headers.get("Retry-After");
+        setMsg("Server is busy converting other uploads. Please try again" + (retry ? ` in about ${retry} seconds.` : " shortly."));
       }else{
         setMsg("Error: " + (j.detail || JSON.stringify(j)));
       }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+tools/atomic_write.py
+
+Write files so readers (the Docusaurus dev server, other upload workers)
+only ever see the old content or the complete new content: the data goes to
+a temp file in the same directory, is flushed to disk, and is then renamed
+over the target with os.replace().
+
+    from atomic_write import atomic_write_text
+    atomic_write_text(md_path, new_text)
+
+    with atomic_writer(md_path) as f:    # streamed output, same guarantee
+        f.write(chunk)
+
+    atomic_write_text_if_changed(md_path, new_text)  # same bytes: no write
+
+    tmp = stage_bytes(md_path, data)      # several files as one unit: stage
+    os.replace(tmp, md_path)              # them all, then rename them all
+"""
+
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def temp_path(path: Path) -> Path:
+    # dot-prefixed and not *.md, so doc watchers / rglob("*.md") ignore it
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def stage_bytes(path: Path, data: bytes) -> Path:
+    """
+    Write `data` to a synced temp file next to `path` and return it: the
+    first half of atomic_write_bytes. os.replace() it over `path` to commit,
+    or unlink it.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(path)
+    try:
+        with tmp.open("wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    tmp = stage_bytes(path, data)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8"):
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def atomic_write_text_if_changed(path: Path, text: str, encoding: str = "utf-8") -> bool:
+    """atomic_write_text unless the file already holds these bytes; True if written."""
+    data = text.encode(encoding)
+    try:
+        if Path(path).read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    atomic_write_bytes(path, data)
+    return True
+
+
+@contextmanager
+def atomic_writer(path: Path, encoding: str = "utf-8"):
+    """Text file handle whose content replaces `path` only if the block succeeds."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(path)
+    try:
+        with tmp.open("w", encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -6,8 +6,10 @@ Usage:
   # process a single file
   python tools/auto_snippet.py docs/modules/module1/teamA/week1.md
 
-  # or process a whole tree
-  python tools/auto_snippet.py docs/modules
+  # or process a whole tree: in parallel (batch_runner.py, default one
+  # process per core), only files changed since the last run (see
+  # doc_manifest.py; --force processes every file)
+  python tools/auto_snippet.py docs/modules [--force] [--jobs N]
 
 What it does:
 
@@ -30,12 +32,17 @@ import sys
 from pathlib import Path
 from typing import List, Tuple
 
+import doc_model
+from atomic_write import atomic_write_text
+from batch_runner import BatchStats, parse_jobs, run_batch
+from doc_manifest import DocManifest, parse_force, tool_version
+from doc_model import Builder, Document, FencedCode, serialize, text_blocks
+from line_classifier import CODE, SNIPPET
+
 CODE_LANG_DEFAULT = "python"   # fallback for code-ish blocks
 ROOT = Path.cwd().resolve()    # ✅ use current working directory as root
-
-
-def is_frontmatter_line(line: str) -> bool:
-    return line.strip() == "---"
+# sources whose changes invalidate the directory mode's manifest
+MANIFEST_FILES = ("auto_snippet.py", "doc_model.py", "line_classifier.py")
 
 
 def detect_language(block_lines: List[str]) -> str:
@@ -62,121 +69,47 @@ def detect_language(block_lines: List[str]) -> str:
 
 def looks_like_code_line(line: str) -> bool:
     """
-    Heuristic: decide if a single line "smells like" code.
+    Heuristic: decide if a single line "smells like" code
+    (see line_classifier.SNIPPET for the rules).
     """
-    s = line.rstrip("\n")
-    if not s.strip():
-        return False
-
-    stripped = s.lstrip()
-
-    # Already a markdown heading or list or quote → not code
-    if stripped.startswith(("#", "-", "*", ">")):
-        return False
-
-    # common code-ish indicators
-    code_keywords = (
-        "from ",
-        "import ",
-        "def ",
-        "class ",
-        "for ",
-        "while ",
-        "if ",
-        "try:",
-        "except ",
-        "@pytest.",
-        "@dataclass",
-    )
-    if any(stripped.startswith(k) for k in code_keywords):
-        return True
-
-    # Lines ending with : are often code
-    if stripped.endswith(":"):
-        return True
-
-    # braces and equals + typical punctuation
-    if any(sym in stripped for sym in (" = ", " =\"", ":{", "};", ");", "{", "}")):
-        return True
-
-    # looks like a function call
-    if "(" in stripped and ")" in stripped and not stripped.startswith("http"):
-        return True
-
-    # looks like command line
-    if stripped.startswith("python ") or stripped.startswith("pytest ") or stripped.startswith("uvicorn "):
-        return True
-
-    # simple assignment style "X = Y"
-    if "=" in stripped and not stripped.lower().startswith("id ="):
-        return True
-
-    return False
-
-
-def group_code_blocks(lines: List[str]) -> List[str]:
+    return SNIPPET.is_code(line.rstrip("\n"))
+
+
+def group_code_blocks(doc: Document) -> int:
     """
-    Walk through lines (after front-matter) and wrap sequences of 'code-like'
-    lines into fenced code blocks.
-    - Does not touch existing ``` fences.
+    Wrap sequences of 'code-like' lines outside fences into fenced code
+    blocks. A sequence stops at a blank line or a markdown structure like
+    a heading, fence or quote. Returns the number of blocks made.
     """
-    out: List[str] = []
-    inside_fence = False
-    i = 0
-    n = len(lines)
-
-    while i < n:
-        line = lines[i]
-
-        # Respect existing fences: copy as-is
-        if line.strip().startswith("```"):
-            out.append(line)
-            # toggle fence state
-            inside_fence = not inside_fence
-            i += 1
+    b = Builder()
+    block: List[str] = []
+    made = 0
+    # one batch classification for every line outside fences
+    labels = iter(SNIPPET.classify([line for node in text_blocks(doc) for line in node.to_lines()]))
+
+    def flush():
+        nonlocal made
+        if block:
+            b.block(FencedCode(f"```{detect_language(block)}", list(block)))
+            block.clear()
+            made += 1
+
+    for node in doc.blocks:
+        if isinstance(node, FencedCode):
+            flush()
+            b.block(node)
             continue
-
-        if inside_fence:
-            out.append(line)
-            i += 1
-            continue
-
-        # We're not inside a fence: try to detect a run of code lines
-        if looks_like_code_line(line):
-            # collect contiguous code-ish lines, but stop if we hit a blank
-            # or a markdown structure like heading/list.
-            block: List[str] = [line.rstrip("\n")]
-            j = i + 1
-            while j < n:
-                ln = lines[j]
-                if not ln.strip():
-                    break
-                if ln.strip().startswith(("#", "```", ">")):
-                    break
-                if not looks_like_code_line(ln):
-                    break
-                block.append(ln.rstrip("\n"))
-                j += 1
-
-            # Only wrap if block has at least 2 lines, or the single
-            # line is VERY code-like
-            if len(block) >= 2 or looks_like_code_line(block[0]):
-                lang = detect_language(block)
-                out.append(f"```{lang}\n")
-                for b in block:
-                    out.append(b + "\n")
-                out.append("```\n")
-                i = j
-                continue
-            else:
-                out.append(line)
-                i += 1
+        for line in node.to_lines():
+            if next(labels) == CODE:
+                block.append(line)
                 continue
-        else:
-            out.append(line)
-            i += 1
+            flush()
+            b.line(line)
+    flush()
 
-    return out
+    if made:
+        doc.blocks = b.blocks
+    return made
 
 
 def process_one(md_path: Path) -> Tuple[bool, str]:
@@ -186,69 +119,64 @@ def process_one(md_path: Path) -> Tuple[bool, str]:
       - auto-wrap code-like line groups into fenced blocks in the body.
     Returns (changed, message).
     """
-    text = md_path.read_text(encoding="utf-8")
-    lines = text.splitlines(keepends=True)
+    doc = doc_model.read(md_path)
 
-    if not lines:
+    if not doc.blocks and doc.front_matter is None:
         return False, "empty file"
 
-    out: List[str] = []
-
-    # 1) Handle front-matter, if any
-    idx = 0
-    n = len(lines)
-
-    if idx < n and is_frontmatter_line(lines[idx]):
-        out.append(lines[idx])
-        idx += 1
-        # copy until second ---
-        while idx < n:
-            out.append(lines[idx])
-            if is_frontmatter_line(lines[idx]):
-                idx += 1
-                break
-            idx += 1
-
-    # now process remainder (body)
-    body_lines = lines[idx:]
-    new_body = group_code_blocks(body_lines)
-    out.extend(new_body)
-
-    new_text = "".join(out)
-    if new_text != text:
-        md_path.write_text(new_text, encoding="utf-8")
+    if group_code_blocks(doc):
+        atomic_write_text(md_path, serialize(doc))
         return True, "updated"
     return False, "no change"
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python tools/auto_snippet.py <file-or-directory>")
+    args, force = parse_force(sys.argv[1:])
+    args, jobs = parse_jobs(args)
+    if not args:
+        print("Usage: python tools/auto_snippet.py <file-or-directory> [--force] [--jobs N]")
         sys.exit(2)
 
-    target = Path(sys.argv[1])
+    target = Path(args[0])
     if not target.exists():
         print("Path not found:", target)
         sys.exit(3)
 
+    manifest = None
     if target.is_file() and target.suffix.lower() == ".md":
         files = [target.resolve()]
     else:
         files = [p.resolve() for p in target.rglob("*.md")]
+        manifest = DocManifest.load(target.resolve(), "auto_snippet", tool_version(MANIFEST_FILES))
 
+    todo = [p for p in sorted(files) if manifest is None or force or not manifest.is_current(p)]
+    stats = BatchStats(jobs)
     changed_count = 0
-    for p in sorted(files):
+    for r in run_batch("auto_snippet:process_one", [(p,) for p in todo], jobs):
+        stats.add(r)
         # show path relative to project root
         try:
-            rel = p.relative_to(ROOT)
+            rel = r.path.relative_to(ROOT)
         except ValueError:
-            rel = p
-        changed, msg = process_one(p)
+            rel = r.path
+        if not r.ok:
+            print(f"[error] {rel}: {r.error}")
+            continue
+        changed, msg = r.value
         print(f"[{msg}] {rel}")
         if changed:
             changed_count += 1
+        if manifest is not None:
+            manifest.record(r.path)
 
-    print(f"\nDone. Files changed: {changed_count}")
+    if manifest is not None:
+        manifest.save()
+        print(f"\nDone. Files changed: {changed_count} ({manifest.summary()})")
+        print(stats.report())
+    else:
+        print(f"\nDone. Files changed: {changed_count}")
+    if stats.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
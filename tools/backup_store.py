@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+tools/backup_store.py
+
+Content-addressed backup store for markdown docs (replaces backups/*.md.bak
+and the *.bak.<timestamp> files fix_mdx.py used to drop next to the docs).
+
+Layout (default root: backups/store):
+
+    objects/ab/abcdef....gz   one gzip blob per unique content (sha256 of the raw bytes)
+    index.json                {"docs/modules/module1/teama/week1.md": [
+                                  {"sha256": ..., "saved_at": 1732200000.0, "bytes": 1234}, ...]}
+
+Saving content that is already stored costs a hash + index lookup; saving the
+same content twice in a row for one doc records a single version.
+
+Retention: a version is kept if it is one of the newest `keep_last` versions
+of its doc OR newer than `max_age_days`. Blobs no index entry points to are
+removed by gc().
+
+Config (env):
+    BACKUP_KEEP_LAST      versions kept per doc regardless of age (default 10)
+    BACKUP_MAX_AGE_DAYS   also keep anything newer than this (default 30)
+
+Usage:
+    python tools/backup_store.py list [doc-key]
+    python tools/backup_store.py restore <doc-key> [sha256-prefix] > week1.md
+    python tools/backup_store.py prune            # retention + gc
+    python tools/backup_store.py import-legacy [--delete]
+        # pull backups/*.md.bak and docs/**/*.bak* into the store
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_write import atomic_write_bytes
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process lock only
+    fcntl = None
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_STORE = ROOT / "backups" / "store"
+
+KEEP_LAST = int(os.environ.get("BACKUP_KEEP_LAST", 10))
+MAX_AGE_DAYS = float(os.environ.get("BACKUP_MAX_AGE_DAYS", 30))
+
+
+class BackupStore:
+    def __init__(
+        self,
+        root: Path = DEFAULT_STORE,
+        keep_last: int = KEEP_LAST,
+        max_age_days: float = MAX_AGE_DAYS,
+    ):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.index_path = self.root / "index.json"
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+        self._thread_lock = threading.Lock()
+        self.objects.mkdir(parents=True, exist_ok=True)
+
+    # ---- locking / index ----
+
+    @contextmanager
+    def _locked(self):
+        """Thread lock + advisory file lock (several uvicorn workers share the store)."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with (self.root / ".lock").open("a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> Dict[str, List[dict]]:
+        if not self.index_path.exists():
+            return {}
+        return json.loads(self.index_path.read_text(encoding="utf-8"))
+
+    def _save_index(self, index: Dict[str, List[dict]]):
+        data = json.dumps(index, indent=1, sort_keys=True).encode("utf-8")
+        atomic_write_bytes(self.index_path, data)
+
+    def _blob_path(self, sha: str) -> Path:
+        return self.objects / sha[:2] / f"{sha}.gz"
+
+    # ---- public API ----
+
+    def save(self, key: str, data: bytes, saved_at: Optional[float] = None) -> str:
+        """Record `data` as the newest version of `key`; returns its sha256."""
+        sha = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(sha)
+        with self._locked():
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_bytes(blob, gzip.compress(data, compresslevel=6, mtime=0))
+
+            index = self._load_index()
+            versions = index.setdefault(key, [])
+            if versions and versions[-1]["sha256"] == sha:
+                return sha  # unchanged since the last backup
+
+            versions.append({
+                "sha256": sha,
+                "saved_at": saved_at if saved_at is not None else time.time(),
+                "bytes": len(data),
+            })
+            versions.sort(key=lambda v: v["saved_at"])
+            pruned = self._apply_retention(index, [key])
+            self._save_index(index)
+            if pruned:
+                self._gc(index)
+        return sha
+
+    def versions(self, key: str) -> List[dict]:
+        with self._locked():
+            return list(self._load_index().get(key, []))
+
+    def keys(self) -> List[str]:
+        with self._locked():
+            return sorted(self._load_index())
+
+    def restore(self, key: str, sha_prefix: Optional[str] = None) -> bytes:
+        """Content of the newest version of `key` (or the one matching sha_prefix)."""
+        versions = self.versions(key)
+        if sha_prefix:
+            versions = [v for v in versions if v["sha256"].startswith(sha_prefix)]
+        if not versions:
+            raise KeyError(f"no backup for {key}" + (f" matching {sha_prefix}" if sha_prefix else ""))
+        return gzip.decompress(self._blob_path(versions[-1]["sha256"]).read_bytes())
+
+    def prune(self) -> Tuple[int, int, int]:
+        """Apply retention to every doc, then gc. Returns (versions, blobs, bytes) removed."""
+        with self._locked():
+            index = self._load_index()
+            pruned = self._apply_retention(index, list(index))
+            self._save_index(index)
+            blobs, freed = self._gc(index)
+        return pruned, blobs, freed
+
+    # ---- internals (caller holds the lock) ----
+
+    def _apply_retention(self, index: Dict[str, List[dict]], keys: List[str]) -> int:
+        cutoff = time.time() - self.max_age_days * 86400
+        removed = 0
+        for key in keys:
+            versions = index.get(key, [])
+            newest = versions[-self.keep_last:] if self.keep_last > 0 else []
+            kept = [v for v in versions if v in newest or v["saved_at"] >= cutoff]
+            removed += len(versions) - len(kept)
+            if kept:
+                index[key] = kept
+            else:
+                index.pop(key, None)
+        return removed
+
+    def _gc(self, index: Dict[str, List[dict]]) -> Tuple[int, int]:
+        live = {v["sha256"] for versions in index.values() for v in versions}
+        removed = freed = 0
+        for blob in self.objects.glob("*/*.gz"):
+            if blob.name[:-3] not in live:
+                freed += blob.stat().st_size
+                blob.unlink()
+                removed += 1
+        return removed, freed
+
+
+# --------------------------------------------------------
+# CLI
+# --------------------------------------------------------
+
+LEGACY_UPLOAD_BAK = re.compile(r"^(week\d+)__[0-9a-f]{32}\.md\.bak$")
+LEGACY_DOC_BAK = re.compile(r"^(.+\.md)\.bak(\.\d{14})?$")
+
+
+def import_legacy(store: BackupStore, delete: bool = False) -> int:
+    """Move old-style .bak copies into the store (oldest first)."""
+    found: List[Tuple[float, str, Path]] = []
+
+    # backups/weekN__<uuid>.md.bak: the team was never recorded
+    for p in (ROOT / "backups").glob("*.md.bak"):
+        m = LEGACY_UPLOAD_BAK.match(p.name)
+        if m:
+            found.append((p.stat().st_mtime, f"backups/legacy/{m.group(1)}.md", p))
+
+    # docs/**/weekN.md.bak and weekN.md.bak.<timestamp> next to the doc
+    for p in (ROOT / "docs").rglob("*.bak*"):
+        m = LEGACY_DOC_BAK.match(p.name)
+        if m:
+            key = (p.parent / m.group(1)).relative_to(ROOT).as_posix()
+            found.append((p.stat().st_mtime, key, p))
+
+    for mtime, key, p in sorted(found):
+        store.save(key, p.read_bytes(), saved_at=mtime)
+        print(f"[IMPORTED] {p.relative_to(ROOT)} -> {key}")
+        if delete:
+            p.unlink()
+    return len(found)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("list", "restore", "prune", "import-legacy"):
+        print(__doc__.split("Usage:", 1)[1])
+        sys.exit(2)
+
+    store = BackupStore()
+    cmd = sys.argv[1]
+
+    if cmd == "list":
+        keys = [sys.argv[2]] if len(sys.argv) > 2 else store.keys()
+        for key in keys:
+            print(key)
+            for v in store.versions(key):
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(v["saved_at"]))
+                print(f"  {v['sha256'][:12]}  {when}  {v['bytes']} bytes")
+    elif cmd == "restore":
+        if len(sys.argv) < 3:
+            print("Usage: python tools/backup_store.py restore <doc-key> [sha256-prefix]")
+            sys.exit(2)
+        sha = sys.argv[3] if len(sys.argv) > 3 else None
+        sys.stdout.buffer.write(store.restore(sys.argv[2], sha))
+    elif cmd == "prune":
+        versions, blobs, freed = store.prune()
+        print(f"Pruned {versions} versions, removed {blobs} blobs ({freed} bytes)")
+    elif cmd == "import-legacy":
+        n = import_legacy(store, delete="--delete" in sys.argv)
+        print("Done. Imported:", n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+tools/batch_runner.py
+
+Runs one file transform over many files in a process pool. The transform
+is named as "module:function" and imported once per worker; files are
+handed out in chunks (several per worker, so slow files even out). Each
+file's return value, printed output, error and whether the file was
+written come back as a FileResult, in input order; a file that raises is
+reported and the run goes on.
+
+    stats = BatchStats(jobs)
+    for r in run_batch("mdx_safe:mdx_safe_file", [(p,) for p in files], jobs):
+        stats.add(r)
+    print(stats.report())
+
+Used by batch_sanitize.py and the directory modes of mdx_safe.py and
+auto_snippet.py.
+
+Config (env):
+    BATCH_JOBS   worker processes (default: cpu count; 1 runs in-process).
+                 The tools also take --jobs N.
+"""
+
+import contextlib
+import importlib
+import io
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Sequence
+
+JOBS = int(os.environ.get("BATCH_JOBS", os.cpu_count() or 1))
+
+# chunks per worker (more, smaller chunks even out slow files)
+CHUNKS_PER_JOB = 4
+
+
+class FileResult(NamedTuple):
+    path: Path
+    ok: bool
+    value: Any         # the transform's return value (None on error)
+    error: str         # "" on success
+    output: str        # what the transform printed
+    bytes_in: int
+    seconds: float
+    written: bool      # the file was replaced (new inode or mtime)
+
+
+def parse_jobs(argv: Sequence[str]):
+    """(args without --jobs N, jobs)."""
+    args = list(argv)
+    jobs = JOBS
+    if "--jobs" in args:
+        i = args.index("--jobs")
+        jobs = int(args[i + 1])
+        del args[i:i + 2]
+    return args, max(1, jobs)
+
+
+def load(func: str) -> Callable:
+    module, name = func.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+_func = None
+
+
+def _init(func: str):
+    global _func
+    _func = load(func)
+
+
+def _stamp(st: os.stat_result):
+    return st.st_ino, st.st_mtime_ns
+
+
+def _run_one(args: tuple) -> FileResult:
+    path = Path(args[0])
+    out = io.StringIO()
+    t0 = time.perf_counter()
+    try:
+        st = path.stat()
+        with contextlib.redirect_stdout(out):
+            value = _func(*args)
+        written = _stamp(path.stat()) != _stamp(st)
+    except Exception as e:
+        return FileResult(path, False, None, f"{type(e).__name__}: {e}", out.getvalue(), 0,
+                          time.perf_counter() - t0, False)
+    return FileResult(path, True, value, "", out.getvalue(), st.st_size, time.perf_counter() - t0, written)
+
+
+def run_batch(func: str, items: Sequence[tuple], jobs: int = JOBS) -> Iterator[FileResult]:
+    """
+    func(*item) for every item (item[0] is the file path), in `jobs`
+    processes; results are yielded in input order as they complete.
+    """
+    items = list(items)
+    # pool workers are daemonic and may not start processes of their own
+    if jobs <= 1 or len(items) < 2 or multiprocessing.current_process().daemon:
+        _init(func)
+        yield from map(_run_one, items)
+        return
+    jobs = min(jobs, len(items))
+    chunksize = max(1, math.ceil(len(items) / (jobs * CHUNKS_PER_JOB)))
+    done = 0
+    try:
+        with ProcessPoolExecutor(jobs, initializer=_init, initargs=(func,)) as ex:
+            for result in ex.map(_run_one, items, chunksize=chunksize):
+                done += 1
+                yield result
+    except BrokenProcessPool as e:
+        # a worker died (killed, out of memory, crashed in C code): the
+        # files not yet reported fail, the ones before them stand
+        for args in items[done:]:
+            yield FileResult(Path(args[0]), False, None, f"BrokenProcessPool: {e}", "", 0, 0.0, False)
+
+
+class BatchStats:
+    """Aggregate counts and throughput of a batch run."""
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.files = 0
+        self.failed = 0
+        self.written = 0
+        self.bytes = 0
+        self.busy = 0.0  # summed per-file seconds
+        self.t0 = time.perf_counter()
+
+    def add(self, result: FileResult):
+        self.files += 1
+        self.failed += not result.ok
+        self.written += result.written
+        self.bytes += result.bytes_in
+        self.busy += result.seconds
+
+    def report(self) -> str:
+        wall = time.perf_counter() - self.t0
+        rate = self.files / wall if wall > 0 else 0.0
+        mb = self.bytes / wall / 1e6 if wall > 0 else 0.0
+        return (
+            f"{self.files} files ({self.written} written, {self.failed} failed) in {wall:.2f}s with {self.jobs} "
+            f"worker(s): {rate:.1f} files/s, {mb:.2f} MB/s, {self.busy:.2f}s busy"
+        )
@@ -1,23 +1,46 @@
 #!/usr/bin/env python3
 # tools/batch_sanitize.py
+# Usage: python tools/batch_sanitize.py [--jobs N]   (from the repo root)
+# Reports, per docs/**/*.md, what sanitize_and_wrap.py would change (lines
+# escaped, fences titled), in parallel (batch_runner.py; default one process
+# per core). Nothing is written: the `sanitize_and_wrap.py <md> <name>` call
+# this used to make never changed a file (see that script's docstring).
 from pathlib import Path
-import subprocess
 import sys
 
-TOOLS = Path(__file__).resolve().parent
+from batch_runner import BatchStats, parse_jobs, run_batch
+
 DOCS = Path.cwd() / "docs"  # run from repo root
 
-sanitizer = TOOLS / "sanitize_and_wrap.py"
-if not sanitizer.exists():
-    print("Sanitizer not found:", sanitizer)
-    sys.exit(1)
 
-md_files = list(DOCS.rglob("*.md"))
-print("Found", len(md_files), "markdown files. Processing...")
+def main():
+    _, jobs = parse_jobs(sys.argv[1:])
+
+    md_files = sorted(DOCS.rglob("*.md"))
+    print("Found", len(md_files), "markdown files. Checking...")
+
+    stats = BatchStats(jobs)
+    pending = 0
+    # the file name is the snippet title label, as in `sanitize_and_wrap.py <md> <name>`
+    for r in run_batch("sanitize_and_wrap:pending_changes", [(md, md.name) for md in md_files], jobs):
+        stats.add(r)
+        if not r.ok:
+            print(f"[ERROR] {r.path}: {r.error}")
+            continue
+        escaped, titled = r.value
+        if escaped or titled:
+            pending += 1
+            print(f"[WOULD] {r.path} -> {escaped} lines escaped, {titled} fences titled")
+
+    print(f"Done: {pending} of {len(md_files)} files would change (none written).")
+    print(stats.report())
+    if stats.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
 
-for md in md_files:
-    print("->", md)
-    subprocess.run(["python", str(sanitizer), str(md), md.name])
     # #!/usr/bin/env python3
 # """
 # tools/batch_sanitize.py
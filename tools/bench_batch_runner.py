@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+tools/bench_batch_runner.py
+
+Make a tree of synthetic markdown files (synthetic_docs.markdown_text)
+MDX-safe the old way, one `python mdx_safe.py <md>` subprocess per file (as
+batch_sanitize.py ran its sanitizer), against batch_runner.run_batch
+in-process with 1, 2, 4, ... workers up to the core count. Every mode starts from the same tree
+and must leave the same bytes; the run stops if one differs.
+
+Usage:
+    python tools/bench_batch_runner.py [files] [lines_per_file] [results.json]
+
+Defaults: 200 files of 400 lines.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from batch_runner import BatchStats, run_batch
+from synthetic_docs import markdown_text
+
+TOOLS = Path(__file__).resolve().parent
+FUNC = "mdx_safe:mdx_safe_file"
+
+
+def make_tree(root: Path, files: int, lines: int):
+    for i in range(files):
+        p = root / f"module{i % 5}" / f"week{i}.md"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(markdown_text(lines, 0.3, seed=i), encoding="utf-8")
+
+
+def snapshot(root: Path) -> dict:
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*.md"))}
+
+
+def run_subprocess(files):
+    for md in files:
+        subprocess.run([sys.executable, str(TOOLS / "mdx_safe.py"), str(md)],
+                       check=True, stdout=subprocess.DEVNULL)
+
+
+def run_pool(files, jobs: int):
+    stats = BatchStats(jobs)
+    for r in run_batch(FUNC, [(md,) for md in files], jobs):
+        stats.add(r)
+        if not r.ok:
+            raise SystemExit(f"{r.path}: {r.error}")
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    json_out = Path(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    cores = os.cpu_count() or 1
+    job_counts = sorted({1, cores} | {j for j in (2, 4, 8, 16, 32) if j < cores})
+    modes = {"subprocess": run_subprocess}
+    for jobs in job_counts:
+        modes[f"pool x{jobs}"] = lambda fs, jobs=jobs: run_pool(fs, jobs)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source"
+        make_tree(source, files, lines)
+        size = sum(p.stat().st_size for p in source.rglob("*.md"))
+        print(f"{files} files x {lines} lines ({size / 1e6:.1f} MB), {cores} core(s)")
+        print(f"{'mode':>12} {'seconds':>9} {'files/s':>9} {'MB/s':>7}")
+
+        outputs = {}
+        for mode, fn in modes.items():
+            work = Path(tmp) / "work"
+            shutil.rmtree(work, ignore_errors=True)
+            shutil.copytree(source, work)
+            md_files = sorted(work.rglob("*.md"))
+            t0 = time.perf_counter()
+            fn(md_files)
+            dt = time.perf_counter() - t0
+            outputs[mode] = snapshot(work)
+            results.append({"mode": mode, "files": files, "seconds": round(dt, 3),
+                            "files_per_second": round(files / dt, 1), "mb_per_second": round(size / dt / 1e6, 2)})
+            print(f"{mode:>12} {dt:>9.3f} {files / dt:>9.1f} {size / dt / 1e6:>7.2f}")
+
+        first = next(iter(outputs.values()))
+        for mode, out in outputs.items():
+            if out != first:
+                raise SystemExit(f"{mode}: output differs from subprocess")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+tools/bench_doc_model.py
+
+Post-conversion passes on synthetic converter-style markdown
+(synthetic_docs.markdown_text), in-process:
+
+    chain    mdx_safe_file (what the upload service used to run; its
+             sanitize_and_wrap.py call never changed the file)
+    single   postprocess_file: one read, one parse, one atomic write
+    legacy   like chain, with the mdx_safe.py found in legacy_dir
+             (optional). Export a version to compare with, e.g.
+                 mkdir /tmp/old && git show <rev>:tools/mdx_safe.py > /tmp/old/mdx_safe.py
+
+Every mode must produce the same bytes; the run stops if one differs.
+
+Usage:
+    python tools/bench_doc_model.py [lines,...] [results.json] [legacy_dir]
+
+Defaults: 1000,10000,100000 lines, best of 3 runs each.
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import mdx_safe
+import postprocess
+from synthetic_docs import markdown_text
+
+LABEL = "bench week1"
+REPEAT = 3
+
+
+def load_legacy(legacy_dir: Path):
+    spec = importlib.util.spec_from_file_location("legacy_mdx_safe", legacy_dir / "mdx_safe.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def timed(fn, md: Path, text: str):
+    """(best seconds, output) of fn over a fresh copy of text."""
+    best = None
+    for _ in range(REPEAT):
+        md.write_text(text, encoding="utf-8")
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(md)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, md.read_text(encoding="utf-8")
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 10000, 100000]
+    json_out = Path(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] else None
+
+    modes = {
+        "chain": mdx_safe.mdx_safe_file,
+        "single": lambda md: postprocess.postprocess_file(md, LABEL),
+    }
+    if len(sys.argv) > 3:
+        modes["legacy"] = load_legacy(Path(sys.argv[3])).mdx_safe_file
+
+    results = []
+    print(f"{'lines':>7} {'mode':>7} {'seconds':>9} {'lines/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        md = Path(tmp) / "week1.md"
+        for lines in sizes:
+            text = markdown_text(lines, 0.3, seed=lines)
+            n = text.count("\n")
+            outputs = {}
+            for mode, fn in modes.items():
+                dt, outputs[mode] = timed(fn, md, text)
+                results.append({"lines": n, "mode": mode, "seconds": round(dt, 4),
+                                "lines_per_second": round(n / dt)})
+                print(f"{n:>7} {mode:>7} {dt:>9.3f} {n / dt:>10.0f}")
+            if len(set(outputs.values())) != 1:
+                raise SystemExit(f"outputs differ at {lines} lines")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+tools/bench_docx_fastpath.py
+
+Time and peak RSS of convert_docx_to_md.py with the streaming fast path
+(docx_fastpath.py) versus mammoth only (--no-fast-path), on synthetic DOCX
+files of growing size. Each run is a fresh process, so the peak RSS (from
+os.wait4) belongs to that conversion alone.
+
+Usage:
+    python tools/bench_docx_fastpath.py [paragraphs,...] [results.json]
+
+Defaults: 200,2000,10000 paragraphs. POSIX only (needs os.wait4).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_docs import docx_bytes
+
+TOOLS = Path(__file__).resolve().parent
+
+MODES = {
+    "mammoth": ["--no-fast-path"],
+    "fast": [],
+}
+
+
+def run(docx: Path, out: Path, flags):
+    """(seconds, peak RSS bytes) of one conversion in a child process."""
+    cmd = [sys.executable, str(TOOLS / "convert_docx_to_md.py"), str(docx), str(out), *flags]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    dt = time.perf_counter() - t0
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise SystemExit(f"conversion failed: {' '.join(cmd)}")
+    peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return dt, peak
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [200, 2000, 10000]
+    json_out = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    results = []
+    print(f"{'paras':>6} {'mode':>8} {'seconds':>9} {'paras/s':>9} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for paragraphs in sizes:
+            docx = work / f"doc{paragraphs}.docx"
+            docx.write_bytes(docx_bytes(paragraphs, 0.3, seed=paragraphs))
+            for mode, flags in MODES.items():
+                dt, peak = run(docx, work / f"doc{paragraphs}_{mode}.md", flags)
+                results.append({"paragraphs": paragraphs, "mode": mode, "seconds": round(dt, 3),
+                                "paragraphs_per_second": round(paragraphs / dt, 1),
+                                "docx_bytes": docx.stat().st_size, "peak_rss_bytes": peak})
+                print(f"{paragraphs:>6} {mode:>8} {dt:>9.2f} {paragraphs / dt:>9.0f} {peak / 2**20:>9.1f}")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+tools/bench_docx_images.py
+
+DOCX conversion with images inlined as base64 (mammoth's default) versus
+stored as content-addressed files (docx_images.py), on synthetic documents
+with screenshots. Reports markdown size, time for conversion and for the
+later mdx_safe + sanitize passes over the markdown, and the bytes a reader
+downloads for the page.
+
+Usage:
+    python tools/bench_docx_images.py [images,...] [results.json]
+
+Defaults: 0,10,40 images per document (4 distinct screenshots each).
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_docs import docx_bytes
+
+TOOLS = Path(__file__).resolve().parent
+
+
+def run(script: str, *args, env=None) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, str(TOOLS / script), *map(str, args)], check=True,
+                   stdout=subprocess.DEVNULL, env=env)
+    return time.perf_counter() - t0
+
+
+def main():
+    image_counts = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [0, 10, 40]
+    json_out = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    results = []
+    print(f"{'images':>6} {'mode':>7} {'md bytes':>10} {'convert s':>9} {'passes s':>9} {'page bytes':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for images in image_counts:
+            docx = work / f"doc{images}.docx"
+            docx.write_bytes(docx_bytes(200, 0.3, seed=images, images=images, distinct_images=4))
+            for mode in ("inline", "files"):
+                image_dir = work / f"img{images}_{mode}"
+                env = dict(os.environ, DOCX_IMAGE_DIR=str(image_dir) if mode == "files" else "")
+                md = work / f"doc{images}_{mode}.md"
+                convert_s = run("convert_docx_to_md.py", docx, md, env=env)
+                passes_s = run("mdx_safe.py", md) + run("sanitize_and_wrap.py", md, "Bench")
+                md_bytes = md.stat().st_size
+                image_bytes = sum(p.stat().st_size for p in image_dir.iterdir()) if image_dir.is_dir() else 0
+                results.append({"images": images, "mode": mode, "markdown_bytes": md_bytes,
+                                "convert_seconds": round(convert_s, 3), "passes_seconds": round(passes_s, 3),
+                                "page_bytes": md_bytes + image_bytes})
+                print(f"{images:>6} {mode:>7} {md_bytes:>10} {convert_s:>9.2f} {passes_s:>9.2f} "
+                      f"{md_bytes + image_bytes:>11}")
+                shutil.rmtree(image_dir, ignore_errors=True)
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+tools/bench_line_classifier.py
+
+Throughput of the "is this line code?" heuristics, in lines/s, over the
+repo's docs/**/*.md plus synthetic converter-style markdown
+(synthetic_docs.markdown_text):
+
+    per-line   the tools' own functions, one call per line
+               (mdx_safe.is_codey_line, auto_snippet.looks_like_code_line,
+               convert_pdf_to_md.is_code_line, sanitize_existing_md.INDENT_RE)
+    legacy     the same functions from the copies in legacy_dir (optional).
+               Export a version to compare with, e.g.
+                   mkdir /tmp/old && for f in mdx_safe auto_snippet convert_pdf_to_md; do
+                     git show <rev>:tools/$f.py > /tmp/old/$f.py; done
+    batch      line_classifier: the whole corpus in one classify() call
+
+Every mode must agree on every line; the run stops if one differs.
+
+Usage:
+    python tools/bench_line_classifier.py [synthetic_lines] [results.json] [legacy_dir]
+
+Defaults: 100000 synthetic lines, best of 3 runs each.
+"""
+
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+import auto_snippet
+import convert_pdf_to_md
+import mdx_safe
+import sanitize_existing_md
+from line_classifier import CODE, INDENT, MDX, PDF, SNIPPET
+from synthetic_docs import markdown_text
+
+DOCS_DIR = Path(__file__).resolve().parent.parent / "docs"
+REPEAT = 3
+
+# profile -> (module, name of its per-line function)
+PER_LINE = {
+    "mdx": (mdx_safe, "is_codey_line"),
+    "snippet": (auto_snippet, "looks_like_code_line"),
+    "pdf": (convert_pdf_to_md, "is_code_line"),
+}
+
+
+def indent_match(line: str) -> bool:
+    return sanitize_existing_md.INDENT_RE.match(line) is not None
+
+
+def load_legacy(legacy_dir: Path) -> dict:
+    funcs = {}
+    for profile, (mod, name) in PER_LINE.items():
+        path = legacy_dir / f"{mod.__name__}.py"
+        if not path.exists():
+            continue
+        spec = importlib.util.spec_from_file_location(f"legacy_{mod.__name__}", path)
+        legacy = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(legacy)
+        funcs[profile] = getattr(legacy, name)
+    return funcs
+
+
+def corpus(synthetic_lines: int) -> list:
+    lines = []
+    for md in sorted(DOCS_DIR.rglob("*.md")):
+        lines.extend(md.read_text(encoding="utf-8", errors="ignore").splitlines())
+    lines.extend(markdown_text(synthetic_lines, 0.3, seed=synthetic_lines).splitlines())
+    return lines
+
+
+def timed(fn):
+    """(best seconds, code flags) of fn()."""
+    best = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        flags = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, flags
+
+
+def main():
+    synthetic_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    json_out = Path(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] else None
+    legacy = load_legacy(Path(sys.argv[3])) if len(sys.argv) > 3 else {}
+
+    lines = corpus(synthetic_lines)
+    n = len(lines)
+    print(f"{n} lines ({DOCS_DIR} + {synthetic_lines} synthetic)")
+
+    profiles = [
+        ("mdx", MDX, getattr(mdx_safe, PER_LINE["mdx"][1])),
+        ("snippet", SNIPPET, getattr(auto_snippet, PER_LINE["snippet"][1])),
+        ("pdf", PDF, getattr(convert_pdf_to_md, PER_LINE["pdf"][1])),
+        ("indent", INDENT, indent_match),
+    ]
+
+    results = []
+    print(f"{'profile':>8} {'mode':>9} {'seconds':>9} {'lines/s':>11} {'code':>7}")
+    for profile, classifier, per_line in profiles:
+        modes = {"per-line": lambda f=per_line: [bool(f(line)) for line in lines]}
+        if profile in legacy:
+            modes["legacy"] = lambda f=legacy[profile]: [bool(f(line)) for line in lines]
+        modes["batch"] = lambda c=classifier: [label == CODE for label in c.classify(lines)]
+
+        flags = {}
+        for mode, fn in modes.items():
+            dt, flags[mode] = timed(fn)
+            code = sum(flags[mode])
+            results.append({"profile": profile, "mode": mode, "lines": n, "code_lines": code,
+                            "seconds": round(dt, 4), "lines_per_second": round(n / dt)})
+            print(f"{profile:>8} {mode:>9} {dt:>9.3f} {n / dt:>11.0f} {code:>7}")
+        first = next(iter(flags.values()))
+        for mode, got in flags.items():
+            if got != first:
+                bad = next(i for i, (x, y) in enumerate(zip(first, got)) if x != y)
+                raise SystemExit(f"{profile}: {mode} differs at line {bad}: {lines[bad]!r}")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
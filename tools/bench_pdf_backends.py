@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+tools/bench_pdf_backends.py
+
+Throughput of each available PDF text-extraction backend (pdf_backends.py)
+on synthetic documents, full conversion included. Each backend's lines are
+compared with the layout backend's, and the backend "auto" picks is shown
+with the time its sampling cost. The page cache is off throughout.
+
+Usage:
+    python tools/bench_pdf_backends.py [pages,...] [results.json]
+
+Defaults: pages 20,80.
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from convert_pdf_to_md import convert_pdf_to_md
+from pdf_backends import available_backends, choose_backend, iter_page_texts, line_structure
+from synthetic_docs import pdf_bytes
+
+
+def main():
+    page_counts = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [20, 80]
+    json_out = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    results = []
+    print(f"{'pages':>6} {'backend':>9} {'seconds':>9} {'pages/s':>9} {'speedup':>8}  lines")
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for pages in page_counts:
+            pdf = work / f"doc{pages}.pdf"
+            pdf.write_bytes(pdf_bytes(pages, 0.3, seed=pages))
+            reference = line_structure("".join(iter_page_texts(pdf)))
+            baseline_s = None
+            for backend in available_backends():
+                out = work / f"doc{pages}_{backend}.md"
+                t0 = time.perf_counter()
+                convert_pdf_to_md(pdf, out, page_cache=False, backend=backend)
+                dt = time.perf_counter() - t0
+                baseline_s = baseline_s or dt
+                same = line_structure("".join(iter_page_texts(pdf, backend=backend))) == reference
+                results.append({"pages": pages, "backend": backend, "seconds": round(dt, 3),
+                                "pages_per_second": round(pages / dt, 1), "same_lines": same})
+                print(
+                    f"{pages:>6} {backend:>9} {dt:>9.2f} {pages / dt:>9.1f} "
+                    f"{baseline_s / dt:>7.2f}x  {'same' if same else 'DIFFER'}"
+                )
+
+            t0 = time.perf_counter()
+            picked, _ = choose_backend(pdf)
+            sample_s = time.perf_counter() - t0
+            results.append({"pages": pages, "backend": "auto", "picked": picked,
+                            "sample_seconds": round(sample_s, 3)})
+            print(f"{pages:>6} {'auto':>9} -> {picked} (sampling took {sample_s:.2f}s)")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
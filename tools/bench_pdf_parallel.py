@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+tools/bench_pdf_parallel.py
+
+Speedup of page-parallel PDF extraction (convert_pdf_to_md --jobs) as page
+count and process count grow. Every parallel result is checked against the
+single-process output.
+
+Usage:
+    python tools/bench_pdf_parallel.py [pages,...] [jobs,...]
+
+Defaults: pages 20,80,160; jobs 1,2,4 and the CPU count.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from convert_pdf_to_md import convert_pdf_to_md
+from synthetic_docs import pdf_bytes
+
+
+def parse_list(arg: str):
+    return [int(x) for x in arg.split(",") if x]
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    page_counts = parse_list(sys.argv[1]) if len(sys.argv) > 1 else [20, 80, 160]
+    job_counts = parse_list(sys.argv[2]) if len(sys.argv) > 2 else sorted({1, 2, 4, cpus})
+
+    print(f"cpus={cpus}")
+    print(f"{'pages':>6} {'jobs':>5} {'seconds':>9} {'pages/s':>9} {'speedup':>8}  same")
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for pages in page_counts:
+            pdf = work / f"doc{pages}.pdf"
+            pdf.write_bytes(pdf_bytes(pages, 0.3, seed=pages))
+            baseline_md = None
+            baseline_s = None
+            for jobs in job_counts:
+                out = work / f"doc{pages}_j{jobs}.md"
+                t0 = time.perf_counter()
+                convert_pdf_to_md(pdf, out, jobs=jobs, page_cache=False)
+                dt = time.perf_counter() - t0
+                md = out.read_text(encoding="utf-8")
+                if baseline_md is None:
+                    baseline_md, baseline_s = md, dt
+                print(
+                    f"{pages:>6} {jobs:>5} {dt:>9.2f} {pages / dt:>9.1f} "
+                    f"{baseline_s / dt:>7.2f}x  {'yes' if md == baseline_md else 'NO'}"
+                )
+
+
+if __name__ == "__main__":
+    main()
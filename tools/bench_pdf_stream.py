@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+tools/bench_pdf_stream.py
+
+Peak RSS and time of convert_pdf_to_md.py in whole-document mode versus
+--stream, as page count grows. Each run is a fresh process, so the peak RSS
+(from os.wait4) belongs to that conversion alone. Outputs are compared.
+
+Usage:
+    python tools/bench_pdf_stream.py [pages,...] [results.json]
+
+Defaults: pages 20,100,300. POSIX only (needs os.wait4).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_docs import pdf_bytes
+
+TOOLS = Path(__file__).resolve().parent
+
+MODES = {
+    "whole": ["--jobs", "1", "--no-page-cache"],
+    "stream": ["--stream", "--no-page-cache"],
+}
+
+
+def run(pdf: Path, out: Path, flags):
+    """(seconds, peak RSS bytes) of one conversion in a child process."""
+    cmd = [sys.executable, str(TOOLS / "convert_pdf_to_md.py"), str(pdf), str(out), *flags]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    dt = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise SystemExit(f"conversion failed: {' '.join(cmd)}")
+    peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return dt, peak
+
+
+def main():
+    page_counts = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [20, 100, 300]
+    json_out = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    results = []
+    print(f"{'pages':>6} {'mode':>7} {'seconds':>9} {'peak MiB':>9}  same")
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for pages in page_counts:
+            pdf = work / f"doc{pages}.pdf"
+            pdf.write_bytes(pdf_bytes(pages, 0.3, seed=pages))
+            outputs = {}
+            for mode, flags in MODES.items():
+                out = work / f"doc{pages}_{mode}.md"
+                dt, peak = run(pdf, out, flags)
+                outputs[mode] = out.read_bytes()
+                same = outputs[mode] == outputs["whole"]
+                results.append({"pages": pages, "mode": mode, "seconds": round(dt, 3),
+                                "peak_rss_bytes": peak, "same_output": same})
+                print(f"{pages:>6} {mode:>7} {dt:>9.2f} {peak / 2**20:>9.1f}  {'yes' if same else 'NO'}")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print("Wrote", json_out)
+
+
+if __name__ == "__main__":
+    main()
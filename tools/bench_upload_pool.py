@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+tools/bench_upload_pool.py
+
+Compare the upload pipeline (convert -> postprocess) run as one
+`python` subprocess per stage (old path) against the warm ConverterPool.
+
+Usage:
+    python tools/bench_upload_pool.py [uploads] [concurrency] [pool_size]
+
+Defaults: 24 uploads, concurrency 4, pool size 4. Half the uploads are
+synthetic DOCX, half synthetic PDF (see tools/synthetic_docs.py).
+"""
+
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+
+from synthetic_docs import docx_bytes, pdf_bytes  # noqa: E402
+from upload_service.worker_pool import ConverterPool  # noqa: E402
+
+
+def make_inputs(work: Path, count: int):
+    inputs = []
+    for i in range(count):
+        if i % 2 == 0:
+            p = work / f"in{i}.docx"
+            p.write_bytes(docx_bytes(60, 0.3, seed=i))
+        else:
+            p = work / f"in{i}.pdf"
+            p.write_bytes(pdf_bytes(4, 0.3, seed=i))
+        inputs.append(p)
+    return inputs
+
+
+def run_subprocess(in_path: Path, out_md: Path):
+    script = "convert_docx_to_md.py" if in_path.suffix == ".docx" else "convert_pdf_to_md.py"
+    quiet = dict(check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, str(TOOLS / script), str(in_path), str(out_md)], **quiet)
+    subprocess.run([sys.executable, str(TOOLS / "postprocess.py"), str(out_md), "bench"], **quiet)
+
+
+def run_pool(pool: ConverterPool, in_path: Path, out_md: Path):
+    pool.convert(in_path, out_md)
+    pool.postprocess(out_md, "bench")
+
+
+def bench(label: str, fn, inputs, concurrency: int):
+    latencies = []
+
+    def one(item):
+        i, in_path = item
+        t0 = time.perf_counter()
+        fn(in_path, in_path.with_name(f"{label}_{i}.md"))
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        list(ex.map(one, enumerate(inputs)))
+    wall = time.perf_counter() - t0
+
+    lat_ms = sorted(x * 1000 for x in latencies)
+    p95 = lat_ms[min(len(lat_ms) - 1, int(len(lat_ms) * 0.95))]
+    print(
+        f"{label:<11} uploads={len(inputs):<4} wall={wall:7.2f}s  "
+        f"uploads/sec={len(inputs) / wall:7.2f}  "
+        f"p50={statistics.median(lat_ms):8.1f}ms  p95={p95:8.1f}ms"
+    )
+    return len(inputs) / wall
+
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    pool_size = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        inputs = make_inputs(work, uploads)
+
+        sub_rate = bench("subprocess", run_subprocess, inputs, concurrency)
+
+        pool = ConverterPool(size=pool_size)
+        pool.start()
+        try:
+            # warm-up: first job per worker pays the imports once
+            for p in inputs[:pool_size]:
+                run_pool(pool, p, work / "warmup.md")
+            pool_rate = bench("pool", lambda i, o: run_pool(pool, i, o), inputs, concurrency)
+        finally:
+            pool.shutdown()
+
+    print(f"speedup: {pool_rate / sub_rate:.1f}x uploads/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+tools/check_admission.py
+
+Scenario check for upload_service/admission.py (AdmissionControl), with
+requests simulated as tasks that hold their slots for a while:
+
+    fifo           waiters are admitted in arrival order, never more than
+                   the limit at once
+    queue full     beyond max_queue a request gets 429 with Retry-After
+    queue timeout  a request queued longer than queue_timeout gets 503 with
+                   Retry-After and leaves the queue
+    cancelled      a waiter cancelled in the queue (client gone) leaves it
+                   and the ones behind are still served
+    handoff        a waiter cancelled just after its slot was handed over
+                   (it may still run: wait_for can swallow that cancel) does
+                   not keep the slot, and the next request gets it
+    error          a request that fails while holding its slot releases it,
+                   and the one queued behind it is admitted
+    retry after    Retry-After is service time x rounds of `limit` requests
+                   ahead (running + queued + this one)
+    weighted       a batch takes up to the whole limit, waits in the same
+                   queue, and a single request behind it does not overtake
+    head timeout   when a big request at the head times out, the smaller
+                   ones behind it are let in
+    service time   recorded requests move the estimate, record=False ones
+                   do not
+
+Usage:
+    python tools/check_admission.py
+
+Exits 1 if a scenario fails.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi import HTTPException
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+
+from upload_service.admission import AdmissionControl  # noqa: E402
+
+
+class Requests:
+    """Simulated requests against one AdmissionControl: admission order, peak load, errors."""
+
+    def __init__(self, adm: AdmissionControl):
+        self.adm = adm
+        self.admitted = []
+        self.errors = {}
+        self.peak = 0
+
+    async def run(self, name: str, hold: float, slots: int = 1, record: bool = True, fail: bool = False):
+        try:
+            async with self.adm.slot(slots, record) as got:
+                self.admitted.append((name, got))
+                self.peak = max(self.peak, self.adm.running)
+                await asyncio.sleep(hold)
+                if fail:
+                    raise RuntimeError("conversion failed")
+        except HTTPException as e:
+            self.errors[name] = (e.status_code, (e.headers or {}).get("Retry-After"))
+        except RuntimeError as e:
+            self.errors[name] = str(e)
+
+    async def start(self, name: str, hold: float, slots: int = 1, record: bool = True,
+                    fail: bool = False) -> asyncio.Task:
+        task = asyncio.create_task(self.run(name, hold, slots, record, fail))
+        await asyncio.sleep(0.01)  # let it reach the queue: arrival order is start order
+        return task
+
+
+async def scenarios():
+    adm = AdmissionControl(limit=2, max_queue=10, queue_timeout=5)
+    r = Requests(adm)
+    tasks = [await r.start(f"r{i}", 0.05) for i in range(6)]
+    await asyncio.gather(*tasks)
+    names = [n for n, _ in r.admitted]
+    yield "fifo", names == [f"r{i}" for i in range(6)] and r.peak == 2 and adm.running == 0, \
+        f"order {' '.join(names)}, peak {r.peak}"
+
+    adm = AdmissionControl(limit=1, max_queue=2, queue_timeout=5)
+    r = Requests(adm)
+    tasks = [await r.start(f"r{i}", 0.1) for i in range(4)]
+    await asyncio.gather(*tasks)
+    yield "queue full", list(r.errors) == ["r3"] and r.errors["r3"][0] == 429 and r.errors["r3"][1] \
+        and adm.rejected["queue_full"] == 1, f"errors {r.errors}"
+
+    adm = AdmissionControl(limit=1, max_queue=5, queue_timeout=0.1)
+    r = Requests(adm)
+    tasks = [await r.start("long", 0.3), await r.start("waits", 0)]
+    await asyncio.gather(*tasks)
+    yield "queue timeout", r.errors.get("waits", (None,))[0] == 503 and r.errors["waits"][1] \
+        and adm.queued == 0 and adm.running == 0, f"errors {r.errors}, queued {adm.queued}"
+
+    adm = AdmissionControl(limit=1, max_queue=5, queue_timeout=5)
+    r = Requests(adm)
+    holder = await r.start("holder", 0.1)
+    gone = await r.start("gone", 0)
+    behind = await r.start("behind", 0)
+    gone.cancel()
+    await asyncio.gather(holder, behind, gone, return_exceptions=True)
+    names = [n for n, _ in r.admitted]
+    yield "cancelled", names == ["holder", "behind"] and adm.running == 0 and adm.queued == 0, \
+        f"admitted {' '.join(names)}, running {adm.running}"
+
+    adm = AdmissionControl(limit=1, max_queue=5, queue_timeout=5)
+    r = Requests(adm)
+    held = adm.slot()
+    await held.__aenter__()
+    waiter = await r.start("waiter", 0)
+    await held.__aexit__(None, None, None)  # hands the slot to the waiter...
+    waiter.cancel()  # ...which is cancelled before it runs again
+    await asyncio.gather(waiter, return_exceptions=True)
+    ran = "ran" if r.admitted else "cancelled"
+    await asyncio.wait_for(await r.start("next", 0), 1)
+    yield "handoff", adm.running == 0 and adm.queued == 0 and r.admitted[-1][0] == "next", \
+        f"waiter {ran}, running {adm.running}, queued {adm.queued}"
+
+    adm = AdmissionControl(limit=1, max_queue=5, queue_timeout=5)
+    r = Requests(adm)
+    tasks = [await r.start("fails", 0.05, fail=True), await r.start("behind", 0)]
+    await asyncio.gather(*tasks)
+    names = [n for n, _ in r.admitted]
+    yield "error", names == ["fails", "behind"] and r.errors == {"fails": "conversion failed"} \
+        and adm.running == 0 and adm.queued == 0, f"admitted {' '.join(names)}, errors {r.errors}"
+
+    adm = AdmissionControl(limit=2, max_queue=5, queue_timeout=5, initial_service_time=3.0)
+    r = Requests(adm)
+    tasks = [await r.start(f"r{i}", 0.2, record=False) for i in range(4)]
+    retry = adm.retry_after()  # 2 running + 2 queued + this one: 3 rounds of 2
+    await asyncio.gather(*tasks)
+    yield "retry after", retry == 9 and adm.retry_after() == 3, \
+        f"{retry}s with 4 ahead, {adm.retry_after()}s when idle"
+
+    adm = AdmissionControl(limit=3, max_queue=5, queue_timeout=5)
+    r = Requests(adm)
+    tasks = [await r.start("single", 0.1), await r.start("batch", 0.1, 64, False), await r.start("after", 0)]
+    await asyncio.gather(*tasks)
+    yield "weighted", r.admitted == [("single", 1), ("batch", 3), ("after", 1)] and r.peak == 3, \
+        f"admitted {r.admitted}, peak {r.peak}"
+
+    adm = AdmissionControl(limit=2, max_queue=5, queue_timeout=0.1)
+    r = Requests(adm)
+    holder = await r.start("holder", 0.5)
+    await r.start("big", 0, 2)
+    small = await r.start("small", 0)
+    await asyncio.wait_for(small, 0.4)  # admitted before the holder is done
+    yield "head timeout", r.errors.get("big", (None,))[0] == 503 and ("small", 1) in r.admitted \
+        and not holder.done(), f"errors {r.errors}, admitted {r.admitted}"
+    await holder
+
+    adm = AdmissionControl(limit=1, max_queue=5, queue_timeout=5, initial_service_time=5.0)
+    r = Requests(adm)
+    await (await r.start("unrecorded", 0.05, record=False))
+    unrecorded = adm.service_time
+    await (await r.start("recorded", 0.05))
+    yield "service time", unrecorded == 5.0 and adm.service_time < 5.0, \
+        f"{unrecorded:g}s after record=False, {adm.service_time:.3f}s after a recorded one"
+
+
+async def run() -> bool:
+    failed = False
+    print(f"{'scenario':>14}  result")
+    async for name, ok, detail in scenarios():
+        failed |= not ok
+        print(f"{name:>14}  {'ok' if ok else 'FAILED'}  ({detail})")
+    return not failed
+
+
+def main():
+    if not asyncio.run(run()):
+        sys.exit(1)
+    print("Admission control behaves.")
+
+
+if __name__ == "__main__":
+    main()
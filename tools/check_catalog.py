@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+tools/check_catalog.py
+
+Scenario check for upload_service/catalog.py (DocCatalog) on a temp
+docs/modules tree of scaffold stubs, /delete/ stubs and uploaded docs. After
+every change the catalog must equal what a fresh build() of the tree gives.
+
+    build          every weekN.md found and classified (stub / deleted /
+                   uploaded); other files and directories ignored
+    update         a written doc recorded from the text passed in
+    reread         a doc recorded by reading it back (as /delete/ does)
+    update_many    a batch of writes recorded at once
+    other files    a path that is not weekN.md is ignored
+    threads        updates from worker threads while listing
+    filters        module, team (any case) and state filters
+    pages          pages of the listing add up to the whole, in module /
+                   team / week order (week10 after week9)
+    team_status    per-state counts and weeks of one team
+    hashes         every entry's size and sha256 are those of the file on
+                   disk, also for docs recorded from the text passed in
+    rebuild        files removed or added behind the catalog's back (a git
+                   pull) show up after build(), and only then
+
+Usage:
+    python tools/check_catalog.py [teams]
+
+Defaults: 3 teams. Exits 1 if a scenario fails.
+"""
+
+import hashlib
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+
+from synthetic_docs import markdown_text  # noqa: E402
+from upload_service.catalog import STATES, DocCatalog  # noqa: E402
+
+# bodies as tools/scaffold_docs.py and the /delete/ handler write them
+STUB = "---\nid: week{w}\n---\n\n_No document uploaded yet._\n"
+DELETED = "---\nid: week{w}\n---\n\n_No document uploaded yet. Previous upload was deleted._\n"
+MODULE_WEEKS = {"module1": range(1, 5), "module3": range(9, 13)}
+
+
+def write(path: Path, text: str) -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return text
+
+
+def file_state(path: Path) -> tuple:
+    data = path.read_bytes()
+    return len(data), hashlib.sha256(data).hexdigest()
+
+
+def same_as_rescan(catalog: DocCatalog, docs: Path, base: Path) -> bool:
+    fresh = DocCatalog(docs, base)
+    fresh.build()
+    return catalog.list(limit=10**6) == fresh.list(limit=10**6)
+
+
+def scenarios(base: Path, teams: int):
+    docs = base / "docs" / "modules"
+    names = [f"Team{chr(ord('A') + i)}" for i in range(teams)]
+    for module, weeks in MODULE_WEEKS.items():
+        for team in names:
+            for w in weeks:
+                write(docs / module / team / f"week{w}.md", STUB.format(w=w))
+    write(docs / "module1" / names[0] / "notes.md", "not a week")
+    write(docs / "module1" / names[0] / "week1.md.bak", "not a week either")
+    write(docs / "module1" / "README.md", "not a team")
+    write(docs / "module1" / names[0] / "drafts" / "week2.md", "too deep")
+
+    catalog = DocCatalog(docs, base)
+    found = catalog.build()
+    expected = teams * sum(len(w) for w in MODULE_WEEKS.values())
+    _, listed = catalog.list(limit=10**6)
+    yield "build", found == expected and all(d.state == "stub" for d in listed), f"{found} docs"
+
+    path = docs / "module1" / names[0] / "week2.md"
+    text = write(path, markdown_text(40, 0.3, seed=1))
+    catalog.update(path, text)
+    entry = catalog.list("module1", names[0], "uploaded")[1]
+    yield "update", same_as_rescan(catalog, docs, base) and [d.week for d in entry] == [2], \
+        f"{entry[0].path if entry else 'not listed'}"
+
+    path = docs / "module1" / names[0] / "week3.md"
+    write(path, DELETED.format(w=3))
+    catalog.update(path)
+    yield "reread", same_as_rescan(catalog, docs, base) and catalog.list(state="deleted")[0] == 1, \
+        f"{catalog.list(state='deleted')[0]} deleted"
+
+    writes = []
+    for i, w in enumerate((9, 10, 11)):
+        path = docs / "module3" / names[-1] / f"week{w}.md"
+        writes.append((path, write(path, markdown_text(20, 0.3, seed=10 + i))))
+    path = docs / "module3" / names[-1] / "week13.md"  # new week, not scaffolded
+    writes.append((path, write(path, markdown_text(20, 0.3, seed=20))))
+    catalog.update_many(writes)
+    yield "update_many", same_as_rescan(catalog, docs, base) and catalog.list(state="uploaded")[0] == 5, \
+        f"{catalog.list(state='uploaded')[0]} uploaded"
+
+    before = catalog.list(limit=10**6)
+    path = docs / "module1" / names[0] / "notes.md"
+    catalog.update(path, write(path, "still not a week"))
+    yield "other files", catalog.list(limit=10**6) == before, "ignored"
+
+    errors = []
+
+    def writer(team: str):
+        try:
+            for w in MODULE_WEEKS["module1"]:
+                path = docs / "module1" / team / f"week{w}.md"
+                catalog.update(path, write(path, markdown_text(10, 0.0, seed=w)))
+        except Exception as e:  # surfaced in the result below
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(team,)) for team in names[1:]]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        catalog.list(state="uploaded")
+    for t in threads:
+        t.join()
+    yield "threads", not errors and same_as_rescan(catalog, docs, base), f"{len(errors)} error(s)"
+
+    total, all_docs = catalog.list(limit=10**6)
+    by_team = catalog.list(module="module1", team=names[0].upper())[1]
+    by_state = {s: catalog.list(state=s)[0] for s in STATES}
+    yield "filters", {d.team for d in by_team} == {names[0]} and all(d.module == "module1" for d in by_team) \
+        and len(by_team) == 4 and sum(by_state.values()) == total, f"{len(by_team)} for {names[0].upper()}, {by_state}"
+
+    pages = []
+    for offset in range(0, total, 7):
+        page_total, page = catalog.list(offset=offset, limit=7)
+        pages.extend(page)
+    order = [(d.module, d.team.lower(), d.week) for d in all_docs]
+    weeks = [d.week for d in all_docs if d.module == "module3" and d.team == names[-1]]
+    yield "pages", pages == all_docs and page_total == total and order == sorted(order) and weeks == [9, 10, 11, 12, 13], \
+        f"{total} docs in {len(range(0, total, 7))} pages, module3/{names[-1]} weeks {weeks}"
+
+    status = catalog.team_status("module1", names[0])
+    yield "team_status", status["counts"] == {"stub": 2, "deleted": 1, "uploaded": 1} \
+        and [w["week"] for w in status["weeks"]] == [1, 2, 3, 4], f"{status['counts']}"
+
+    _, all_docs = catalog.list(limit=10**6)
+    stale = [d.path for d in all_docs if file_state(base / d.path) != (d.size, d.sha256)]
+    yield "hashes", not stale, f"{len(all_docs) - len(stale)} of {len(all_docs)} match the file"
+
+    removed = docs / "module1" / names[0] / "week4.md"
+    removed.unlink()
+    write(docs / "module3" / "TeamNew" / "week9.md", STUB.format(w=9))
+    before = catalog.list(limit=10**6)[0]
+    behind = not same_as_rescan(catalog, docs, base)
+    found = catalog.build()
+    paths = {d.path for d in catalog.list(limit=10**6)[1]}
+    yield "rebuild", behind and found == before and same_as_rescan(catalog, docs, base) \
+        and removed.relative_to(base).as_posix() not in paths, f"{before} docs before, {found} after build()"
+
+
+def main():
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    failed = False
+    print(f"{'scenario':>12}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in scenarios(Path(tmp), teams):
+            failed |= not ok
+            print(f"{name:>12}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("Catalog matches the docs tree.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+tools/check_doc_manifest.py
+
+Scenario check for doc_manifest.DocManifest on a temp tree of synthetic
+markdown files. Each scenario loads the manifest as a fresh run would,
+counts how many files are processed / skipped and how many are hashed
+(file_sha256 calls):
+
+    first run        every file processed
+    unchanged        every file skipped, nothing hashed
+    touched          new mtime, same bytes: skipped after one hash, and the
+                     refreshed entry needs no hash on the run after
+    edited           new content: processed
+    racy             content changed within the manifest's own mtime tick
+                     (same size and mtime as recorded): hashed and processed
+    new tool         a different tool version: every file processed
+    removed          a deleted file's entry is dropped on save
+    corrupt          an unreadable manifest counts as empty
+
+Usage:
+    python tools/check_doc_manifest.py [files]
+
+Defaults: 20 files. Exits 1 if a scenario fails.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import doc_manifest
+from doc_manifest import MANIFEST_NAME, DocManifest
+from synthetic_docs import markdown_text
+
+TOOL = "check"
+hashes = 0
+_file_sha256 = doc_manifest.file_sha256
+
+
+def counting_sha256(path: Path) -> str:
+    global hashes
+    hashes += 1
+    return _file_sha256(path)
+
+
+doc_manifest.file_sha256 = counting_sha256
+
+
+def run(root: Path, version: str = "v1"):
+    """One incremental run: (processed, skipped, hashed) file counts."""
+    global hashes
+    hashes = 0
+    manifest = DocManifest.load(root, TOOL, version)
+    for p in sorted(root.rglob("*.md")):
+        if not manifest.is_current(p):
+            manifest.record(p)
+    manifest.save()
+    return manifest.processed, manifest.skipped, hashes
+
+
+def age(path: Path, seconds: float = 10):
+    """Move a file's mtime into the past (the run before had it at rest)."""
+    st = path.stat()
+    ns = st.st_mtime_ns - int(seconds * 1e9)
+    os.utime(path, ns=(ns, ns))
+
+
+def scenarios(root: Path, files: int):
+    paths = []
+    for i in range(files):
+        p = root / f"module{i % 3}" / f"week{i}.md"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(markdown_text(40, 0.3, seed=i), encoding="utf-8")
+        age(p)
+        paths.append(p)
+    manifest_path = root / MANIFEST_NAME
+
+    got = run(root)
+    yield "first run", got[0] == files, got
+    got = run(root)
+    yield "unchanged", got == (0, files, 0), got
+
+    os.utime(paths[0])  # same bytes, new mtime
+    got = run(root)
+    yield "touched", got == (0, files, 1), got
+    got = run(root)
+    yield "touched, next run", got == (0, files, 0), got
+
+    paths[1].write_text(paths[1].read_text(encoding="utf-8") + "\nmore\n", encoding="utf-8")
+    got = run(root)
+    yield "edited", got[0] == 1, got
+
+    # racy: recorded and saved in the same mtime tick, then rewritten with
+    # the same size and mtime; only the hash can tell
+    p = paths[2]
+    saved_ns = manifest_path.stat().st_mtime_ns
+    os.utime(p, ns=(saved_ns, saved_ns))
+    run(root)  # records p at the manifest's own mtime
+    os.utime(manifest_path, ns=(saved_ns, saved_ns))
+    data = bytearray(p.read_bytes())
+    data[0] = ord("#") if data[0] != ord("#") else ord("@")
+    p.write_bytes(bytes(data))
+    os.utime(p, ns=(saved_ns, saved_ns))
+    got = run(root)
+    yield "racy", got[0] == 1, got
+
+    got = run(root, "v2")
+    yield "new tool", got[0] == files, got
+
+    paths[3].unlink()
+    run(root, "v2")
+    entries = DocManifest.load(root, TOOL, "v2").entries
+    key = paths[3].relative_to(root).as_posix()
+    yield "removed", key not in entries and len(entries) == files - 1, f"{len(entries)} entries"
+
+    manifest_path.write_text("{not json", encoding="utf-8")
+    got = run(root, "v2")
+    yield "corrupt", got[0] == files - 1, got
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    failed = False
+    print(f"{'scenario':>18}  result  (processed, skipped, hashed)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in scenarios(Path(tmp), files):
+            failed |= not ok
+            print(f"{name:>18}  {'ok' if ok else 'FAILED'}  {detail}")
+    if failed:
+        sys.exit(1)
+    print("Manifest skips exactly the unchanged files.")
+
+
+if __name__ == "__main__":
+    main()
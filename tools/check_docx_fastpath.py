@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+tools/check_docx_fastpath.py
+
+Check for the streaming DOCX fast path (docx_fastpath.py) and its mammoth
+fallback in convert_docx_to_md.py, on synthetic documents:
+
+    prose       no code: the fast path is used and its markdown is byte for
+                byte what mammoth writes
+    code        monospace paragraphs: fast path, fenced code blocks, and
+                every prose paragraph as mammoth has it
+    image       a drawing: falls back to mammoth, image stored as a file
+    table       a table: falls back to mammoth
+    nested      a level-1 list item: falls back to mammoth
+    no residue  after a fallback the output is exactly mammoth's (nothing
+                of the partial fast-path output) and no temp file is left
+
+Usage:
+    python tools/check_docx_fastpath.py [paragraphs]
+
+Defaults: 80 paragraphs. Exits 1 if a case fails.
+"""
+
+import contextlib
+import io
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import convert_docx_to_md
+from docx_images import ImageStore
+from synthetic_docs import docx_bytes
+
+TABLE = ("<w:tbl><w:tr><w:tc><w:p><w:r><w:t>cell</w:t></w:r></w:p></w:tc>"
+         "<w:tc><w:p><w:r><w:t>other</w:t></w:r></w:p></w:tc></w:tr></w:tbl>")
+NESTED = ('<w:p><w:pPr><w:numPr><w:ilvl w:val="1"/><w:numId w:val="1"/></w:numPr></w:pPr>'
+          "<w:r><w:t>nested item</w:t></w:r></w:p>")
+
+
+def insert_after_paragraphs(docx: bytes, xml: str, after: int) -> bytes:
+    """Copy of `docx` with `xml` inserted into the body after `after` paragraphs."""
+    src = zipfile.ZipFile(io.BytesIO(docx))
+    document = src.read("word/document.xml").decode("utf-8")
+    ends = [m.end() for m in re.finditer(r"</w:p>", document)]
+    at = ends[min(after, len(ends)) - 1]
+    document = document[:at] + xml + document[at:]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name in src.namelist():
+            z.writestr(name, document if name == "word/document.xml" else src.read(name))
+    return buf.getvalue()
+
+
+def convert(work: Path, name: str, data: bytes, fast_path: bool):
+    """(markdown, report) of one conversion; the output file is pre-filled with junk."""
+    docx = work / f"{name}.docx"
+    docx.write_bytes(data)
+    out = work / f"{name}_{'fast' if fast_path else 'mammoth'}.md"
+    out.write_text("stale output\n", encoding="utf-8")
+    report = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_docx_to_md.convert_docx_to_md(docx, out, report, fast_path=fast_path)
+    return out.read_text(encoding="utf-8"), report
+
+
+def prose_lines(md: str):
+    """Non-empty lines outside fenced blocks."""
+    lines, fenced = [], False
+    for line in md.splitlines():
+        if line.startswith("```"):
+            fenced = not fenced
+        elif line.strip() and not fenced:
+            lines.append(line)
+    return lines
+
+
+def cases(work: Path, paragraphs: int):
+    store_dir = work / "img"
+    convert_docx_to_md.default_store = lambda: ImageStore(store_dir, "/img/docx", 0)
+
+    prose = docx_bytes(paragraphs, 0.0, seed=1)
+    fast, report = convert(work, "prose", prose, True)
+    slow, _ = convert(work, "prose", prose, False)
+    yield "prose", report.get("converter") == "fast" and fast == slow, \
+        f"{report.get('converter')}, {'identical' if fast == slow else 'differs'}"
+
+    code = docx_bytes(paragraphs, 0.3, seed=2)
+    fast, report = convert(work, "code", code, True)
+    slow, _ = convert(work, "code", code, False)
+    fences = fast.count("```") // 2
+    mammoth_prose = set(prose_lines(slow))
+    missing = [line for line in prose_lines(fast) if line not in mammoth_prose]
+    yield "code", report.get("converter") == "fast" and fences > 0 and not missing, \
+        f"{report.get('converter')}, {fences} fenced block(s), {len(missing)} prose line(s) not in mammoth's"
+
+    for name, data in (
+        ("image", docx_bytes(paragraphs, 0.3, seed=3, images=2)),
+        ("table", insert_after_paragraphs(docx_bytes(paragraphs, 0.3, seed=4), TABLE, paragraphs // 2)),
+        ("nested", insert_after_paragraphs(docx_bytes(paragraphs, 0.3, seed=5), NESTED, paragraphs // 2)),
+    ):
+        fast, report = convert(work, name, data, True)
+        slow, _ = convert(work, name, data, False)
+        fell_back = report.get("converter") == "mammoth" and "fast_path_fallback" in report
+        detail = f"{report.get('converter')} ({report.get('fast_path_fallback', 'no fallback')})"
+        if name == "image":
+            stored = len(list(store_dir.glob("*.png"))) if store_dir.exists() else 0
+            fell_back = fell_back and stored == 2 and "data:image" not in fast
+            detail += f", {stored} image file(s)"
+        yield name, fell_back, detail
+        yield f"{name}: no residue", fast == slow, "same as mammoth" if fast == slow else "differs from mammoth"
+
+    leftovers = [p.name for p in work.glob(".*.tmp")]
+    yield "no temp files", not leftovers, leftovers or "none"
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    failed = False
+    print(f"{'case':>18}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in cases(Path(tmp), paragraphs):
+            failed |= not ok
+            print(f"{name:>18}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("Fast path and fallback behave.")
+
+
+if __name__ == "__main__":
+    main()
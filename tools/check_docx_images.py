@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+tools/check_docx_images.py
+
+Check for content-addressed DOCX images (docx_images.py) through
+convert_docx_to_md.py, on synthetic documents with screenshots:
+
+    stored       every image is a file named by the hash of the embedded
+                 bytes, holding them, and the markdown links to it instead
+                 of a data: URI
+    dedup        repeated screenshots in one document are one file
+    re-upload    converting the same document again writes no image
+    other doc    a second document with the same screenshots reuses them
+    downscale    with Pillow, an oversized image is shrunk and carries the
+                 limit in its name (skipped without Pillow)
+    inline       with the store disabled (DOCX_IMAGE_DIR="") images stay
+                 inline, as mammoth writes them
+    gc           `docx_images.py gc` drops only images no doc references
+
+Usage:
+    python tools/check_docx_images.py [images]
+
+Defaults: up to 8 images per document (2 distinct). Exits 1 if a case fails.
+"""
+
+import contextlib
+import hashlib
+import io
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import convert_docx_to_md
+import docx_images
+from docx_images import ImageStore
+from synthetic_docs import docx_bytes, png_bytes
+
+URL = "/img/docx"
+
+
+def convert(work: Path, name: str, data: bytes, store) -> tuple:
+    """(markdown, report) of one conversion with `store` as the image store."""
+    convert_docx_to_md.default_store = lambda: store
+    docx = work / f"{name}.docx"
+    docx.write_bytes(data)
+    out = work / f"{name}.md"
+    report = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_docx_to_md.convert_docx_to_md(docx, out, report)
+    return out.read_text(encoding="utf-8"), report
+
+
+def linked(md: str) -> set:
+    # mammoth escapes the dot in the URL (abc\.png)
+    return set(re.findall(re.escape(URL + "/") + r"([\w.-]+)", md.replace("\\", "")))
+
+
+def mtimes(root: Path) -> dict:
+    return {p.name: p.stat().st_mtime_ns for p in root.iterdir()}
+
+
+def cases(work: Path, images: int):
+    root = work / "img"
+    doc = docx_bytes(60, 0.3, seed=7, images=images, distinct_images=2)
+    md, report = convert(work, "doc", doc, ImageStore(root, URL, 0))
+    files = sorted(root.iterdir())
+    originals = {hashlib.sha256(png_bytes(seed=7000 + i)).hexdigest()[:24] for i in range(2)}
+    names_ok = {p.name.split(".")[0] for p in files} == originals
+    bytes_ok = all(hashlib.sha256(p.read_bytes()).hexdigest()[:24] == p.name.split(".")[0] for p in files)
+    yield "stored", names_ok and bytes_ok and linked(md) == {p.name for p in files} and "data:image" not in md, \
+        f"{len(files)} file(s), {len(linked(md))} linked"
+    drawings = zipfile.ZipFile(io.BytesIO(doc)).read("word/document.xml").count(b"<w:drawing>")
+    yield "dedup", drawings > 2 and report.get("images") == drawings and report.get("images_written") == 2, \
+        f"{report.get('images')} images, {report.get('images_written')} written"
+
+    before = mtimes(root)
+    md2, report = convert(work, "doc", doc, ImageStore(root, URL, 0))
+    yield "re-upload", report.get("images_written") == 0 and mtimes(root) == before and md2 == md, \
+        f"{report.get('images_written')} written, files {'untouched' if mtimes(root) == before else 'rewritten'}"
+
+    other = docx_bytes(30, 0.1, seed=7, images=2, distinct_images=2)
+    md3, report = convert(work, "other", other, ImageStore(root, URL, 0))
+    yield "other doc", report.get("images_reused") == 2 and linked(md3) <= {p.name for p in files}, \
+        f"{report.get('images_reused')} reused"
+
+    if docx_images.Image is None:
+        yield "downscale", True, "skipped: Pillow not installed"
+    else:
+        big = png_bytes(2400, 1200, seed=1)
+        store = ImageStore(work / "big", URL, 800)
+        name = store.save(big, "image/png").rsplit("/", 1)[1]
+        data = (work / "big" / name).read_bytes()
+        with docx_images.Image.open(io.BytesIO(data)) as im:
+            size = im.size
+        yield "downscale", name.endswith("-800.png") and max(size) == 800 and len(data) < len(big), \
+            f"{name}, {size[0]}x{size[1]}, {len(big)} -> {len(data)} bytes"
+
+    md4, _ = convert(work, "inline", doc, None)
+    yield "inline", "data:image/png;base64," in md4 and not linked(md4), \
+        f"{md4.count('data:image')} data: URI(s)"
+
+    # gc: only "other" stays referenced, and it links both screenshots; add
+    # an orphan and make sure it is the only one removed
+    docs = work / "docs"
+    docs.mkdir()
+    (docs / "week1.md").write_text(md3, encoding="utf-8")
+    (root / ("0" * 24 + ".png")).write_bytes(b"orphan")
+    docx_images.IMAGE_DIR = root
+    removed = docx_images.gc(docs)
+    left = {p.name for p in root.iterdir()}
+    yield "gc", removed == 1 and left == linked(md3), f"{removed} removed, {len(left)} left"
+
+
+def main():
+    images = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    failed = False
+    print(f"{'case':>10}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in cases(Path(tmp), images):
+            failed |= not ok
+            print(f"{name:>10}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("DOCX images are stored once and linked.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+tools/check_event_loop.py
+
+Check that one large conversion does not stall the upload service: while a
+big synthetic PDF is converting, a few small DOCX uploads and a stream of
+GET /form requests (sent until the PDF is done) must each complete within
+a bound. A blocking call on the event loop (subprocess.run, a sync file
+copy, ...) would hold all of them until the PDF is done.
+
+A private server is started the same way as tools/loadtest_upload.py
+(upload_service/ and tools/ copied into a temp dir, rebuilds disabled).
+The check is only meaningful while the PDF is still converting, so it also
+fails if the PDF finishes before the small uploads do (raise pdf_pages).
+
+Usage:
+    python tools/check_event_loop.py [pdf_pages] [docx_uploads] [upload_bound_s] [get_bound_s] [pool_size]
+
+Defaults: 150 PDF pages, 3 DOCX uploads, 10s per upload, 0.5s per GET,
+pool size 3.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from loadtest_upload import post, start_local_server
+from synthetic_docs import docx_bytes, pdf_bytes
+
+
+def timed_get(url: str) -> float:
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        resp.read()
+    return time.perf_counter() - t0
+
+
+def timed_upload(url: str, week: str, name: str, data: bytes):
+    t0 = time.perf_counter()
+    status, _ = post(url + "/upload/", {"team": "loopcheck", "week": week}, {"file": (name, data)})
+    return status, time.perf_counter() - t0
+
+
+def main():
+    pdf_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    uploads = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    upload_bound = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+    get_bound = float(sys.argv[4]) if len(sys.argv) > 4 else 0.5
+    pool_size = int(sys.argv[5]) if len(sys.argv) > 5 else 3
+
+    big_pdf = pdf_bytes(pdf_pages, 0.3, seed=1)
+    small = [docx_bytes(30, 0.3, seed=10 + i) for i in range(uploads)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, url = start_local_server(Path(tmp), pool_size)
+        try:
+            pdf_done = threading.Event()
+            pdf_result = {}
+
+            def convert_pdf():
+                pdf_result["status"], pdf_result["seconds"] = timed_upload(url, "1", "big.pdf", big_pdf)
+                pdf_done.set()
+
+            threading.Thread(target=convert_pdf, daemon=True).start()
+            time.sleep(1.0)  # let the PDF reach its converter
+
+            gets = []
+            with ThreadPoolExecutor(uploads) as ex:
+                futures = [ex.submit(timed_upload, url, str(2 + i), f"small{i}.docx", data)
+                           for i, data in enumerate(small)]
+                # keep probing until the PDF is done, not just the uploads
+                while not all(f.done() for f in futures) or not pdf_done.wait(0.05):
+                    gets.append(timed_get(url + "/form"))
+                    if all(f.done() for f in futures) and "overlapped" not in pdf_result:
+                        pdf_result["overlapped"] = not pdf_done.is_set()
+                    time.sleep(0.05)
+                small_results = [f.result() for f in futures]
+            overlapped = pdf_result.get("overlapped", False)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    failed = False
+    print(f"{pdf_pages}-page PDF: status {pdf_result.get('status')}, {pdf_result.get('seconds', 0):.2f}s")
+    print(f"{'request':>14} {'status':>7} {'seconds':>8} {'bound':>6}")
+    for i, (status, seconds) in enumerate(small_results):
+        ok = status == 200 and seconds <= upload_bound
+        failed |= not ok
+        print(f"{f'small{i}.docx':>14} {status:>7} {seconds:>8.2f} {upload_bound:>6g}{'' if ok else '  FAILED'}")
+    worst = max(gets) if gets else 0.0
+    failed |= worst > get_bound
+    print(f"{'GET /form':>14} {len(gets):>6}x {worst:>8.3f} {get_bound:>6g}{'' if worst <= get_bound else '  FAILED'}"
+          "  (slowest)")
+    if not overlapped:
+        failed = True
+        print("The PDF finished before the small uploads: nothing overlapped (raise pdf_pages).")
+    if failed:
+        sys.exit(1)
+    print("Small uploads and GETs completed while the PDF was converting.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+tools/check_idempotence.py
+
+Property check for the markdown clean-up transforms: each must reach a
+fixed point in one run. For every document of a fuzzed corpus and every
+transform, the file is transformed twice; the second run must leave the
+bytes unchanged and must not write the file at all (no new inode / mtime,
+so Docusaurus sees nothing to reload).
+
+Corpus: the repo's docs/**/*.md, synthetic converter-style markdown
+(synthetic_docs.markdown_text) and random mixes of markdown / MDX trouble
+lines (fences, tags, "<2", import/export, <pre> blocks, indented code, CRLF,
+blank tails). The same seed gives the same corpus.
+
+Transforms: mdx_safe.mdx_safe_file, sanitize_and_wrap.sanitize_markdown_file,
+postprocess.postprocess_file, fix_mdx.fix_file (backups go to a temporary
+store), auto_snippet.process_one, sanitize_existing_md.wrap_code_blocks.
+
+Reports, per transform, how many files the first and the second run wrote,
+and the smallest failing input. Exits 1 on any failure.
+
+Usage:
+    python tools/check_idempotence.py [random_docs] [seed]
+
+Defaults: 1000 random documents, seed 0.
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import auto_snippet
+import fix_mdx
+import mdx_safe
+import postprocess
+import sanitize_and_wrap
+import sanitize_existing_md
+from backup_store import BackupStore
+from synthetic_docs import markdown_text
+
+DOCS_DIR = Path(__file__).resolve().parent.parent / "docs"
+LABEL = "teama week1"
+
+TRANSFORMS = {
+    "mdx_safe": mdx_safe.mdx_safe_file,
+    "sanitize_and_wrap": lambda p: sanitize_and_wrap.sanitize_markdown_file(p, LABEL),
+    "postprocess": lambda p: postprocess.postprocess_file(p, LABEL),
+    "fix_mdx": fix_mdx.fix_file,
+    "auto_snippet": auto_snippet.process_one,
+    "sanitize_existing_md": lambda p: sanitize_existing_md.wrap_code_blocks(p, "week1.docx"),
+}
+
+# lines the transforms react to, plus plain filler
+ATOMS = [
+    "", "", "   ", "text", "Some prose, with words.", "- item", "* item", "> quote", "1. step",
+    "# Title", "## 3. storage/mongo_client.py (DB)", "#comment", "# x = 1", "---",
+    "```", "```python", "```js title=\"t\"", "``` python", "~~~", "  ```",
+    "x = 1", "print(x)", "def f():", "    return 1", "\tindented", "    indented",
+    "import os", "from a import b", "export default x", "  import y", "python run.py",
+    "npm install", "$ ls", "if x:", "a; b", "{", "}", "id = 3", "for i in x:",
+    "<div>", "</div>", "<b>import os</b>", "<2025>", "<2", "a < b > c", "<<a>b>", "</a<5>",
+    "<</a>/b>", "<<x", "&lt;x&gt;", "&lt;<", "<!-- c -->", "<pre>", "<pre><code>x = 1",
+    "</code></pre>", "</pre>", "<script>alert(1)</script>", "< iframe src=x>", "<br/>",
+    "`inline <tag>`", "tab\there", "trailing  ", "ünïcode ✓",
+]
+
+
+def random_doc(rnd: random.Random) -> str:
+    lines = [rnd.choice(ATOMS) for _ in range(rnd.randint(0, 30))]
+    if rnd.random() < 0.2:
+        lines = ["---", "title: x", "---"] + lines
+    newline = "\r\n" if rnd.random() < 0.1 else "\n"
+    return newline.join(lines) + rnd.choice(["", "\n", "\n\n", "\n  \n"])
+
+
+def corpus(random_docs: int, seed: int):
+    for md in sorted(DOCS_DIR.rglob("*.md")):
+        yield md.read_text(encoding="utf-8", errors="ignore")
+    for i in range(20):
+        yield markdown_text(200, i / 20, seed + i)
+    rnd = random.Random(seed)
+    for _ in range(random_docs):
+        yield random_doc(rnd)
+
+
+def stamp(path: Path):
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns
+
+
+def run(fn, path: Path) -> bool:
+    """Run fn on path; True if it wrote the file."""
+    before = stamp(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(path)
+    return stamp(path) != before
+
+
+def main():
+    random_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    failures = {name: [] for name in TRANSFORMS}
+    writes = {name: [0, 0] for name in TRANSFORMS}
+    docs = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        fix_mdx.STORE = BackupStore(Path(tmp) / "store")
+        md = Path(tmp) / "week1.md"
+        for text in corpus(random_docs, seed):
+            docs += 1
+            data = text.encode("utf-8")
+            for name, fn in TRANSFORMS.items():
+                md.write_bytes(data)
+                writes[name][0] += run(fn, md)
+                once = md.read_bytes()
+                wrote = run(fn, md)
+                writes[name][1] += wrote
+                if wrote or md.read_bytes() != once:
+                    failures[name].append((text, once, md.read_bytes()))
+
+    print(f"{docs} documents (seed {seed})")
+    print(f"{'transform':>22} {'1st writes':>11} {'2nd writes':>11} {'failures':>9}")
+    for name in TRANSFORMS:
+        first, second = writes[name]
+        print(f"{name:>22} {first:>11} {second:>11} {len(failures[name]):>9}")
+    failed = False
+    for name, cases in failures.items():
+        if not cases:
+            continue
+        failed = True
+        text, once, twice = min(cases, key=lambda c: len(c[0]))
+        print(f"\n{name}: smallest failing input {text!r}")
+        print(f"  1st run: {once.decode('utf-8')!r}")
+        print(f"  2nd run: {twice.decode('utf-8')!r}")
+    if failed:
+        sys.exit(1)
+    print("All transforms reach a fixed point in one run.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+tools/check_metrics.py
+
+Check for upload_service/metrics.py and the /metrics endpoint.
+
+On a private Registry:
+
+    format        every sample line parses as `name{labels} value`, after its
+                  metric's HELP and TYPE lines
+    escaping      backslash, newline and double quote in label values are
+                  escaped and read back unchanged
+    buckets       histogram buckets are cumulative, a value on a bound counts
+                  in that bucket (le), +Inf equals _count, _sum is the total
+    values        integral values render without ".0", gauges go down
+
+Through a private server (started as tools/loadtest_upload.py does), after
+two uploads of one DOCX, one .txt, one bad week and two deletes:
+
+    uploads       uploads_total by file type and outcome (ok, rejected)
+    cache         conversion_cache_lookups_total: one miss, one hit
+    bytes         upload_bytes_in_total is the bytes of the accepted uploads
+    stages        upload_stage_seconds: convert observed once (the hit skips
+                  it), receive and admission_wait twice (the .txt is turned
+                  away before admission), every histogram consistent
+    deletes       deletes_total ok and not_found
+    moved to      the delete's moved_to is a relative POSIX path to the
+                  trashed copy (deleted_docs/...), which exists
+    in flight     upload_requests_in_flight back to 0
+    page          the whole /metrics page passes the format check
+
+Usage:
+    python tools/check_metrics.py
+
+Exits 1 if a case fails.
+"""
+
+import re
+import sys
+import tempfile
+import urllib.request
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+
+from loadtest_upload import post, start_local_server  # noqa: E402
+from synthetic_docs import docx_bytes  # noqa: E402
+from upload_service.metrics import Registry  # noqa: E402
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][\w:]*)(?:\{(.*)\})? (\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+
+def unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def parse(text: str):
+    """(samples {(name, frozenset(labels)): value}, problems [str]) of an exposition page."""
+    samples, problems, declared = {}, [], {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            declared.setdefault(line.split()[2], set()).add("help")
+            continue
+        if line.startswith("# TYPE "):
+            declared.setdefault(line.split()[2], set()).add("type")
+            continue
+        m = SAMPLE_RE.match(line)
+        if not m:
+            problems.append(f"unparsable: {line!r}")
+            continue
+        name, raw, value = m.groups()
+        labels = {}
+        if raw:
+            pairs = LABEL_RE.findall(raw)
+            if ",".join(f'{k}="{v}"' for k, v in pairs) != raw:
+                problems.append(f"bad labels: {line!r}")
+            labels = {k: unescape(v) for k, v in pairs}
+        base = re.sub(r"_(bucket|sum|count)$", "", name)
+        if declared.get(name) != {"help", "type"} and declared.get(base) != {"help", "type"}:
+            problems.append(f"no HELP/TYPE before {name}")
+        samples[(name, frozenset(labels.items()))] = float(value.replace("+Inf", "inf"))
+    return samples, problems
+
+
+def get(samples: dict, name: str, **labels) -> float:
+    """Sum of the samples of `name` whose labels include `labels`."""
+    want = set((k, str(v)) for k, v in labels.items())
+    return sum(v for (n, ls), v in samples.items() if n == name and want <= ls)
+
+
+def histograms_consistent(samples: dict) -> list:
+    """Histogram series whose buckets are not cumulative or whose +Inf is not _count."""
+    series = {}
+    for (name, labels), value in samples.items():
+        if name.endswith("_bucket"):
+            le = dict(labels)["le"]
+            key = (name[:-len("_bucket")], labels - {("le", le)})
+            series.setdefault(key, []).append((float(le.replace("+Inf", "inf")), value))
+    bad = []
+    for (base, labels), buckets in series.items():
+        counts = [v for _, v in sorted(buckets)]
+        if counts != sorted(counts) or counts[-1] != samples.get((base + "_count", labels)):
+            bad.append(f"{base}{dict(labels)}")
+    return bad
+
+
+def registry_cases():
+    reg = Registry()
+    hist = reg.histogram("demo_seconds", "Demo histogram.", ("stage",), buckets=(0.1, 1, 10))
+    for v in (0.05, 0.1, 0.5, 1, 20):
+        hist.observe(v, stage="convert")
+    counter = reg.counter("demo_total", "Demo counter.", ("team",))
+    nasty = 'a\\b "quoted"\nnext'
+    counter.inc(team=nasty)
+    counter.inc(2, team="plain")
+    gauge = reg.gauge("demo_in_flight", "Demo gauge.", ("endpoint",))
+    gauge.inc(endpoint="upload")
+    gauge.inc(endpoint="upload")
+    gauge.dec(endpoint="upload")
+    gauge.set(0.25, endpoint="batch")
+    reg.callback("demo_state", "Demo callback.", lambda: [({"z": "1", "a": "2"}, 3)])
+    text = reg.render()
+    samples, problems = parse(text)
+
+    yield "format", not problems and text.endswith("\n"), f"{len(samples)} samples, {len(problems)} problem(s)"
+    yield "escaping", get(samples, "demo_total", team=nasty) == 1 and '\\"quoted\\"\\n' in text, \
+        "label value read back unchanged"
+    buckets = [get(samples, "demo_seconds_bucket", le=le) for le in ("0.1", "1", "10", "+Inf")]
+    yield "buckets", buckets == [2, 4, 4, 5] and get(samples, "demo_seconds_count") == 5 \
+        and abs(get(samples, "demo_seconds_sum") - 21.65) < 1e-9, f"le 0.1/1/10/+Inf: {' '.join(f'{b:g}' for b in buckets)}"
+    lines = text.splitlines()
+    yield "values", 'demo_total{team="plain"} 2' in lines and 'demo_in_flight{endpoint="upload"} 1' in lines \
+        and 'demo_in_flight{endpoint="batch"} 0.25' in lines and 'demo_state{a="2",z="1"} 3' in lines, \
+        "integers bare, floats as floats, callback labels sorted"
+
+
+def app_cases(work: Path, url: str):
+    docx = docx_bytes(30, 0.3, seed=1)
+    team = {"team": "metrics"}
+    responses = [
+        post(url + "/upload/", dict(team, week="2"), {"file": ("w.docx", docx)}),
+        post(url + "/upload/", dict(team, week="2"), {"file": ("w.docx", docx)}),
+        post(url + "/upload/", dict(team, week="2"), {"file": ("w.txt", b"plain text")}),
+        post(url + "/upload/", dict(team, week="week-x"), {"file": ("w.docx", docx)}),
+        post(url + "/delete/", dict(team, module="module1", week="2")),
+        post(url + "/delete/", dict(team, module="module1", week="3")),
+    ]
+    statuses = [status for status, _ in responses]
+    with urllib.request.urlopen(url + "/metrics", timeout=60) as resp:
+        text = resp.read().decode("utf-8")
+    samples, problems = parse(text)
+    labels = {"module": "module1", "team": "metrics"}
+
+    ok = get(samples, "uploads_total", file_type="docx", outcome="ok", **labels)
+    rejected = get(samples, "uploads_total", outcome="rejected", team="metrics")
+    yield "uploads", statuses == [200, 200, 400, 400, 200, 404] and ok == 2 and rejected == 2 \
+        and get(samples, "uploads_total", file_type="txt", outcome="rejected") == 1, \
+        f"statuses {statuses}, ok {ok:g}, rejected {rejected:g}"
+    hits = get(samples, "conversion_cache_lookups_total", result="hit", **labels)
+    misses = get(samples, "conversion_cache_lookups_total", result="miss", **labels)
+    yield "cache", hits == 1 and misses == 1, f"{hits:g} hit, {misses:g} miss"
+    bytes_in = get(samples, "upload_bytes_in_total", file_type="docx", **labels)
+    yield "bytes", bytes_in == 2 * len(docx), f"{bytes_in:g} of {2 * len(docx)}"
+
+    converts = get(samples, "upload_stage_seconds_count", stage="convert", **labels)
+    receives = get(samples, "upload_stage_seconds_count", stage="receive", **labels)
+    admitted = get(samples, "upload_stage_seconds_count", stage="admission_wait", **labels)
+    bad = histograms_consistent(samples)
+    yield "stages", converts == 1 and receives == 2 and admitted == 2 and not bad, \
+        f"convert {converts:g}, receive {receives:g}, admission_wait {admitted:g}, " \
+        f"{len(bad)} inconsistent histogram(s)"
+    deleted = get(samples, "deletes_total", outcome="ok", **labels)
+    missing = get(samples, "deletes_total", outcome="not_found", team="metrics")
+    yield "deletes", deleted == 1 and missing == 1, f"ok {deleted:g}, not_found {missing:g}"
+    moved_to = responses[4][1].get("moved_to", "")
+    yield "moved to", moved_to.startswith("deleted_docs/") and "\\" not in moved_to \
+        and (work / moved_to).is_file(), moved_to or "missing"
+    in_flight = get(samples, "upload_requests_in_flight")
+    yield "in flight", in_flight == 0, f"{in_flight:g}"
+    yield "page", not problems, f"{len(samples)} samples" + (f", first problem: {problems[0]}" if problems else "")
+
+
+def main():
+    failed = False
+    print(f"{'case':>10}  result")
+    for name, ok, detail in registry_cases():
+        failed |= not ok
+        print(f"{name:>10}  {'ok' if ok else 'FAILED'}  ({detail})")
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, url = start_local_server(Path(tmp), None)
+        try:
+            for name, ok, detail in app_cases(Path(tmp), url):
+                failed |= not ok
+                print(f"{name:>10}  {'ok' if ok else 'FAILED'}  ({detail})")
+        finally:
+            proc.terminate()
+            proc.wait()
+    if failed:
+        sys.exit(1)
+    print("Metrics render correctly and count what happened.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+tools/check_pdf_backends.py
+
+Check for PDF backend selection (pdf_backends.py) through
+convert_pdf_to_md.py, on synthetic PDFs:
+
+    nolayout     same lines as the layout backend, page for page, and the
+                 same markdown text (fences may group code lines
+                 differently: nolayout has no blank lines between text boxes)
+    auto         picks an available backend whose lines match layout's, and
+                 the report says which one and what was sampled
+    wrong lines  a backend faster than all others whose lines differ from
+                 layout's (it returns empty pages) is sampled and not picked
+    pypdf        reported unavailable (and refused) when pypdf is not
+                 installed, otherwise its trial is in auto's report
+    unknown      an unknown backend name is refused before any output is
+                 written
+
+Usage:
+    python tools/check_pdf_backends.py [pages]
+
+Defaults: 6 pages per PDF. Exits 1 if a case fails.
+"""
+
+import contextlib
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import convert_pdf_to_md
+import pdf_backends
+from pdf_backends import available_backends, get_backend, iter_page_texts, line_structure
+from synthetic_docs import pdf_bytes
+
+
+def convert(work: Path, pdf: Path, backend: str) -> tuple:
+    """(markdown, report) of one uncached conversion with `backend`."""
+    out = work / f"{pdf.stem}_{backend}.md"
+    report = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_pdf_to_md.convert_pdf_to_md(pdf, out, page_cache=False, report=report, backend=backend)
+    return out.read_text(encoding="utf-8"), report
+
+
+class EmptyPagesBackend:
+    """Instant and wrong: every page comes out empty."""
+
+    name = "empty"
+
+    def available(self) -> bool:
+        return True
+
+    def extractor(self, in_path: Path):
+        return lambda index, page: "\f"
+
+
+def text_lines(md: str) -> list:
+    """Markdown lines without fence markers or blank lines."""
+    return [line for line in line_structure(md) if not line.startswith("```")]
+
+
+def cases(work: Path, pages: int):
+    pdfs = []
+    for seed, code_ratio in ((1, 0.0), (2, 0.3), (3, 0.6)):
+        pdf = work / f"doc{seed}.pdf"
+        pdf.write_bytes(pdf_bytes(pages, code_ratio, seed=seed))
+        pdfs.append(pdf)
+
+    for pdf in pdfs:
+        layout = [line_structure(t) for t in iter_page_texts(pdf, backend="layout")]
+        nolayout = [line_structure(t) for t in iter_page_texts(pdf, backend="nolayout")]
+        same_pages = sum(a == b for a, b in zip(layout, nolayout))
+        md_layout, _ = convert(work, pdf, "layout")
+        md_nolayout, report = convert(work, pdf, "nolayout")
+        same_md = text_lines(md_layout) == text_lines(md_nolayout)
+        yield f"nolayout {pdf.stem}", len(layout) == pages and layout == nolayout and same_md \
+            and report.get("backend") == "nolayout", \
+            f"{same_pages}/{len(layout)} page(s) match, markdown text {'identical' if same_md else 'differs'}"
+
+        md_auto, report = convert(work, pdf, "auto")
+        picked, trials = report.get("backend"), report.get("backend_trials", {})
+        yield f"auto {pdf.stem}", picked in available_backends() and trials.get(picked, {}).get("same_lines") \
+            and set(trials) == set(available_backends()) and text_lines(md_auto) == text_lines(md_layout), \
+            f"picked {picked}, sampled {', '.join(trials)}"
+
+    pdf_backends.BACKENDS["empty"] = EmptyPagesBackend()
+    try:
+        _, report = convert(work, pdfs[1], "auto")
+    finally:
+        del pdf_backends.BACKENDS["empty"]
+    picked, trials = report.get("backend"), report.get("backend_trials", {})
+    empty = trials.get("empty", {})
+    yield "wrong lines", "empty" in trials and not empty.get("same_lines", True) and picked != "empty" \
+        and trials.get(picked, {}).get("same_lines"), \
+        f"empty sampled in {empty.get('seconds', 0):.4f}s, picked {picked}"
+
+    if "pypdf" in available_backends():
+        _, report = convert(work, pdfs[0], "auto")
+        yield "pypdf", "pypdf" in report.get("backend_trials", {}), "installed, sampled by auto"
+    else:
+        try:
+            get_backend("pypdf")
+            refused = False
+        except ValueError as e:
+            refused = "not installed" in str(e)
+        yield "pypdf", refused, "not installed: unavailable and refused"
+
+    try:
+        convert(work, pdfs[0], "nosuch")
+        error = None
+    except ValueError as e:
+        error = str(e)
+    yield "unknown", error is not None and "Unknown PDF backend" in error \
+        and not (work / f"{pdfs[0].stem}_nosuch.md").exists(), error or "accepted"
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    failed = False
+    print(f"{'case':>14}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in cases(Path(tmp), pages):
+            failed |= not ok
+            print(f"{name:>14}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("PDF backends agree with layout and are chosen safely.")
+
+
+if __name__ == "__main__":
+    main()
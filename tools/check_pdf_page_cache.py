@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+tools/check_pdf_page_cache.py
+
+Check for the per-page PDF extraction cache (pdf_page_cache.py) through
+convert_pdf_to_md.py, on synthetic PDFs in a temp cache directory. Every
+conversion's markdown must be what an uncached conversion writes.
+
+    cold         first conversion: every page a miss, every page stored
+    warm         same PDF again: every page a hit
+    parallel     same PDF with --jobs 2: every page a hit
+    edited       one page's text changed: only that page is extracted
+    appended     the same PDF with pages added: only the new pages are
+    backend      nolayout does not reuse layout's entries
+    laparams     layout with other LAParams (line_margin) does not either
+    corrupt      a damaged entry counts as a miss and is rewritten
+    evict        over max_bytes, least recently used pages are dropped to
+                 under 90% of the limit, and the last used pages stay
+
+Usage:
+    python tools/check_pdf_page_cache.py [pages]
+
+Defaults: 8 pages. Exits 1 if a case fails.
+"""
+
+import contextlib
+import io
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+from pdfminer.layout import LAParams
+
+import convert_pdf_to_md
+import pdf_backends
+import pdf_page_cache
+from pdf_page_cache import PageCache
+from synthetic_docs import pdf_bytes
+
+
+def edit_page(pdf: bytes, page: int) -> bytes:
+    """Copy of `pdf` with one letter changed in the text of `page` (same length, xref stays valid)."""
+    start = [m.end() for m in re.finditer(rb"stream\n", pdf)][page]
+    at = pdf.index(b"(", start) + 1
+    letter = b"X" if pdf[at:at + 1] != b"X" else b"Y"
+    return pdf[:at] + letter + pdf[at + 1:]
+
+
+def convert(work: Path, name: str, data: bytes, cached: bool = True, **kwargs) -> tuple:
+    """(markdown, report) of one conversion of `data`, as doc.pdf in work/name."""
+    (work / name).mkdir(exist_ok=True)
+    pdf = work / name / "doc.pdf"
+    pdf.write_bytes(data)
+    out = pdf.with_suffix(".md")
+    report = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_pdf_to_md.convert_pdf_to_md(pdf, out, page_cache=cached, report=report, **kwargs)
+    return out.read_text(encoding="utf-8"), report
+
+
+def counts(report: dict) -> str:
+    return f"{report.get('page_cache_hits')} hit(s), {report.get('page_cache_misses')} miss(es)"
+
+
+def cases(work: Path, pages: int):
+    root = work / "cache"
+    pdf_page_cache.CACHE_DIR = root
+    doc = pdf_bytes(pages, 0.3, seed=1)
+    plain, _ = convert(work, "plain", doc, cached=False, jobs=1)
+
+    md, report = convert(work, "doc", doc, jobs=1)
+    entries = PageCache(root).size()[0]
+    yield "cold", md == plain and report.get("page_cache_misses") == pages and entries == pages, \
+        f"{counts(report)}, {entries} entries"
+
+    md, report = convert(work, "doc", doc, jobs=1)
+    yield "warm", md == plain and report.get("page_cache_hits") == pages, counts(report)
+
+    md, report = convert(work, "doc", doc, jobs=2)
+    yield "parallel", md == plain and report.get("page_cache_hits") == pages, counts(report)
+
+    edited = edit_page(doc, pages // 2)
+    expected, _ = convert(work, "edited_plain", edited, cached=False, jobs=1)
+    md, report = convert(work, "edited", edited, jobs=1)
+    yield "edited", md == expected and md != plain and report.get("page_cache_misses") == 1, counts(report)
+
+    longer = pdf_bytes(pages + 2, 0.3, seed=1)
+    expected, _ = convert(work, "longer_plain", longer, cached=False, jobs=1)
+    md, report = convert(work, "longer", longer, jobs=1)
+    yield "appended", md == expected and report.get("page_cache_hits") == pages \
+        and report.get("page_cache_misses") == 2, counts(report)
+
+    _, report = convert(work, "doc", doc, jobs=1, backend="nolayout")
+    yield "backend", report.get("page_cache_misses") == pages, counts(report)
+
+    layout = pdf_backends.BACKENDS["layout"]
+    layout.laparams = lambda: LAParams(line_margin=0.3)
+    try:
+        _, report = convert(work, "doc", doc, jobs=1)
+    finally:
+        del layout.laparams
+    yield "laparams", report.get("page_cache_misses") == pages, counts(report)
+
+    victim = sorted(root.glob("*/*.txt.gz"))[0]
+    victim.write_bytes(b"not gzip")
+    md, report = convert(work, "doc", doc, jobs=1)
+    md2, report2 = convert(work, "doc", doc, jobs=1)
+    yield "corrupt", md == plain and md2 == plain and report.get("page_cache_misses") == 1 \
+        and report2.get("page_cache_misses") == 0, f"{counts(report)}, then {counts(report2)}"
+
+    entries, total = PageCache(root).size()
+    limit = total // 2
+    cache = PageCache(root, limit)
+    removed = cache.evict()
+    left, size = cache.size()
+    _, report = convert(work, "doc", doc, jobs=1)  # its pages were used last
+    yield "evict", removed > 0 and size <= limit * 0.9 and left == entries - removed \
+        and report.get("page_cache_hits") == pages, \
+        f"{entries} -> {left} entries, {total} -> {size} bytes (limit {limit}), last used: {counts(report)}"
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    failed = False
+    print(f"{'case':>10}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in cases(Path(tmp), pages):
+            failed |= not ok
+            print(f"{name:>10}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("Page cache reuses exactly the unchanged pages.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+tools/check_pdf_stream.py
+
+Check for MarkdownStream (convert_pdf_to_md.py), which escapes for MDX one
+piece at a time as it writes. Its output must be what mdx_escape gives on
+the whole document, as the converter did before it streamed:
+
+    split script   `a <` then `script` on the next line of the paragraph:
+                   the `<` is escaped though the pieces are written apart
+    split iframe   the same with `< ` and `  iframe`
+    before code    a `<` ending a paragraph followed by a code block stays
+    digits         `<2` in a line is escaped, `<` then `2024` on the next
+                   line (a space apart) is not
+    end            a `<` at the very end of the document is written
+    pdf            a synthetic PDF converts to the same bytes with --stream
+                   and without
+
+Usage:
+    python tools/check_pdf_stream.py [pages]
+
+Defaults: 6 pages. Exits 1 if a case fails.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import convert_pdf_to_md
+from synthetic_docs import pdf_bytes
+
+CASES = {
+    "split script": ["Compare a <", "script tag with text."],
+    "split iframe": ["Embed b < ", "  iframe here"],
+    "before code": ["Generics look like List<", "def f(x):", "    return x"],
+    "digits": ["Values <2 are low and x <", "2024 is a year."],
+    "end": ["The last character is <"],
+}
+
+
+def whole_document(lines) -> str:
+    """The grouped markdown with mdx_escape applied once, to all of it."""
+    escape = convert_pdf_to_md.mdx_escape
+    convert_pdf_to_md.mdx_escape = lambda text: text
+    try:
+        raw = convert_pdf_to_md.lines_to_markdown(lines, "doc")
+    finally:
+        convert_pdf_to_md.mdx_escape = escape
+    return escape(raw)
+
+
+def cases(work: Path, pages: int):
+    for name, lines in CASES.items():
+        streamed = convert_pdf_to_md.lines_to_markdown(lines, "doc")
+        yield name, streamed == whole_document(lines), repr(streamed.split("\n")[0][-40:])
+
+    pdf = work / "doc.pdf"
+    pdf.write_bytes(pdf_bytes(pages, 0.3, seed=pages))
+    outputs = []
+    for stream in (False, True):
+        out = work / f"doc_{stream}.md"
+        convert_pdf_to_md.convert_pdf_to_md(pdf, out, jobs=1, stream=stream, page_cache=False)
+        outputs.append(out.read_bytes())
+    yield "pdf", outputs[0] == outputs[1], f"{pages} pages, {len(outputs[1])} bytes"
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    failed = False
+    print(f"{'case':>12}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in cases(Path(tmp), pages):
+            failed |= not ok
+            print(f"{name:>12}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("Streamed markdown is escaped as the whole document would be.")
+
+
+if __name__ == "__main__":
+    main()
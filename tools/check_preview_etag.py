@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+tools/check_preview_etag.py
+
+Check for POST /preview/ and GET /preview/<etag> conditional requests, on
+a private server (started as tools/loadtest_upload.py does, with
+PREVIEW_CACHE_MAX_ENTRIES=2):
+
+    preview       POST returns the markdown with a quoted strong ETag and
+                  writes nothing under docs/
+    same file     POSTing it again is a hit with the same ETag and body
+    304 on POST   If-None-Match with that ETag (plain, W/ or in a list)
+                  is a 304 before anything is converted
+    * on POST     If-None-Match: * is a 304
+    other ETag    a non-matching If-None-Match gets the body
+    html          format=html has its own ETag
+    GET           GET /preview/<etag> returns the body; with If-None-Match
+                  (the ETag or *) it is a 304
+    evicted       once two newer previews pushed it out, GET is a 404, with
+                  or without If-None-Match (the ETag or *)
+    unknown       GET of an ETag never cached is a 404, also with *
+    metrics       /metrics has the preview_cache entries, hits and misses
+
+Usage:
+    python tools/check_preview_etag.py
+
+Exits 1 if a case fails.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from loadtest_upload import encode_multipart, start_local_server
+from synthetic_docs import docx_bytes
+
+
+def request(url: str, fields=None, files=None, headers=None):
+    """(status, headers, body text) of a GET, or of a multipart POST when fields are given."""
+    headers = dict(headers or {})
+    data = None
+    if fields is not None:
+        data, headers["Content-Type"] = encode_multipart(fields, files or {})
+    req = urllib.request.Request(url, data=data, headers=headers, method="POST" if data else "GET")
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status, resp.headers, resp.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read().decode("utf-8", "replace")
+
+
+def conversions(url: str) -> int:
+    """Conversion cache lookups so far (hits + shared + misses)."""
+    _, _, body = request(url + "/cache/stats")
+    stats = json.loads(body)
+    return stats["hits"] + stats["shared"] + stats["misses"]
+
+
+def metric(url: str, field: str) -> float:
+    _, _, body = request(url + "/metrics")
+    for line in body.splitlines():
+        if line.startswith(f'preview_cache{{field="{field}"}}'):
+            return float(line.rsplit(" ", 1)[1])
+    return -1
+
+
+def cases(work: Path, url: str):
+    fields = {"team": "preview", "week": "3"}
+
+    def preview(seed: int, headers=None, **extra):
+        files = {"file": (f"doc{seed}.docx", docx_bytes(30, 0.3, seed=seed))}
+        return request(url + "/preview/", dict(fields, **extra), files, headers)
+
+    status, headers, body = preview(1)
+    etag = headers.get("ETag", "")
+    written = list((work / "docs").rglob("*.md"))
+    yield "preview", status == 200 and etag.startswith('"') and etag.endswith('"') and "```" in body \
+        and not written, f"{status}, ETag {etag}, {len(written)} doc(s) written"
+
+    status, headers2, body2 = preview(1)
+    yield "same file", status == 200 and headers2.get("ETag") == etag and body2 == body \
+        and headers2.get("X-Preview-Cache") == "hit", f"{status}, {headers2.get('X-Preview-Cache')}"
+
+    for form in (etag, f"W/{etag}", f'"other", {etag}'):
+        before = conversions(url)
+        status, headers2, body2 = preview(1, {"If-None-Match": form})
+        yield "304 on POST", status == 304 and not body2 and headers2.get("ETag") == etag \
+            and conversions(url) == before, f"If-None-Match: {form} -> {status}"
+
+    status, _, _ = preview(1, {"If-None-Match": "*"})
+    yield "* on POST", status == 304, f"{status}"
+    status, _, _ = preview(1, {"If-None-Match": '"other"'})
+    yield "other ETag", status == 200, f"{status}"
+
+    status, headers2, body2 = preview(1, format="html")
+    html_etag = headers2.get("ETag")
+    yield "html", status == 200 and html_etag not in (None, etag) and "<html>" in body2, f"{status}, ETag {html_etag}"
+
+    bare = etag.strip('"')
+    status, _, body2 = request(f"{url}/preview/{bare}")
+    yield "GET", status == 200 and body2 == body, f"{status}"
+    for form in (etag, "*"):
+        status, _, body2 = request(f"{url}/preview/{bare}", headers={"If-None-Match": form})
+        yield "GET 304", status == 304 and not body2, f"If-None-Match: {form} -> {status}"
+
+    preview(2)
+    preview(3)
+    for headers in ({}, {"If-None-Match": etag}, {"If-None-Match": "*"}):
+        status, _, _ = request(f"{url}/preview/{bare}", headers=headers)
+        yield "evicted", status == 404, f"{headers or 'no If-None-Match'} -> {status}"
+    status, _, _ = request(f"{url}/preview/{'0' * len(bare)}", headers={"If-None-Match": "*"})
+    yield "unknown", status == 404, f"If-None-Match: * -> {status}"
+
+    entries, hits, misses = (metric(url, f) for f in ("entries", "hits", "misses"))
+    yield "metrics", entries == 2 and hits >= 2 and misses >= 4, f"{entries:g} entries, {hits:g} hits, {misses:g} misses"
+
+
+def main():
+    failed = False
+    os.environ["PREVIEW_CACHE_MAX_ENTRIES"] = "2"
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, url = start_local_server(Path(tmp), None)
+        try:
+            print(f"{'case':>12}  result")
+            for name, ok, detail in cases(Path(tmp), url):
+                failed |= not ok
+                print(f"{name:>12}  {'ok' if ok else 'FAILED'}  ({detail})")
+        finally:
+            proc.terminate()
+            proc.wait()
+    if failed:
+        sys.exit(1)
+    print("Preview ETags and conditional requests behave.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+tools/check_rebuild.py
+
+Scenario check for upload_service/rebuild.py. Two schedulers share one
+change log in a temp dir, standing in for two uvicorn workers (their
+flock()s conflict even within one process); the build command appends a
+line to builds.txt, or fails while a `fail` file exists.
+
+    coalesce    changes from both workers get unique sequence numbers and
+                one build, run by the owner only
+    request     POST /rebuild/ on the non-owner reaches the owner
+    retry       a failed build is retried with no new change, and the
+                retry succeeds once the failure is gone
+    compact     after a good build the log is that build plus newer changes
+    takeover    when the owner stops, the other worker takes over and
+                rebuilds what was not built yet
+    stop        stop() returns promptly while a change is being debounced
+    disabled    with REBUILD_CMD empty, changes are not logged at all
+
+Usage:
+    python tools/check_rebuild.py
+
+Exits 1 if a scenario fails.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+
+from upload_service.rebuild import RebuildScheduler  # noqa: E402
+
+CMD = "test ! -e fail && echo built >> builds.txt"
+TIMING = dict(debounce=0.2, max_wait=2.0, timeout=10, retry=0.3, retry_max=1.0, poll=0.1)
+
+
+def builds(root: Path) -> int:
+    path = root / "builds.txt"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def log_records(log: Path) -> list:
+    return [json.loads(line) for line in log.read_text().splitlines()]
+
+
+async def wait_for(cond, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        await asyncio.sleep(0.05)
+    return cond()
+
+
+async def scenarios(root: Path):
+    log = root / "changes.jsonl"
+    a = RebuildScheduler(root, log, CMD, **TIMING)
+    b = RebuildScheduler(root, log, CMD, **TIMING)
+    await a.start()
+    await b.start()
+    yield "one owner", a.owner and not b.owner, f"a.owner={a.owner} b.owner={b.owner}"
+
+    await asyncio.gather(
+        a.notify("upload", "docs/a1.md", "docs/a2.md"),
+        b.notify("upload", "docs/b1.md"),
+        b.notify("delete", "docs/b2.md"),
+    )
+    seqs = [r["seq"] for r in log_records(log) if "seq" in r]
+    yield "coalesce: unique seqs", sorted(seqs) == [1, 2, 3, 4], f"seqs {seqs}"
+    await wait_for(lambda: a.builds["ok"] == 1 and a.state == "idle")
+    await asyncio.sleep(0.5)
+    yield "coalesce: one build", builds(root) == 1 and a.built_seq == 4 and b.builds["ok"] == 0, \
+        f"{builds(root)} build(s), built through {a.built_seq}"
+    records = log_records(log)
+    yield "compact", len(records) == 1 and records[0]["event"] == "build", f"{len(records)} records left"
+
+    await b.request_now()
+    ok = await wait_for(lambda: a.builds["ok"] == 2 and a.state == "idle")
+    yield "request from non-owner", ok and builds(root) == 2, f"{builds(root)} build(s)"
+
+    (root / "fail").touch()
+    await b.notify("upload", "docs/b3.md")
+    ok = await wait_for(lambda: a.builds["failed"] >= 1)
+    retry_in = a.status()["retry_in_s"]
+    (root / "fail").unlink()
+    # the build writes builds.txt before the scheduler has seen its result
+    ok = ok and await wait_for(lambda: a.builds["ok"] == 3 and a.state == "idle")
+    yield "retry after failure", ok and retry_in is not None and a.failures == 0, \
+        f"failed {a.builds['failed']}, retry_in_s {retry_in}, {builds(root)} build(s)"
+    records = log_records(log)
+    yield "compact after retry", [r["event"] for r in records] == ["build"] and records[0]["through_seq"] == 5, \
+        f"{records}"
+
+    # stop the owner with an unbuilt change in the log
+    (root / "fail").touch()
+    await a.notify("upload", "docs/a3.md")
+    await wait_for(lambda: a.builds["failed"] >= 2)
+    await a.stop()
+    (root / "fail").unlink()
+    ok = await wait_for(lambda: b.owner)
+    ok = ok and await wait_for(lambda: b.builds["ok"] == 1 and b.state == "idle")
+    yield "takeover", ok and b.built_seq == 6 and builds(root) == 4, \
+        f"b.owner={b.owner}, built through {b.built_seq}"
+
+    # stop while a change is being debounced: must not hang
+    await b.notify("upload", "docs/b4.md")
+    t0 = time.monotonic()
+    await asyncio.wait_for(b.stop(), 15)
+    yield "stop", time.monotonic() - t0 < 5 and not b.owner, f"stopped in {time.monotonic() - t0:.2f}s"
+
+
+async def disabled(root: Path):
+    log = root / "disabled.jsonl"
+    off = RebuildScheduler(root, log, "", **TIMING)
+    await off.start()
+    for i in range(5):
+        await off.notify("upload", f"docs/off{i}.md")
+    await off.stop()
+    yield "disabled", not log.exists(), "no change log" if not log.exists() else f"{log.stat().st_size} bytes logged"
+
+
+async def run(root: Path) -> bool:
+    failed = False
+    print(f"{'scenario':>24}  result")
+    for group in (scenarios(root), disabled(root)):
+        async for name, ok, detail in group:
+            failed |= not ok
+            print(f"{name:>24}  {'ok' if ok else 'FAILED'}  ({detail})")
+    return not failed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        if not asyncio.run(run(Path(tmp))):
+            sys.exit(1)
+    print("Rebuild scheduler behaves.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+tools/check_sandbox.py
+
+Check for the conversion sandbox in upload_service/worker_pool.py: a
+one-worker ConverterPool per case, each job a real pipeline stage
+(mdx_safe on a large synthetic markdown file is slow and memory hungry).
+After every failure the pool must still convert a small DOCX, on a fresh
+worker, within the same limits: the replacement's start-up (the converter
+imports) happens before its "ready" and is not part of the job's time.
+
+    timeout        a job past the wall-clock limit (0.5s) raises
+                   ConversionTimeout (conversion_timeout) after about that
+                   long, and the DOCX then converts within 0.5s on the
+                   replacement worker
+    memory         a job past the address-space cap raises
+                   MemoryLimitExceeded (conversion_memory_limit)
+    cpu            a job past its CPU budget raises CpuLimitExceeded
+                   (conversion_cpu_limit)
+    crash          a worker killed mid-job raises WorkerError
+                   (conversion_failed)
+    shutdown       shutdown(timeout=1) during a slow job returns after about
+                   a second, the worker is killed and the job raises
+                   WorkerError
+    one-shot       limit_child_process caps a plain subprocess (pool
+                   disabled) the same way
+
+Page caching is disabled (PDF_PAGE_CACHE_DIR="") so nothing is written
+outside the temp dir.
+
+Usage:
+    python tools/check_sandbox.py [markdown_lines]
+
+Defaults: 200000 markdown lines (about 8 MB) for the slow job. Exits 1 if a
+case fails.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+os.environ["PDF_PAGE_CACHE_DIR"] = ""  # inherited by the workers
+
+from synthetic_docs import docx_bytes, markdown_text  # noqa: E402
+from upload_service.worker_pool import (  # noqa: E402
+    ConversionTimeout, ConverterPool, CpuLimitExceeded, MemoryLimitExceeded, WorkerError,
+    limit_child_process,
+)
+
+# generous enough for the small DOCX (peak ~45 MB), not for mdx_safe on ~8 MB
+MEMORY_CAP_MB = 96
+
+
+def worker_pids(pool: ConverterPool) -> set:
+    return {w.proc.pid for w in pool._idle.queue}
+
+
+def failing_job(pool: ConverterPool, path: Path, kill_after: float = 0):
+    """(exception or None, seconds) of mdx_safe on `path`; kill_after > 0 kills the worker mid-job."""
+    for w in pool._idle.queue:
+        w.wait_ready(60)  # time the job, not the pool's start-up
+    if kill_after:
+        pid = next(iter(worker_pids(pool)))
+        threading.Timer(kill_after, os.kill, (pid, signal.SIGKILL)).start()
+    t0 = time.perf_counter()
+    try:
+        pool.call("mdx_safe", path)
+        error = None
+    except WorkerError as e:
+        error = e
+    return error, time.perf_counter() - t0
+
+
+def recovered(pool: ConverterPool, work: Path, before: set) -> bool:
+    """The pool converts a small DOCX again, on a worker that is not the failed one."""
+    docx = work / "small.docx"
+    docx.write_bytes(docx_bytes(20, 0.3, seed=1))
+    pool.convert(docx, work / "small.md")
+    return (work / "small.md").exists() and len(worker_pids(pool)) == pool.size and worker_pids(pool) != before
+
+
+def cases(work: Path, lines: int):
+    big = work / "big.md"
+    big.write_text(markdown_text(lines, 0.3, seed=1), encoding="utf-8")
+    size_mb = big.stat().st_size / 2**20
+
+    for name, expected, limits, kill_after in (
+        ("timeout", ConversionTimeout, dict(timeout=0.5), 0),
+        ("memory", MemoryLimitExceeded, dict(max_memory_mb=MEMORY_CAP_MB), 0),
+        ("cpu", CpuLimitExceeded, dict(max_cpu_seconds=1), 0),
+        ("crash", WorkerError, {}, 0.5),
+    ):
+        config = dict(size=1, timeout=60, max_memory_mb=0, max_cpu_seconds=0)
+        config.update(limits)
+        pool = ConverterPool(**config)
+        pool.start()
+        try:
+            before = worker_pids(pool)
+            error, seconds = failing_job(pool, big, kill_after)
+            ok = type(error) is expected and error.stats is not None and recovered(pool, work, before)
+            if name == "timeout":
+                ok = ok and seconds < 1.5
+            detail = f"{type(error).__name__ if error else 'no error'}"
+            detail += f" ({error.code})" if error else ""
+            yield name, ok, f"{detail} after {seconds:.1f}s on {size_mb:.1f} MB"
+        finally:
+            pool.shutdown()
+
+    pool = ConverterPool(size=1, timeout=60, max_memory_mb=0, max_cpu_seconds=0)
+    pool.start()
+    errors = []
+    job = threading.Thread(target=lambda: errors.append(failing_job(pool, big)[0]))
+    job.start()
+    time.sleep(1)  # mid-job
+    t0 = time.perf_counter()
+    pool.shutdown(timeout=1)
+    seconds = time.perf_counter() - t0
+    job.join()
+    yield "shutdown", seconds < 3 and isinstance(errors[0], WorkerError) and not pool._workers, \
+        f"{seconds:.1f}s, job: {type(errors[0]).__name__ if errors[0] else 'finished'}"
+
+    proc = subprocess.run(
+        [sys.executable, "-c", "x = bytearray(512 * 2**20)"],
+        preexec_fn=lambda: limit_child_process(MEMORY_CAP_MB, 0),
+        capture_output=True, text=True,
+    )
+    yield "one-shot", proc.returncode != 0 and "MemoryError" in proc.stderr, \
+        f"exit {proc.returncode}, {(proc.stderr.strip().splitlines() or [''])[-1]}"
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    failed = False
+    print(f"{'case':>10}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ok, detail in cases(Path(tmp), lines):
+            failed |= not ok
+            print(f"{name:>10}  {'ok' if ok else 'FAILED'}  ({detail})")
+    if failed:
+        sys.exit(1)
+    print("Sandbox limits hold and the pool recovers.")
+
+
+if __name__ == "__main__":
+    main()
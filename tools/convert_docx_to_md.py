@@ -1,31 +1,98 @@
 #!/usr/bin/env python3
 # tools/convert_docx_to_md.py
+import os
 import sys
+import zipfile
 from pathlib import Path
+from typing import Optional
 import mammoth
 
-# Usage:
-# python tools/convert_docx_to_md.py input.docx output.md
-
-if len(sys.argv) < 3:
-    print("Usage: python tools/convert_docx_to_md.py in.docx out.md")
-    sys.exit(2)
-
-in_path = Path(sys.argv[1])
-out_path = Path(sys.argv[2])
+from atomic_write import atomic_write_text
+from docx_fastpath import Unsupported, convert_docx_fast
+from docx_images import default_store
 
-if not in_path.exists():
-    print("ERROR: input file not found:", in_path)
-    sys.exit(3)
-
-with in_path.open("rb") as f:
-    # convert to markdown (mammoth supports markdown conversion)
-    result = mammoth.convert_to_markdown(f)
-    md = result.value
-
-out_path.parent.mkdir(parents=True, exist_ok=True)
-out_path.write_text(md, encoding="utf-8")
-print("Converted", in_path, "->", out_path)
+# Usage:
+# python tools/convert_docx_to_md.py input.docx output.md [--no-fast-path]
+#
+# Plain documents go through the streaming fast path (docx_fastpath.py);
+# anything it does not handle falls back to mammoth. DOCX_FAST_PATH=0 (or
+# --no-fast-path) always uses mammoth.
+
+FAST_PATH = os.environ.get("DOCX_FAST_PATH", "1") not in ("", "0")
+
+
+def convert_docx_to_md(
+    in_path: Path,
+    out_path: Path,
+    report: Optional[dict] = None,
+    fast_path: Optional[bool] = None,
+) -> Path:
+    """
+    DOCX -> raw markdown written to out_path (no front-matter).
+
+    Embedded images are stored under static/ by content hash (see
+    docx_images.py) and referenced by URL instead of inlined as base64.
+    """
+    in_path = Path(in_path)
+    out_path = Path(out_path)
+
+    if not in_path.exists():
+        raise FileNotFoundError(f"input file not found: {in_path}")
+
+    if FAST_PATH if fast_path is None else fast_path:
+        try:
+            convert_docx_fast(in_path, out_path)
+            if report is not None:
+                report["converter"] = "fast"
+            return out_path
+        except (Unsupported, zipfile.BadZipFile) as e:
+            print(f"DOCX fast path: falling back to mammoth ({e})")
+            if report is not None:
+                report["fast_path_fallback"] = str(e)
+
+    if report is not None:
+        report["converter"] = "mammoth"
+    images = default_store()
+    with in_path.open("rb") as f:
+        # convert to markdown (mammoth supports markdown conversion)
+        if images is not None:
+            result = mammoth.convert_to_markdown(f, convert_image=images.mammoth_converter())
+        else:
+            result = mammoth.convert_to_markdown(f)
+        md = result.value
+
+    atomic_write_text(out_path, md)
+    if images is not None and images.images:
+        stats = images.report()
+        print(f"Images: {stats['images']} ({stats['images_written']} new, {stats['images_reused']} already stored)")
+        if report is not None:
+            report.update(stats)
+    return out_path
+
+
+def main():
+    args = sys.argv[1:]
+    fast_path = None
+    if "--no-fast-path" in args:
+        args.remove("--no-fast-path")
+        fast_path = False
+    if len(args) < 2:
+        print("Usage: python tools/convert_docx_to_md.py in.docx out.md [--no-fast-path]")
+        sys.exit(2)
+
+    in_path = Path(args[0])
+    out_path = Path(args[1])
+
+    if not in_path.exists():
+        print("ERROR: input file not found:", in_path)
+        sys.exit(3)
+
+    convert_docx_to_md(in_path, out_path, fast_path=fast_path)
+    print("Converted", in_path, "->", out_path)
+
+
+if __name__ == "__main__":
+    main()
 # # so MDX tries to parse your raw code as JavaScript expressions and explodes.
 
 # # Let’s fix this **once** in the converter, so:
@@ -13,7 +13,8 @@
 # tools/convert_pdf_to_md.py
 """
 Usage:
-    python tools/convert_pdf_to_md.py input.pdf output.md
+    python tools/convert_pdf_to_md.py input.pdf output.md [--jobs N | --stream] [--no-page-cache]
+        [--backend layout|nolayout|pypdf|auto]
 
 This script:
   - extracts text from a PDF using pdfminer.six
@@ -22,12 +23,47 @@ This script:
         ```python title="file-stem"
         ...
         ```
+
+--jobs N (or PDF_EXTRACT_JOBS=N) extracts page ranges in N processes and
+stitches the text back in page order before grouping, so the output is the
+same as a single pass. Blank lines around page breaks are dropped, so code
+blocks that run across a page break merge into one block.
+
+--stream (or PDF_STREAM=1) walks pages one at a time and writes the
+markdown as it goes: memory stays at one page plus the open code block,
+whatever the document size. The output is the same.
+
+Extracted page text is cached per page (tools/pdf_page_cache.py, keyed by
+a fingerprint of the page's content streams and resources), so a revised
+PDF only re-extracts the pages that changed. --no-page-cache skips it.
+
+--backend (or PDF_BACKEND) picks the text extractor, see pdf_backends.py:
+layout (default, pdfminer layout analysis), nolayout (pdfminer without it,
+much faster on plain text documents), pypdf (if installed) or auto (the
+fastest one that keeps the layout backend's lines on the first pages).
 """
 
+import io
+import math
+import multiprocessing
+import os
 import sys
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from pdfminer.high_level import extract_text
+from typing import List, Optional, Tuple
+from pdfminer.pdfpage import PDFPage
+
+from atomic_write import atomic_write_text, atomic_writer
+from line_classifier import CODE, PDF
+from pdf_backends import DEFAULT_BACKEND, choose_backend, get_backend, iter_page_texts
+from pdf_page_cache import PageCache, default_cache
+
+EXTRACT_JOBS = int(os.environ.get("PDF_EXTRACT_JOBS", 1))
+STREAM = os.environ.get("PDF_STREAM", "") not in ("", "0")
+
+# page ranges per worker (more, smaller ranges even out slow pages)
+RANGES_PER_JOB = 4
 
 
 def detect_language(text: str) -> str:
@@ -45,96 +81,295 @@ def detect_language(text: str) -> str:
 
 
 def is_code_line(line: str) -> bool:
-    """Heuristic: decide if a single line looks like code."""
-    stripped = line.rstrip("\n")
-    if not stripped:
-        return False
+    """Heuristic: decide if a single line looks like code (line_classifier.PDF)."""
+    return PDF.is_code(line.rstrip("\n"))
 
-    # 1) indented lines usually indicate code
-    if stripped.startswith(("    ", "\t")):
-        return True
 
-    # 2) Starts with typical keywords
-    if re.match(
-        r'^\s*(import |from .* import |def |class |if |for |while |try:|except|#include|public |private |var |let |const )',
-        stripped,
-    ):
-        return True
+def count_pages(in_path: Path) -> int:
+    with open(in_path, "rb") as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
 
-    # 3) Contains braces or semicolons that look code-ish
-    if any(ch in stripped for ch in ("{", "}", ";", "=>")):
-        return True
 
-    return False
+def _extract_range(args) -> Tuple[str, int, int]:
+    path, page_numbers, cache_root, backend = args
+    cache = PageCache(cache_root) if cache_root else None
+    text = "".join(iter_page_texts(path, set(page_numbers), cache, backend))
+    return text, (cache.hits if cache else 0), (cache.misses if cache else 0)
 
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python tools/convert_pdf_to_md.py input.pdf output.md")
-        sys.exit(1)
+def extract_text_parallel(
+    in_path: Path,
+    jobs: int,
+    cache: Optional[PageCache] = None,
+    backend: str = "layout",
+) -> str:
+    """
+    Same text as a single pass of `backend`, built from page ranges extracted
+    in `jobs` processes. Each page's text ends with a form feed, so joining
+    the ranges in order reproduces the single-pass output exactly.
+    """
+    # pool workers are daemonic and may not start processes of their own
+    if jobs <= 1 or multiprocessing.current_process().daemon:
+        return "".join(iter_page_texts(in_path, cache=cache, backend=backend))
+    pages = count_pages(in_path)
+    if pages < 2:
+        return "".join(iter_page_texts(in_path, cache=cache, backend=backend))
 
-    in_path = Path(sys.argv[1])
-    out_path = Path(sys.argv[2])
+    size = max(1, math.ceil(pages / (jobs * RANGES_PER_JOB)))
+    ranges = [list(range(start, min(start + size, pages))) for start in range(0, pages, size)]
+    cache_root = str(cache.root) if cache is not None else None
+    texts = []
+    with ProcessPoolExecutor(min(jobs, len(ranges))) as ex:
+        for text, hits, misses in ex.map(_extract_range, [(str(in_path), r, cache_root, backend) for r in ranges]):
+            texts.append(text)
+            if cache is not None:
+                cache.hits += hits
+                cache.misses += misses
+                cache.writes += misses
+    return "".join(texts)
 
-    if not in_path.exists():
-        print("ERROR: Input PDF does not exist:", in_path)
-        sys.exit(1)
 
-    # 1) Extract raw text from PDF
-    raw_text = extract_text(str(in_path))
-    lines = raw_text.splitlines()
-
-    md_chunks = []
-    normal_buf = []
-    code_buf = []
-    in_code = False
-
-    def flush_normal():
-        nonlocal normal_buf
-        if normal_buf:
-            # Join adjacent lines into one paragraph
-            para = " ".join(l.strip() for l in normal_buf if l.strip())
-            if para:
-                md_chunks.append(para)
-            normal_buf = []
-
-    def flush_code():
-        nonlocal code_buf
-        if code_buf:
-            code_text = "\n".join(code_buf)
+def page_lines(raw_text: str) -> List[str]:
+    """
+    Lines of the whole document. Blank lines at the top / bottom of each page
+    (around pdfminer's form feed) are dropped, so a code block that runs over
+    a page break stays one block.
+    """
+    lines: List[str] = []
+    for page in raw_text.split("\f"):
+        page_lines = page.splitlines()
+        start, end = 0, len(page_lines)
+        while start < end and not page_lines[start].strip():
+            start += 1
+        while end > start and not page_lines[end - 1].strip():
+            end -= 1
+        lines.extend(page_lines[start:end])
+    return lines
+
+
+def mdx_escape(text: str) -> str:
+    """Escape things that break MDX (like <script>, <iframe>, <2, etc.)."""
+    text = re.sub(r'(?i)<(?=\s*script)', '&lt;', text)
+    text = re.sub(r'(?i)<(?=\s*iframe)', '&lt;', text)
+    return re.sub(r'<(?=\d)', '&lt;', text)
+
+
+# a `<` (plus whitespace) at the end of a piece: whether it opens <script /
+# <iframe depends on the next piece
+OPEN_LT_RE = re.compile(r'<\s*\Z')
+
+
+class MarkdownStream:
+    """
+    Incremental paragraph / code-block grouping: feed() lines (or
+    feed_lines() a page at a time, classified in one batch), close() at the
+    end. Normal text is written as soon as it arrives (runs of non-code
+    lines become one paragraph); a code block is held until it ends, since
+    its fence language depends on the whole block. Chunks are separated by
+    one blank line. Pieces are escaped as they are written, with a trailing
+    `<` held back until the next piece, so the output is what mdx_escape
+    gives on the whole document.
+    """
+
+    def __init__(self, title: str, write):
+        self.title = title
+        self.write = write
+        self.code_buf: List[str] = []
+        self.in_code = False
+        self.in_para = False
+        self.started = False
+        self.held = ""  # unescaped tail: a `<` and the whitespace after it
+
+    def _emit(self, text: str):
+        text = self.held + text
+        m = OPEN_LT_RE.search(text)
+        cut = m.start() if m else len(text)
+        if cut:
+            self.write(mdx_escape(text[:cut]))
+        self.held = text[cut:]
+
+    def _start_chunk(self):
+        if self.started:
+            self._emit("\n\n")
+        self.started = True
+
+    def _flush_code(self):
+        if self.code_buf:
+            code_text = "\n".join(self.code_buf)
             lang = detect_language(code_text)
-            block = f"```{lang} title=\"{in_path.stem}\"\n{code_text}\n```"
-            md_chunks.append(block)
-            code_buf = []
-
-    # 2) Walk through all lines, grouping normal text vs code
-    for line in lines:
-        if is_code_line(line):
-            if not in_code:
-                flush_normal()
-                in_code = True
-            code_buf.append(line.rstrip())
+            self._start_chunk()
+            self._emit(f"```{lang} title=\"{self.title}\"\n{code_text}\n```")
+            self.code_buf = []
+
+    def feed(self, line: str):
+        self._feed(line, is_code_line(line))
+
+    def feed_lines(self, lines: List[str]):
+        for line, label in zip(lines, PDF.classify(lines)):
+            self._feed(line, label == CODE)
+
+    def _feed(self, line: str, code: bool):
+        if code:
+            if not self.in_code:
+                self.in_para = False
+                self.in_code = True
+            self.code_buf.append(line.rstrip())
+            return
+
+        if self.in_code:
+            self._flush_code()
+            self.in_code = False
+        text = line.strip()
+        if not text:
+            return
+        # Join adjacent lines into one paragraph
+        if self.in_para:
+            self._emit(" ")
         else:
-            if in_code:
-                flush_code()
-                in_code = False
-            normal_buf.append(line)
-
-    # flush whatever is left
-    if in_code:
-        flush_code()
+            self._start_chunk()
+            self.in_para = True
+        self._emit(text)
+
+    def close(self):
+        if self.in_code:
+            self._flush_code()
+            self.in_code = False
+        if self.held:
+            self.write(mdx_escape(self.held))
+            self.held = ""
+
+
+def lines_to_markdown(lines: List[str], title: str) -> str:
+    """Group lines into paragraphs / fenced code blocks and make it MDX-safe."""
+    out = io.StringIO()
+    stream = MarkdownStream(title, out.write)
+    stream.feed_lines(lines)
+    stream.close()
+    return out.getvalue()
+
+
+def convert_pdf_to_md_streaming(
+    in_path: Path,
+    out_path: Path,
+    cache: Optional[PageCache] = None,
+    backend: str = "layout",
+) -> Path:
+    """
+    Same output as convert_pdf_to_md, in constant memory: pages come one at
+    a time and markdown is written as it is produced, so only the current
+    page and any open code block are held in memory.
+    """
+    in_path = Path(in_path)
+    if not in_path.exists():
+        raise FileNotFoundError(f"Input PDF does not exist: {in_path}")
+
+    with atomic_writer(out_path) as f:
+        stream = MarkdownStream(in_path.stem, f.write)
+        for text in iter_page_texts(in_path, cache=cache, backend=backend):
+            stream.feed_lines(page_lines(text))
+        stream.close()
+    return Path(out_path)
+
+
+def convert_pdf_to_md(
+    in_path: Path,
+    out_path: Path,
+    jobs: Optional[int] = None,
+    stream: Optional[bool] = None,
+    page_cache: bool = True,
+    report: Optional[dict] = None,
+    backend: Optional[str] = None,
+) -> Path:
+    """
+    PDF -> markdown with fenced code snippets written to out_path.
+
+    backend picks the text extractor (see pdf_backends.py; default
+    PDF_BACKEND). page_cache=False skips the per-page extraction cache; pass
+    a dict as `report` to get the backend used, page counts and cache hit
+    rates back.
+    """
+    in_path = Path(in_path)
+    out_path = Path(out_path)
+
+    if not in_path.exists():
+        raise FileNotFoundError(f"Input PDF does not exist: {in_path}")
+
+    backend = backend or DEFAULT_BACKEND
+    if backend == "auto":
+        backend, trials = choose_backend(in_path)
+        sampled = ", ".join(f"{name} {t['seconds']:.3f}s" for name, t in trials.items())
+        print(f"PDF backend: {backend} (auto; sampled {sampled})")
+        if report is not None:
+            report["backend_trials"] = trials
     else:
-        flush_normal()
+        get_backend(backend)  # fail fast on unknown / missing backends
+    if report is not None:
+        report["backend"] = backend
 
-    md = "\n\n".join(chunk for chunk in md_chunks if chunk.strip())
+    cache = default_cache() if page_cache else None
+    if STREAM if stream is None else stream:
+        convert_pdf_to_md_streaming(in_path, out_path, cache, backend)
+    else:
+        # 1) Extract raw text from PDF (page ranges in parallel if jobs > 1)
+        raw_text = extract_text_parallel(in_path, EXTRACT_JOBS if jobs is None else jobs, cache, backend)
+        lines = page_lines(raw_text)
+
+        # 2) Group into paragraphs / code blocks, 3) escape for MDX
+        md = lines_to_markdown(lines, in_path.stem)
+
+        atomic_write_text(out_path, md)
+
+    if cache is not None:
+        if cache.writes:
+            cache.evict()
+        stats = cache.report()
+        print(
+            f"Page cache: {stats['page_cache_hits']}/{stats['pages']} pages reused "
+            f"({stats['page_cache_hit_rate']:.0%}) for {in_path.name}"
+        )
+        if report is not None:
+            report.update(stats)
+    return out_path
 
-    # 3) Escape things that break MDX (like <script>, <iframe>, <2, etc.)
-    md = re.sub(r'(?i)<(?=\s*script)', '&lt;', md)
-    md = re.sub(r'(?i)<(?=\s*iframe)', '&lt;', md)
-    md = re.sub(r'<(?=\d)', '&lt;', md)
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(md, encoding="utf-8")
+def main():
+    args = sys.argv[1:]
+    jobs = None
+    stream = None
+    if "--jobs" in args:
+        i = args.index("--jobs")
+        jobs = int(args[i + 1])
+        del args[i:i + 2]
+    if "--stream" in args:
+        args.remove("--stream")
+        stream = True
+    page_cache = "--no-page-cache" not in args
+    if not page_cache:
+        args.remove("--no-page-cache")
+    backend = None
+    if "--backend" in args:
+        i = args.index("--backend")
+        backend = args[i + 1]
+        del args[i:i + 2]
+    if len(args) != 2:
+        print(
+            "Usage: python tools/convert_pdf_to_md.py input.pdf output.md "
+            "[--jobs N | --stream] [--no-page-cache] [--backend layout|nolayout|pypdf|auto]"
+        )
+        sys.exit(1)
+
+    in_path = Path(args[0])
+    out_path = Path(args[1])
+
+    if not in_path.exists():
+        print("ERROR: Input PDF does not exist:", in_path)
+        sys.exit(1)
+
+    try:
+        convert_pdf_to_md(in_path, out_path, jobs, stream, page_cache, backend=backend)
+    except ValueError as e:  # unknown / missing backend
+        print("ERROR:", e)
+        sys.exit(1)
     print("Converted PDF →", out_path)
 
 
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+tools/doc_manifest.py
+
+Incremental batch runs for the clean-up tools (the directory modes of
+mdx_safe.py, auto_snippet.py and fix_mdx.py). A manifest next to the docs
+tree remembers, per tool, the state of every file after the tool last
+processed it; the next run only touches files whose content or tool
+version changed.
+
+Layout (<dir>/.md_manifest.json, <dir> being the directory the tool ran on):
+
+    {"mdx_safe": {"modules/module1/teama/week1.md":
+        {"size": 1234, "mtime_ns": ..., "sha256": ..., "tool": "<tool version>"}, ...}, ...}
+
+The tool version is a hash of the tool's sources (and of the modules its
+output depends on), so editing a tool reprocesses everything it covers.
+
+A file is current when its entry has the tool's version and its size and
+mtime match (no read), or, if those changed, its sha256 still matches (the
+entry's stat is then refreshed). Like git's index, an entry whose mtime is
+not older than the manifest file itself is "racy" and is always hashed.
+
+    manifest = DocManifest.load(target, "mdx_safe", tool_version(FILES))
+    for p in sorted(target.rglob("*.md")):
+        if not force and manifest.is_current(p):
+            continue
+        mdx_safe_file(p)
+        manifest.record(p)
+    manifest.save()
+    print(manifest.summary())
+
+Usage:
+    python tools/doc_manifest.py <dir>             # tools and entries in <dir>'s manifest
+    python tools/doc_manifest.py <dir> clear [tool]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from atomic_write import atomic_write_text
+
+MANIFEST_NAME = ".md_manifest.json"
+TOOLS = Path(__file__).resolve().parent
+
+
+def tool_version(files: Sequence[str], tools_dir: Path = TOOLS) -> str:
+    """Short hash over the given tool sources."""
+    h = hashlib.sha256()
+    for name in files:
+        p = tools_dir / name
+        h.update(name.encode())
+        if p.exists():
+            h.update(p.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def parse_force(argv: Sequence[str]):
+    """(args without --force, force)."""
+    args = [a for a in argv if a != "--force"]
+    return args, len(args) != len(argv)
+
+
+class DocManifest:
+    """One tool's section of a directory's manifest, plus run counters."""
+
+    def __init__(self, root: Path, tool: str, version: str, data: Optional[dict] = None,
+                 saved_ns: int = 0):
+        self.root = Path(root)
+        self.tool = tool
+        self.version = version
+        self.data: Dict[str, dict] = data if data is not None else {}
+        self.entries: Dict[str, dict] = self.data.setdefault(tool, {})
+        self.saved_ns = saved_ns  # mtime of the manifest file when loaded
+        self.seen = set()
+        self.skipped = 0
+        self.processed = 0
+        self.dirty = False
+
+    @property
+    def path(self) -> Path:
+        return self.root / MANIFEST_NAME
+
+    @classmethod
+    def load(cls, root: Path, tool: str, version: str) -> "DocManifest":
+        path = Path(root) / MANIFEST_NAME
+        try:
+            saved_ns = path.stat().st_mtime_ns
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if not isinstance(data, dict):
+                data = None
+        except (OSError, ValueError):
+            data, saved_ns = None, 0
+        return cls(root, tool, version, data, saved_ns)
+
+    def _key(self, path: Path) -> str:
+        try:
+            return Path(path).relative_to(self.root).as_posix()
+        except ValueError:
+            return Path(path).resolve().as_posix()
+
+    def is_current(self, path: Path) -> bool:
+        """True if path is unchanged since this tool version processed it (counted as skipped)."""
+        key = self._key(path)
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry is None or entry.get("tool") != self.version:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if (st.st_size == entry.get("size") and st.st_mtime_ns == entry.get("mtime_ns")
+                and st.st_mtime_ns < self.saved_ns):
+            self.skipped += 1
+            return True
+        if st.st_size != entry.get("size") or file_sha256(path) != entry.get("sha256"):
+            return False
+        # touched, or racy, but the same content: saving again moves the
+        # manifest's mtime past the file's, so the next run can trust stat
+        entry["mtime_ns"] = st.st_mtime_ns
+        self.dirty = True
+        self.skipped += 1
+        return True
+
+    def record(self, path: Path):
+        """Remember path's current state as processed by this tool version."""
+        key = self._key(path)
+        self.seen.add(key)
+        st = os.stat(path)
+        self.entries[key] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": file_sha256(path),
+            "tool": self.version,
+        }
+        self.processed += 1
+        self.dirty = True
+
+    def save(self):
+        """Drop entries of files not seen this run and write the manifest (if anything changed)."""
+        for key in [k for k in self.entries if k not in self.seen]:
+            del self.entries[key]
+            self.dirty = True
+        if self.dirty:
+            atomic_write_text(self.path, json.dumps(self.data, indent=1, sort_keys=True))
+            self.dirty = False
+
+    def summary(self) -> str:
+        return f"{self.processed} processed, {self.skipped} skipped (unchanged)"
+
+
+def main():
+    if len(sys.argv) < 2 or (len(sys.argv) > 2 and sys.argv[2] != "clear"):
+        print(__doc__.split("Usage:", 1)[1])
+        sys.exit(2)
+    path = Path(sys.argv[1]) / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        print("No manifest at", path)
+        return
+    if len(sys.argv) == 2:
+        for tool, entries in sorted(data.items()):
+            versions = sorted({e.get("tool") for e in entries.values()})
+            print(f"{tool}: {len(entries)} files (tool version {', '.join(map(str, versions))})")
+        return
+    if len(sys.argv) > 3:
+        data.pop(sys.argv[3], None)
+        atomic_write_text(path, json.dumps(data, indent=1, sort_keys=True))
+        print(f"Cleared {sys.argv[3]} in", path)
+    else:
+        path.unlink()
+        print("Removed", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+tools/doc_model.py
+
+Typed document model for converted markdown. The clean-up tools
+(mdx_safe.py, sanitize_and_wrap.py, fix_mdx.py, auto_snippet.py,
+sanitize_existing_md.py) are passes over one parsed Document instead of each
+re-reading, re-splitting and re-writing the file:
+
+    doc = parse(text)
+    mdx_safe.make_mdx_safe(doc, "week1.md")       # passes edit doc.blocks
+    sanitize_and_wrap.sanitize_doc(doc, "teama week1")
+    text = serialize(doc)
+
+A document is an optional FrontMatter plus a flat list of blocks:
+
+    Heading      one "# ..." line (level, text)
+    Paragraph    consecutive text lines
+    Blank        consecutive blank lines
+    RawHtml      consecutive lines that start with a tag or <!--
+    FencedCode   ``` / ~~~ block: opener line, body lines, closer line
+                 (closer is None when the file ends inside the fence)
+
+Blocks keep their source lines verbatim, so parse -> serialize only changes
+line endings (all become "\\n"). Passes that rewrite lines feed them back
+through a Builder, which classifies them exactly like the parser, so a
+document never needs re-parsing from text between passes.
+
+Usage:
+    python tools/doc_model.py file.md     # print the block structure
+"""
+
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Type
+
+HEADING_RE = re.compile(r"\s*(#{1,6})\s+(.*)")
+HTML_RE = re.compile(r"<(?:!--|/?[A-Za-z])")
+FENCE_MARKERS = ("```", "~~~")
+
+
+class FrontMatter:
+    """YAML front matter, delimiters included."""
+
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+
+    def to_lines(self) -> List[str]:
+        return self.lines
+
+
+class Heading:
+    __slots__ = ("line", "level", "text")
+
+    def __init__(self, line: str, level: int, text: str):
+        self.line = line
+        self.level = level
+        self.text = text
+
+    def to_lines(self) -> List[str]:
+        return [self.line]
+
+
+class Paragraph:
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+
+    def to_lines(self) -> List[str]:
+        return self.lines
+
+
+class Blank:
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+
+    def to_lines(self) -> List[str]:
+        return self.lines
+
+
+class RawHtml:
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+
+    def to_lines(self) -> List[str]:
+        return self.lines
+
+
+class FencedCode:
+    __slots__ = ("opener", "lines", "closer")
+
+    def __init__(self, opener: str, lines: List[str], closer: Optional[str] = "```"):
+        self.opener = opener
+        self.lines = lines
+        self.closer = closer
+
+    @property
+    def marker(self) -> str:
+        return self.opener.lstrip()[:3]
+
+    @property
+    def info(self) -> str:
+        return self.opener.lstrip()[3:].strip()
+
+    def to_lines(self) -> List[str]:
+        if self.closer is None:
+            return [self.opener, *self.lines]
+        return [self.opener, *self.lines, self.closer]
+
+
+# blocks whose lines can be appended to
+_RUNS = (Paragraph, Blank, RawHtml)
+
+
+class Document:
+    __slots__ = ("front_matter", "blocks", "trailing_newline")
+
+    def __init__(self, front_matter: Optional[FrontMatter], blocks: list, trailing_newline: bool = False):
+        self.front_matter = front_matter
+        self.blocks = blocks
+        self.trailing_newline = trailing_newline
+
+
+def is_fence_line(line: str) -> bool:
+    return line.lstrip().startswith(FENCE_MARKERS)
+
+
+def classify(line: str) -> Type:
+    """Block type a line outside fences belongs to."""
+    stripped = line.lstrip()
+    if not stripped:
+        return Blank
+    if stripped[0] == "#" and HEADING_RE.match(line):
+        return Heading
+    if stripped.startswith("<") and HTML_RE.match(stripped):
+        return RawHtml
+    return Paragraph
+
+
+class Builder:
+    """Appends lines / blocks, grouping lines into blocks like the parser."""
+
+    __slots__ = ("blocks", "_fence")
+
+    def __init__(self):
+        self.blocks: list = []
+        self._fence: Optional[FencedCode] = None
+
+    def line(self, line: str):
+        fence = self._fence
+        if fence is not None:
+            if is_fence_line(line):
+                fence.closer = line
+                self._fence = None
+            else:
+                fence.lines.append(line)
+            return
+        if is_fence_line(line):
+            self._fence = FencedCode(line, [], None)
+            self.blocks.append(self._fence)
+            return
+        kind = classify(line)
+        blocks = self.blocks
+        if kind is Heading:
+            m = HEADING_RE.match(line)
+            blocks.append(Heading(line, len(m.group(1)), m.group(2)))
+        elif blocks and type(blocks[-1]) is kind:
+            blocks[-1].lines.append(line)
+        else:
+            blocks.append(kind([line]))
+
+    def lines(self, lines):
+        for line in lines:
+            self.line(line)
+
+    def block(self, block):
+        """Append a finished block (an open fence is left as is)."""
+        self._fence = None
+        self.blocks.append(block)
+
+
+def parse_lines(lines: List[str]) -> list:
+    """Group body lines into blocks (Builder.line, unrolled for speed)."""
+    blocks: list = []
+    append = blocks.append
+    fence = None
+    last = None  # block lines are appended to, if it is a run
+    for line in lines:
+        stripped = line.lstrip()
+        if fence is not None:
+            if stripped.startswith(FENCE_MARKERS):
+                fence.closer = line
+                fence = None
+            else:
+                fence.lines.append(line)
+            continue
+        if not stripped:
+            kind = Blank
+        elif stripped.startswith(FENCE_MARKERS):
+            fence = FencedCode(line, [], None)
+            append(fence)
+            last = None
+            continue
+        elif stripped[0] == "#" and HEADING_RE.match(line):
+            m = HEADING_RE.match(line)
+            append(Heading(line, len(m.group(1)), m.group(2)))
+            last = None
+            continue
+        elif stripped[0] == "<" and HTML_RE.match(stripped):
+            kind = RawHtml
+        else:
+            kind = Paragraph
+        if type(last) is kind:
+            last.lines.append(line)
+        else:
+            last = kind([line])
+            append(last)
+    return blocks
+
+
+def parse(text: str, front_matter: bool = True) -> Document:
+    """Markdown text -> Document (front_matter=False: the text is a body)."""
+    lines = text.splitlines()
+    fm = None
+    start = 0
+    if front_matter and lines and lines[0].strip() == "---":
+        for i in range(1, len(lines)):
+            if lines[i].strip() == "---":
+                fm = FrontMatter(lines[: i + 1])
+                start = i + 1
+                break
+    return Document(fm, parse_lines(lines[start:]), text.endswith(("\n", "\r")))
+
+
+def body_lines(doc: Document) -> List[str]:
+    out: List[str] = []
+    for block in doc.blocks:
+        out.extend(block.to_lines())
+    return out
+
+
+def serialize(doc: Document) -> str:
+    lines = body_lines(doc)
+    if doc.front_matter is not None:
+        lines = doc.front_matter.lines + lines
+    text = "\n".join(lines)
+    return text + "\n" if doc.trailing_newline and lines else text
+
+
+def read(path: Path) -> Document:
+    return parse(Path(path).read_text(encoding="utf-8", errors="ignore"))
+
+
+# ---- helpers for passes ----
+
+def text_blocks(doc: Document) -> Iterator:
+    """Every block outside code fences."""
+    return (b for b in doc.blocks if not isinstance(b, FencedCode))
+
+
+def fences(doc: Document) -> Iterator[FencedCode]:
+    return (b for b in doc.blocks if isinstance(b, FencedCode))
+
+
+def map_text_lines(doc: Document, fn: Callable[[str], str], skip: Tuple[Type, ...] = ()) -> int:
+    """
+    Apply fn to every line outside code fences (and outside `skip` blocks).
+    If a changed line no longer fits its block (a stripped tag can turn a
+    RawHtml line into text), the blocks are regrouped as the parser would.
+    Returns the number of changed lines.
+    """
+    changed = 0
+    regroup = False
+    updates = {}
+    for block in doc.blocks:
+        if isinstance(block, FencedCode) or isinstance(block, skip):
+            continue
+        old = block.to_lines()
+        new = [fn(line) for line in old]
+        if new == old:
+            continue
+        kind = type(block)
+        for x, y in zip(old, new):
+            if x != y:
+                changed += 1
+                if not regroup and (is_fence_line(y) or classify(y) is not kind):
+                    regroup = True
+        updates[id(block)] = (block, new)
+
+    if not regroup:
+        for block, new in updates.values():
+            if isinstance(block, Heading):
+                m = HEADING_RE.match(new[0])
+                block.line, block.level, block.text = new[0], len(m.group(1)), m.group(2)
+            else:
+                block.lines = new
+        return changed
+
+    b = Builder()
+    for block in doc.blocks:
+        update = updates.get(id(block))
+        if update is None:
+            b.block(block)
+        else:
+            b.lines(update[1])
+    doc.blocks = _merge(b.blocks)
+    return changed
+
+
+def _merge(blocks: list) -> list:
+    """Join neighbouring blocks of the same run type."""
+    out: list = []
+    for block in blocks:
+        if out and type(block) in _RUNS and type(out[-1]) is type(block):
+            out[-1] = type(block)(out[-1].lines + block.lines)
+        else:
+            out.append(block)
+    return out
+
+
+def close_open_fence(doc: Document) -> bool:
+    """Close a fence the file ends inside of; True if one was closed."""
+    if doc.blocks and isinstance(doc.blocks[-1], FencedCode) and doc.blocks[-1].closer is None:
+        doc.blocks[-1].closer = "```"
+        return True
+    return False
+
+
+def trim_end(doc: Document):
+    """
+    No final newline and no blank lines at the end: what writing
+    "\\n".join(lines) and reading the file back converges to. (Doing that
+    once drops just one of them, so it is not a fixed point.)
+    """
+    doc.trailing_newline = False
+    blocks = doc.blocks
+    while blocks and isinstance(blocks[-1], Blank):
+        blocks.pop()
+    last = blocks[-1] if blocks else None
+    if isinstance(last, FencedCode) and last.closer is None:
+        while last.lines and not last.lines[-1].strip():
+            last.lines.pop()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python tools/doc_model.py <file.md>")
+        sys.exit(2)
+    doc = read(Path(sys.argv[1]))
+    if doc.front_matter is not None:
+        print(f"FrontMatter  {len(doc.front_matter.lines)} lines")
+    for block in doc.blocks:
+        name = type(block).__name__
+        if isinstance(block, Heading):
+            print(f"{name:<12} h{block.level} {block.text[:60]}")
+        elif isinstance(block, FencedCode):
+            state = "" if block.closer is not None else " (unclosed)"
+            print(f"{name:<12} {len(block.lines)} lines {block.info[:50]!r}{state}")
+        else:
+            print(f"{name:<12} {len(block.lines)} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+tools/docx_fastpath.py
+
+Streaming DOCX -> markdown for the documents we mostly get: paragraphs,
+headings, flat bullet / numbered lists, bold / italic, links, and code set
+in a monospace font or a "Code"-like style. word/document.xml is read
+straight out of the zip with iterparse and every top-level element is
+written out and dropped as soon as it closes, so memory does not grow
+with the document.
+
+Text comes out the way mammoth writes it (same escaping, headings, list
+markers), except that runs of code paragraphs become fenced blocks right
+away instead of escaped prose for mdx_safe.py to re-detect later.
+
+Anything else (tables, images, fields, tracked changes, nested lists,
+footnotes, ...) raises Unsupported; convert_docx_to_md.py then discards the
+partial output and converts the file with mammoth.
+
+Usage:
+    python tools/docx_fastpath.py input.docx output.md
+"""
+
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from atomic_write import atomic_writer
+from mdx_safe import guess_language, guess_title_from_heading
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+HYPERLINK_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
+MONOSPACE_FONTS = {
+    "consolas", "courier", "courier new", "lucida console", "lucida sans typewriter",
+    "menlo", "monaco", "source code pro", "dejavu sans mono", "liberation mono",
+    "fira code", "fira mono", "jetbrains mono", "cascadia code", "cascadia mono",
+    "roboto mono", "ubuntu mono", "sf mono", "andale mono", "inconsolata",
+}
+CODE_STYLE_RE = re.compile(r"code|preformatted|monospace", re.IGNORECASE)
+# mammoth's default style map: p.Heading1, 'Heading 1', 'heading 1', Apple Pages' 'Heading'
+HEADING_RE = re.compile(r"heading ?([1-6])?", re.IGNORECASE)
+
+# paragraph / run children that carry no text
+SKIP_IN_PARAGRAPH = {"pPr", "proofErr", "bookmarkEnd", "permStart", "permEnd",
+                     "commentRangeStart", "commentRangeEnd"}
+SKIP_IN_RUN = {"rPr", "lastRenderedPageBreak"}
+
+
+class Unsupported(Exception):
+    """The document uses something only the mammoth converter handles."""
+
+
+class Style(NamedTuple):
+    name: str
+    based_on: Optional[str]
+    mono: bool
+    numbered: bool
+
+
+class Segment(NamedTuple):
+    text: str
+    bold: bool
+    italic: bool
+    mono: bool
+    href: Optional[str] = None
+    raw: bool = False  # already markdown / HTML (bookmark anchors)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _on(el) -> bool:
+    """w:b / w:i style toggles, read the way mammoth does."""
+    return el is not None and el.get(W + "val") not in ("false", "0")
+
+
+def _mono_fonts(rpr) -> bool:
+    fonts = rpr.find(W + "rFonts") if rpr is not None else None
+    if fonts is None:
+        return False
+    name = fonts.get(W + "ascii") or fonts.get(W + "hAnsi") or ""
+    return name.lower() in MONOSPACE_FONTS
+
+
+def escape_markdown(text: str) -> str:
+    """mammoth's markdown escaping."""
+    return re.sub(r"([\`\*_\{\}\[\]\(\)\#\+\-\.\!])", r"\\\1", text.replace("\\", "\\\\"))
+
+
+def _escape_attr(value: str) -> str:
+    return value.replace("&", "&amp;").replace('"', "&quot;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def read_styles(z: zipfile.ZipFile) -> Dict[str, Style]:
+    try:
+        root = ET.fromstring(z.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    styles = {}
+    for s in root.iter(W + "style"):
+        name = s.find(W + "name")
+        based = s.find(W + "basedOn")
+        ppr = s.find(W + "pPr")
+        styles[s.get(W + "styleId")] = Style(
+            name=name.get(W + "val") if name is not None else "",
+            based_on=based.get(W + "val") if based is not None else None,
+            mono=_mono_fonts(s.find(W + "rPr")),
+            numbered=ppr is not None and ppr.find(W + "numPr") is not None,
+        )
+    return styles
+
+
+def read_numbering(z: zipfile.ZipFile) -> Dict[str, bool]:
+    """numId -> ordered? (for list level 0)."""
+    try:
+        root = ET.fromstring(z.read("word/numbering.xml"))
+    except KeyError:
+        return {}
+    abstract = {}
+    for a in root.iter(W + "abstractNum"):
+        for lvl in a.iter(W + "lvl"):
+            if lvl.get(W + "ilvl") == "0":
+                fmt = lvl.find(W + "numFmt")
+                abstract[a.get(W + "abstractNumId")] = fmt is not None and fmt.get(W + "val") != "bullet"
+    ordered = {}
+    for num in root.iter(W + "num"):
+        ref = num.find(W + "abstractNumId")
+        if ref is not None:
+            ordered[num.get(W + "numId")] = abstract.get(ref.get(W + "val"), False)
+    return ordered
+
+
+def read_links(z: zipfile.ZipFile) -> Dict[str, str]:
+    try:
+        root = ET.fromstring(z.read("word/_rels/document.xml.rels"))
+    except KeyError:
+        return {}
+    return {r.get("Id"): r.get("Target") for r in root.iter(REL) if r.get("Type") == HYPERLINK_REL}
+
+
+class FastPathWriter:
+    """Turns body-level elements into markdown, one at a time."""
+
+    def __init__(self, write, styles: Dict[str, Style], numbering: Dict[str, bool],
+                 links: Dict[str, str], title: str):
+        self.write = write
+        self.styles = styles
+        self.numbering = numbering
+        self.links = links
+        self.base_title = title
+        self.current_title = title
+        self.code: List[str] = []
+        self.list_ordered: Optional[bool] = None  # None: not in a list
+        self.list_count = 0
+
+    # ---- styles ----
+
+    def _style_chain(self, style_id: Optional[str]):
+        seen = set()
+        while style_id and style_id not in seen and style_id in self.styles:
+            seen.add(style_id)
+            yield style_id, self.styles[style_id]
+            style_id = self.styles[style_id].based_on
+
+    def _is_code_style(self, style_id: Optional[str]) -> bool:
+        return any(CODE_STYLE_RE.search(s.name or sid) or s.mono for sid, s in self._style_chain(style_id))
+
+    def _heading_level(self, style_id: Optional[str]) -> int:
+        if not style_id:
+            return 0
+        style = self.styles.get(style_id)
+        for candidate in (style_id, style.name if style else ""):
+            m = HEADING_RE.fullmatch(candidate)
+            if m and (m.group(1) or candidate.lower() == "heading"):
+                return int(m.group(1) or 1)
+        return 0
+
+    # ---- runs ----
+
+    def _run(self, r, href: Optional[str], out: List[Segment]):
+        rpr = r.find(W + "rPr")
+        bold = italic = mono = False
+        if rpr is not None:
+            bold = _on(rpr.find(W + "b"))
+            italic = _on(rpr.find(W + "i"))
+            mono = _mono_fonts(rpr)
+            rstyle = rpr.find(W + "rStyle")
+            if rstyle is not None:
+                sid = rstyle.get(W + "val")
+                style = self.styles.get(sid)
+                if style is not None and style.name == "Strong":
+                    bold = True
+                mono = mono or self._is_code_style(sid)
+        for child in r:
+            tag = _local(child.tag)
+            if tag == "t":
+                text = child.text or ""
+            elif tag == "tab":
+                text = "\t"
+            elif tag == "br":
+                kind = child.get(W + "type")
+                if kind in ("page", "column"):
+                    continue
+                if kind not in (None, "textWrapping"):
+                    raise Unsupported(f"break type {kind}")
+                text = "\n"
+            elif tag in SKIP_IN_RUN:
+                continue
+            else:
+                raise Unsupported(tag)
+            out.append(Segment(text, bold, italic, mono, href))
+
+    def _segments(self, p) -> List[Segment]:
+        out: List[Segment] = []
+        for child in p:
+            tag = _local(child.tag)
+            if tag == "r":
+                self._run(child, None, out)
+            elif tag == "hyperlink":
+                rel, anchor = child.get(R_ID), child.get(W + "anchor")
+                if rel is not None:
+                    if rel not in self.links:
+                        raise Unsupported("internal hyperlink target")
+                    href = self.links[rel] + (f"#{anchor}" if anchor else "")
+                elif anchor is not None:
+                    href = f"#{anchor}"
+                else:
+                    raise Unsupported("hyperlink without target")
+                for r in child:
+                    if _local(r.tag) != "r":
+                        raise Unsupported(f"hyperlink/{_local(r.tag)}")
+                    self._run(r, href, out)
+            elif tag == "bookmarkStart":
+                name = child.get(W + "name")
+                if name != "_GoBack":
+                    out.append(Segment(f'<a id="{_escape_attr(name or "")}"></a>', False, False, False, raw=True))
+            elif tag in SKIP_IN_PARAGRAPH:
+                continue
+            else:
+                raise Unsupported(tag)
+        return out
+
+    @staticmethod
+    def _inline(segments: List[Segment]) -> str:
+        """Markdown for prose segments, nested and merged the way mammoth does."""
+        parts: List[str] = []
+        i, n = 0, len(segments)
+        while i < n:
+            seg = segments[i]
+            if seg.raw:
+                parts.append(seg.text)
+                i += 1
+                continue
+            if seg.href is not None:
+                j = i
+                while j < n and segments[j].href == seg.href and not segments[j].raw:
+                    j += 1
+                inner = [s._replace(href=None) for s in segments[i:j]]
+                parts.append(f"[{FastPathWriter._inline(inner)}]({escape_markdown(seg.href)})")
+                i = j
+                continue
+            j = i
+            while j < n and segments[j].bold == seg.bold and segments[j].href is None and not segments[j].raw:
+                j += 1
+            group = segments[i:j]
+            body: List[str] = []
+            k = 0
+            while k < len(group):
+                m = k
+                while m < len(group) and group[m].italic == group[k].italic:
+                    m += 1
+                text = "".join(s.text for s in group[k:m])
+                text = escape_markdown(text).replace("\n", "  \n")
+                if text:
+                    body.append(f"*{text}*" if group[k].italic else text)
+                k = m
+            if body:
+                parts.append(f"__{''.join(body)}__" if seg.bold else "".join(body))
+            i = j
+        return "".join(parts)
+
+    # ---- blocks ----
+
+    def _flush_code(self):
+        if not self.code:
+            return
+        while self.code and not self.code[-1].strip():
+            self.code.pop()
+        if self.code:
+            lang = guess_language(self.code[0])
+            self.write(f'```{lang} title="{self.current_title}"\n' + "\n".join(self.code) + "\n```\n\n")
+        self.code = []
+
+    def _close_list(self):
+        if self.list_ordered is not None:
+            self.write("\n")
+            self.list_ordered = None
+
+    def paragraph(self, p):
+        ppr = p.find(W + "pPr")
+        style_id = num_id = None
+        ilvl = "0"
+        if ppr is not None:
+            ps = ppr.find(W + "pStyle")
+            style_id = ps.get(W + "val") if ps is not None else None
+            rpr = ppr.find(W + "rPr")
+            if rpr is not None and (rpr.find(W + "del") is not None or rpr.find(W + "ins") is not None):
+                raise Unsupported("tracked paragraph change")
+            numpr = ppr.find(W + "numPr")
+            if numpr is not None:
+                nid, lvl = numpr.find(W + "numId"), numpr.find(W + "ilvl")
+                num_id = nid.get(W + "val") if nid is not None else None
+                ilvl = lvl.get(W + "val") if lvl is not None else "0"
+        if num_id is None and any(s.numbered for _, s in self._style_chain(style_id)):
+            raise Unsupported("list style")
+        if num_id == "0":
+            num_id = None
+
+        segments = self._segments(p)
+        text_segments = [s for s in segments if not s.raw and s.text.strip()]
+        is_code = self._is_code_style(style_id) or (text_segments and all(s.mono for s in text_segments))
+        if is_code and not any(s.raw for s in segments) and not any(s.href for s in segments):
+            if not self.code:
+                self._close_list()
+            self.code.extend("".join(s.text for s in segments).split("\n"))
+            return
+        if not segments and self.code:
+            self.code.append("")  # empty paragraph inside a code block
+            return
+
+        self._flush_code()
+        md = self._inline(segments)
+        level = self._heading_level(style_id)
+        if num_id is not None:
+            if ilvl != "0":
+                raise Unsupported("nested list")
+            if not md:
+                return
+            ordered = self.numbering.get(num_id, False)
+            if self.list_ordered is not None and self.list_ordered != ordered:
+                self._close_list()
+            if self.list_ordered is None:
+                self.list_ordered = ordered
+                self.list_count = 0
+            self.list_count += 1
+            self.write(f"{self.list_count}. " if ordered else "- ")
+            self.write(md + "\n")
+            return
+
+        self._close_list()
+        if not md:
+            return
+        if level:
+            heading = "".join(s.text for s in segments if not s.raw)
+            self.current_title = guess_title_from_heading(heading, self.base_title)
+            self.write("#" * level + " " + md + "\n\n")
+        else:
+            self.write(md + "\n\n")
+
+    def close(self):
+        self._flush_code()
+        self._close_list()
+
+
+def convert_docx_fast(in_path: Path, out_path: Path) -> Path:
+    """
+    DOCX -> raw markdown (no front-matter), streamed. Raises Unsupported
+    (leaving out_path untouched) if the document needs the full converter.
+    """
+    in_path = Path(in_path)
+    with zipfile.ZipFile(in_path) as z:
+        styles, numbering, links = read_styles(z), read_numbering(z), read_links(z)
+        try:
+            doc = z.open("word/document.xml")
+        except KeyError:
+            raise Unsupported("no word/document.xml")
+        with doc, atomic_writer(out_path) as f:
+            writer = FastPathWriter(f.write, styles, numbering, links, in_path.stem)
+            depth = 0
+            body = None
+            for event, el in ET.iterparse(doc, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and el.tag == W + "body":
+                        body = el
+                    continue
+                depth -= 1
+                if depth != 2 or body is None:
+                    continue
+                # a body-level element just closed: write it, then drop it
+                tag = _local(el.tag)
+                if tag == "p":
+                    writer.paragraph(el)
+                elif tag == "bookmarkStart" and el.get(W + "name") != "_GoBack":
+                    raise Unsupported("bookmark outside a paragraph")
+                elif tag not in ("sectPr", "bookmarkStart", "bookmarkEnd", "proofErr"):
+                    raise Unsupported(tag)
+                body.clear()
+            writer.close()
+    return Path(out_path)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python tools/docx_fastpath.py input.docx output.md")
+        sys.exit(2)
+    try:
+        convert_docx_fast(Path(sys.argv[1]), Path(sys.argv[2]))
+    except Unsupported as e:
+        print("Not supported by the fast path:", e)
+        sys.exit(1)
+    print("Converted", sys.argv[1], "->", sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
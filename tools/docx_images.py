@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+tools/docx_images.py
+
+Images embedded in DOCX uploads, stored as static assets instead of base64
+data: URIs in the markdown. Each image is written once under
+static/img/docx/ as <sha256 prefix>.<ext>, so the same screenshot in many
+documents (or many re-uploads) is one file, and the markdown only carries
+a short URL (/img/docx/<name>).
+
+With Pillow installed (pip install Pillow), raster images wider or taller
+than DOCX_IMAGE_MAX_PX are downscaled and re-encoded in their own format;
+the result is kept only when it is smaller. The limit is part of the file
+name, so changing it never serves a stale rendition.
+
+Config (env):
+    DOCX_IMAGE_DIR     where images go (default static/img/docx; "" keeps
+                       mammoth's inline data: URIs)
+    DOCX_IMAGE_URL     URL prefix for that directory (default /img/docx)
+    DOCX_IMAGE_MAX_PX  longest side after downscaling (default 1600, 0 = off)
+
+Usage:
+    python tools/docx_images.py stats
+    python tools/docx_images.py gc [docs_dir]   # drop images no doc references
+"""
+
+import hashlib
+import io
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+from atomic_write import atomic_write_bytes
+
+try:
+    from PIL import Image
+except ImportError:  # no downscaling
+    Image = None
+
+ROOT = Path(__file__).resolve().parent.parent
+_dir = os.environ.get("DOCX_IMAGE_DIR")
+IMAGE_DIR: Optional[Path] = ROOT / "static" / "img" / "docx" if _dir is None else (Path(_dir) if _dir else None)
+IMAGE_URL = os.environ.get("DOCX_IMAGE_URL", "/img/docx").rstrip("/")
+MAX_PX = int(os.environ.get("DOCX_IMAGE_MAX_PX", 1600))
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/gif": "gif",
+    "image/bmp": "bmp",
+    "image/tiff": "tif",
+    "image/svg+xml": "svg",
+    "image/webp": "webp",
+    "image/x-emf": "emf",
+    "image/x-wmf": "wmf",
+}
+# formats Pillow may re-encode (vector / metafile images are stored as is)
+RESAMPLE_FORMATS = {"png": "PNG", "jpg": "JPEG", "bmp": "BMP", "webp": "WEBP"}
+
+
+def downscale(data: bytes, ext: str, max_px: int) -> bytes:
+    """`data` shrunk to fit max_px, if that makes it smaller; else `data`."""
+    fmt = RESAMPLE_FORMATS.get(ext)
+    if Image is None or not max_px or fmt is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            if max(im.size) <= max_px:
+                return data
+            im.thumbnail((max_px, max_px))
+            if fmt == "JPEG" and im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            out = io.BytesIO()
+            im.save(out, fmt, **({"quality": 85, "optimize": True} if fmt == "JPEG" else {"optimize": True}))
+    except Exception:  # unreadable / unsupported: keep the original
+        return data
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+class ImageStore:
+    """Content-addressed image directory; `save` returns the image's URL."""
+
+    def __init__(self, root: Path = IMAGE_DIR, url_prefix: str = IMAGE_URL, max_px: int = MAX_PX):
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+        self.max_px = max_px if Image is not None else 0
+        self.images = 0
+        self.written = 0
+        self.bytes_in = 0
+        self.bytes_written = 0
+
+    def name_for(self, data: bytes, content_type: str) -> str:
+        ext = EXTENSIONS.get(content_type.lower(), "bin")
+        digest = hashlib.sha256(data).hexdigest()[:24]
+        if self.max_px and ext in RESAMPLE_FORMATS:
+            return f"{digest}-{self.max_px}.{ext}"
+        return f"{digest}.{ext}"
+
+    def save(self, data: bytes, content_type: str) -> str:
+        self.images += 1
+        self.bytes_in += len(data)
+        name = self.name_for(data, content_type)
+        path = self.root / name
+        if not path.exists():
+            out = downscale(data, name.rsplit(".", 1)[1], self.max_px)
+            atomic_write_bytes(path, out)
+            self.written += 1
+            self.bytes_written += len(out)
+        return f"{self.url_prefix}/{name}"
+
+    def mammoth_converter(self):
+        """convert_image= callback for mammoth that stores images here."""
+        import mammoth
+
+        def convert(image):
+            with image.open() as f:
+                data = f.read()
+            return {"src": self.save(data, image.content_type or "")}
+
+        return mammoth.images.img_element(convert)
+
+    def report(self) -> dict:
+        return {
+            "images": self.images,
+            "images_written": self.written,
+            "images_reused": self.images - self.written,
+            "image_bytes_in": self.bytes_in,
+            "image_bytes_written": self.bytes_written,
+        }
+
+
+def default_store() -> Optional[ImageStore]:
+    return ImageStore() if IMAGE_DIR else None
+
+
+def gc(docs_dir: Path) -> int:
+    """Delete stored images that no .md / .mdx under docs_dir references; returns count."""
+    ref = re.compile(re.escape(IMAGE_URL + "/") + r"([\w.-]+)")
+    used = set()
+    for pattern in ("*.md", "*.mdx"):
+        for doc in docs_dir.rglob(pattern):
+            # mammoth writes the URL markdown-escaped (a30d...\.png)
+            text = doc.read_text(encoding="utf-8", errors="replace").replace("\\", "")
+            used.update(ref.findall(text))
+    removed = 0
+    for path in IMAGE_DIR.iterdir():
+        if path.is_file() and not path.name.startswith(".") and path.name not in used:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "gc"):
+        print(__doc__.split("Usage:", 1)[1])
+        sys.exit(2)
+    if IMAGE_DIR is None:
+        print("Image extraction disabled (DOCX_IMAGE_DIR is empty)")
+        return
+    if not IMAGE_DIR.is_dir():
+        print(f"{IMAGE_DIR}: no images yet")
+        return
+    if sys.argv[1] == "stats":
+        files = [p for p in IMAGE_DIR.iterdir() if p.is_file()]
+        print(f"{IMAGE_DIR}: {len(files)} images, {sum(p.stat().st_size for p in files)} bytes")
+    else:
+        docs_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else ROOT / "docs"
+        print(f"Removed {gc(docs_dir)} unreferenced images from {IMAGE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
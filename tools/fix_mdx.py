@@ -2,69 +2,82 @@
 import sys
 from pathlib import Path
 import re
-from datetime import datetime
 
-def fix_file(p: Path):
-    text = p.read_text(encoding="utf-8")
+import doc_model
+from atomic_write import atomic_write_text
+from backup_store import ROOT, BackupStore
+from doc_manifest import DocManifest, parse_force, tool_version
+from doc_model import close_open_fence, map_text_lines, serialize
 
-    changed = False
+STORE = BackupStore()
+# sources whose changes invalidate the directory mode's manifest
+MANIFEST_FILES = ("fix_mdx.py", "doc_model.py")
 
-    # 1) Comment top-level import/export lines
-    new_text = re.sub(r'(?m)^\s*(import\s.+|export\s.+)\s*$',
-                      r'<!-- SANITIZED: \1 -->', text)
-    if new_text != text:
-        changed = True
-        text = new_text
+ESM_RE = re.compile(r'^\s*(import\s.+|export\s.+)\s*$')
+LT_DIGIT_RE = re.compile(r'<(?=\d)')
+LT_TAG_RE = re.compile(r'(?i)<(?=\s*(?:script|iframe)\b)')
+# "<" at the end of a line is stray too
+LT_STRAY_RE = re.compile(r'<(?=[^A-Za-z/$`{]|$)')
 
-    # 2) Escape "<" followed by a digit (e.g. "<2" => "&lt;2")
-    new_text = re.sub(r'<(?=\d)', '&lt;', text)
-    if new_text != text:
-        changed = True
-        text = new_text
 
+def fix_line(line: str) -> str:
+    # 1) Comment top-level import/export lines
+    line = ESM_RE.sub(r'<!-- SANITIZED: \1 -->', line)
+    # 2) Escape "<" followed by a digit (e.g. "<2" => "&lt;2")
+    line = LT_DIGIT_RE.sub('&lt;', line)
     # 3) Escape raw <script or <iframe (case-insensitive)
-    new_text = re.sub(r'(?i)<(?=\s*script\b)', '&lt;', text)
-    new_text = re.sub(r'(?i)<(?=\s*iframe\b)', '&lt;', new_text)
-    if new_text != text:
-        changed = True
-        text = new_text
-
+    line = LT_TAG_RE.sub('&lt;', line)
     # 4) Replace any stray unescaped JSX-like "<Component-2" that starts with non-letter
     # (best-effort): turn "<2" already handled; also ensure tags starting with digit are escaped
-    new_text = re.sub(r'<(?=[^A-Za-z/$`{])', '&lt;', text)
-    if new_text != text:
-        changed = True
-        text = new_text
+    return LT_STRAY_RE.sub('&lt;', line)
 
-    # 5) Ensure fenced code blocks are closed: if odd number of ``` then append closing fence
-    fence_count = len(re.findall(r'(?m)^```', text))
-    if fence_count % 2 == 1:
-        changed = True
-        text = text + "\n\n```\n"
 
-    # 6) Backup and write
+def fix_file(p: Path) -> bool:
+    """Fix one file in place; True if it was written."""
+    doc = doc_model.read(p)
+
+    # 1-4) outside code fences only: code samples keep their imports and "<"
+    changed = map_text_lines(doc, fix_line) > 0
+
+    # 5) Ensure fenced code blocks are closed
+    changed = close_open_fence(doc) or changed
+
+    # 6) Backup (into backups/store, not next to the doc) and write
     if changed:
-        backup = p.with_suffix(p.suffix + f".bak.{datetime.now().strftime('%Y%m%d%H%M%S')}")
-        p.rename(backup)
-        p.write_text(text, encoding="utf-8")
-        print(f"[FIXED] {p}  (backup -> {backup.name})")
-    else:
-        print(f"[SKIP] No changes for {p}")
+        try:
+            key = p.resolve().relative_to(ROOT).as_posix()
+        except ValueError:
+            key = p.resolve().as_posix()
+        sha = STORE.save(key, p.read_bytes())
+        atomic_write_text(p, serialize(doc))
+        print(f"[FIXED] {p}  (backup -> {key}@{sha[:12]})")
+        return True
+    print(f"[SKIP] No changes for {p}")
+    return False
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python tools/fix_mdx.py path/to/file.md  OR  path/to/dir")
+    args, force = parse_force(sys.argv[1:])
+    if not args:
+        print("Usage: python tools/fix_mdx.py path/to/file.md  OR  path/to/dir [--force]")
         sys.exit(1)
 
-    target = Path(sys.argv[1])
+    target = Path(args[0])
     if target.is_file():
         fix_file(target)
     elif target.is_dir():
+        # only files changed since the last run (see doc_manifest.py)
+        manifest = DocManifest.load(target, "fix_mdx", tool_version(MANIFEST_FILES))
+        written = 0
         for p in sorted(target.rglob("*.md")):
-            fix_file(p)
+            if not force and manifest.is_current(p):
+                continue
+            written += fix_file(p)
+            manifest.record(p)
+        manifest.save()
+        print(f"Done: {manifest.summary()}, {written} written")
     else:
         print("Path not found:", target)
         sys.exit(2)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
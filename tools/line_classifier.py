@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+tools/line_classifier.py
+
+One engine for the "is this line code?" heuristics of mdx_safe.py,
+auto_snippet.py, convert_pdf_to_md.py and sanitize_existing_md.py. Each
+rule set (keywords, prefixes, tokens, exclusions) is compiled into a single
+regular expression, and a whole document is classified in one call:
+
+    labels = MDX.classify(lines)      # bytes, one label per line
+    labels[i] == CODE
+
+Labels:
+    CODE     the profile's code rule matches
+    BLANK    empty / whitespace only (and not code)
+    COMMENT  starts with "#" (and not code): headings, shell comments
+    TEXT     anything else
+
+Profiles:
+    MDX       mdx_safe: code / runnable commands outside fences
+    SNIPPET   auto_snippet: stricter grouping of naked code
+    PDF       convert_pdf_to_md: code lines in extracted PDF text
+    INDENT    sanitize_existing_md: indented (4 spaces / tab) code
+
+Lines must not contain "\\n" (use splitlines()).
+
+Usage:
+    python tools/line_classifier.py file.md [profile]   # label counts
+"""
+
+import operator
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, Tuple
+
+CODE, BLANK, COMMENT, TEXT = 1, 2, 3, 4
+LABEL_NAMES = {CODE: "code", BLANK: "blank", COMMENT: "comment", TEXT: "text"}
+
+_LASTINDEX = operator.attrgetter("lastindex")
+
+
+def _alt(words: Iterable[str]) -> str:
+    return "|".join(re.escape(w) for w in words)
+
+
+class LineClassifier:
+    """A code rule compiled together with the blank / comment / text labels."""
+
+    __slots__ = ("name", "code_pattern", "_match")
+
+    def __init__(self, name: str, code_pattern: str):
+        self.name = name
+        self.code_pattern = code_pattern
+        # the groups are numbered like the labels, so lastindex is the label
+        self._match = re.compile(rf"({code_pattern})|(\s*\Z)|(\s*+#)|()").match
+
+    def label(self, line: str) -> int:
+        return self._match(line).lastindex
+
+    def is_code(self, line: str) -> bool:
+        return self._match(line).lastindex == CODE
+
+    def classify(self, lines: Iterable[str]) -> bytes:
+        """Labels for all lines, one byte each."""
+        return bytes(map(_LASTINDEX, map(self._match, lines)))
+
+
+# ---- mdx_safe ----
+
+# prefixes that mean "this is a runnable command"
+CLI_PREFIXES = (
+    "python ",
+    "pip ",
+    "npm ",
+    "node ",
+    "./",
+    ".\\",
+    "powershell ",
+    "pwsh ",
+    "mongodump",
+    "mongo ",
+    "set-executionpolicy",
+)
+# "export" too: sanitize_and_wrap indents import/export lines, which would
+# make them code for a second mdx_safe run (see check_idempotence.py)
+MDX_KEYWORDS = (
+    "import", "export", "from", "class", "def", "for", "while", "try", "except", "finally",
+    "with", "switch", "public", "private", "protected", "using",
+)
+# assignments / function calls / dicts
+MDX_TOKENS = (" = ", "==", "!=", "()", "[]", "{}", ".find(", ".insert_", ".update_", "return ", "await ")
+# words that make a trailing ":" control flow
+MDX_CONTROL = ("for ", "if ", "while ", "try", "except", "case ")
+
+MDX = LineClassifier("mdx", (
+    r"(?=\s*+\S)"
+    # numeric "step" lists like `11. How to run:`, headings starting with
+    # "##", bullets and quotes are docs, not code
+    r"(?!\s*+(?:\d+[.)]\s|##|[-*>]))"
+    r"(?:"
+    r"(?:    |\t)"  # indented lines are often code (inside blocks)
+    r"|\s*+(?:"
+    rf"(?i:{_alt(CLI_PREFIXES)})"
+    rf"|(?:{_alt(MDX_KEYWORDS)})\b"
+    rf"|.*?(?:{_alt(MDX_TOKENS)})"
+    rf"|(?=.*?(?:{_alt(MDX_CONTROL)})).*:\Z"
+    r"))"
+))
+
+# ---- auto_snippet ----
+
+SNIPPET_KEYWORDS = (
+    "from ", "import ", "def ", "class ", "for ", "while ", "if ", "try:", "except ",
+    "@pytest.", "@dataclass",
+)
+SNIPPET_COMMANDS = ("python ", "pytest ", "uvicorn ")
+SNIPPET_TOKENS = (" = ", " =\"", ":{", "};", ");", "{", "}")
+
+SNIPPET = LineClassifier("snippet", (
+    r"(?=\s*+\S)"
+    r"(?!\s*+[#\-*>])"  # markdown heading, list or quote
+    r"\s*+(?:"
+    rf"{_alt(SNIPPET_KEYWORDS + SNIPPET_COMMANDS)}"
+    r"|.*:\Z"  # lines ending with : are often code
+    rf"|.*?(?:{_alt(SNIPPET_TOKENS)})"
+    r"|(?!http)(?=.*?\()(?=.*?\))"  # looks like a function call
+    r"|(?!(?i:id =))(?=.*?=)"  # simple assignment style "X = Y"
+    r")"
+))
+
+# ---- convert_pdf_to_md ----
+
+PDF = LineClassifier("pdf", (
+    r"(?:    |\t)"
+    r"|\s*(?:import |from .* import |def |class |if |for |while |try:|except|#include"
+    r"|public |private |var |let |const )"
+    r"|.*?(?:[{};]|=>)"  # braces or semicolons that look code-ish
+))
+
+# ---- sanitize_existing_md ----
+
+INDENT = LineClassifier("indent", r" {4}|\t")
+
+PROFILES = {c.name: c for c in (MDX, SNIPPET, PDF, INDENT)}
+
+
+def counts(labels: bytes) -> Tuple[int, int, int, int]:
+    return tuple(labels.count(label) for label in (CODE, BLANK, COMMENT, TEXT))
+
+
+def main():
+    if len(sys.argv) < 2 or (len(sys.argv) > 2 and sys.argv[2] not in PROFILES):
+        print(f"Usage: python tools/line_classifier.py <file> [{'|'.join(PROFILES)}]")
+        sys.exit(2)
+    classifier = PROFILES[sys.argv[2] if len(sys.argv) > 2 else "mdx"]
+    lines = Path(sys.argv[1]).read_text(encoding="utf-8", errors="ignore").splitlines()
+    labels = classifier.classify(lines)
+    print(f"{len(lines)} lines ({classifier.name}): " + ", ".join(
+        f"{n} {LABEL_NAMES[label]}" for label, n in zip((CODE, BLANK, COMMENT, TEXT), counts(labels))
+    ))
+
+
+if __name__ == "__main__":
+    main()
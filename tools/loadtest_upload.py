@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+tools/loadtest_upload.py
+
+Load test for upload_service: drive /upload/ (and some /delete/) with
+synthetic DOCX/PDF traffic at a fixed concurrency and arrival rate, then
+report p50/p95/p99 latency, throughput and error rate per stage.
+
+Stages are the client-side request latency ("upload", "delete", measured
+from the scheduled arrival time, so client-side queueing counts) plus the
+server-side pipeline stages each upload returns in `timings_ms` (receive,
+convert, postprocess, lock_wait, backup, write, ...).
+
+Without --url a private server is started: upload_service/ and tools/ are
+copied into a temp dir (so docs/modules of this repo is never touched) and
+run with uvicorn; site rebuilds are disabled there.
+
+Usage:
+    python tools/loadtest_upload.py [--requests 200] [--concurrency 8]
+        [--rate 0] [--pdf-share 0.5] [--pdf-pages 5] [--docx-paragraphs 60]
+        [--code-ratio 0.3] [--distinct-docs 0] [--delete-share 0.2]
+        [--teams 3] [--url http://127.0.0.1:8000] [--pool-size N]
+        [--out loadtest.json]
+
+--rate is arrivals per second (Poisson); 0 means closed loop (each of the
+--concurrency clients sends its next request as soon as the last finished).
+--distinct-docs N reuses N documents (exercises the conversion cache);
+0 makes every upload unique.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from synthetic_docs import docx_bytes, pdf_bytes
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# --------------------------------------------------------
+# HTTP (stdlib only)
+# --------------------------------------------------------
+
+def encode_multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes]]) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def post(url: str, fields: Dict[str, str], files: Optional[Dict[str, Tuple[str, bytes]]] = None,
+         timeout: float = 600) -> Tuple[int, dict]:
+    body, ctype = encode_multipart(fields, files or {})
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": ctype}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        try:
+            payload = json.loads(e.read() or b"{}")
+        except ValueError:
+            payload = {}
+        return e.code, payload
+    except (urllib.error.URLError, OSError) as e:
+        return 0, {"detail": str(e)}
+
+
+# --------------------------------------------------------
+# Local server
+# --------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(work: Path, pool_size: Optional[int]) -> Tuple[subprocess.Popen, str]:
+    ignore = shutil.ignore_patterns("__pycache__")
+    shutil.copytree(ROOT / "upload_service", work / "upload_service", ignore=ignore)
+    shutil.copytree(ROOT / "tools", work / "tools", ignore=ignore)
+    (work / "docs" / "modules").mkdir(parents=True)
+
+    env = dict(os.environ, REBUILD_CMD="")
+    if pool_size is not None:
+        env["UPLOAD_POOL_SIZE"] = str(pool_size)
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "upload_service.upload_api:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=str(work), env=env, stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("upload service exited during startup")
+        try:
+            urllib.request.urlopen(url + "/metrics", timeout=1).read()
+            return proc, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("upload service did not start within 60s")
+
+
+# --------------------------------------------------------
+# Load generation
+# --------------------------------------------------------
+
+def make_docs(args) -> List[Tuple[str, bytes]]:
+    """One (filename, bytes) per request (or --distinct-docs, reused round robin)."""
+    count = args.distinct_docs or args.requests
+    rnd = random.Random(args.seed)
+    docs = []
+    for i in range(count):
+        if rnd.random() < args.pdf_share:
+            docs.append((f"load{i}.pdf", pdf_bytes(args.pdf_pages, args.code_ratio, seed=args.seed + i)))
+        else:
+            docs.append((f"load{i}.docx", docx_bytes(args.docx_paragraphs, args.code_ratio, seed=args.seed + i)))
+    return docs
+
+
+class Results:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.status_codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, ms: float, ok: bool = True):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(ms)
+            if not ok:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def status(self, op: str, code: int):
+        key = f"{op} {code}"
+        with self._lock:
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest rank
+    rank = math.ceil(q / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def run_load(url: str, args, docs: List[Tuple[str, bytes]]) -> Tuple[Results, float]:
+    results = Results()
+    rnd = random.Random(args.seed)
+    plan = []
+    for i in range(args.requests):
+        plan.append({
+            "doc": docs[i % len(docs)],
+            "team": f"{args.team}{i % args.teams}",
+            "week": rnd.randint(1, 16),
+            "delete": rnd.random() < args.delete_share,
+        })
+
+    def one(item, arrival: float):
+        name, data = item["doc"]
+        status, body = post(
+            url + "/upload/",
+            {"team": item["team"], "week": str(item["week"])},
+            {"file": (name, data)},
+        )
+        ok = 200 <= status < 300
+        results.add("upload", (time.perf_counter() - arrival) * 1000, ok)
+        results.status("upload", status)
+        for stage, ms in (body.get("timings_ms") or {}).items():
+            results.add(stage, ms)
+        if ok and item["delete"]:
+            w = item["week"]
+            module = f"module{(w - 1) // 4 + 1}"
+            t0 = time.perf_counter()
+            status, _ = post(url + "/delete/", {"module": module, "team": item["team"], "week": str(w)})
+            results.add("delete", (time.perf_counter() - t0) * 1000, 200 <= status < 300)
+            results.status("delete", status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        if args.rate > 0:
+            # open loop: Poisson arrivals, latency counted from the arrival time
+            next_at = started
+            futures = []
+            for item in plan:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(ex.submit(one, item, next_at))
+                next_at += rnd.expovariate(args.rate)
+            for f in futures:
+                f.result()
+        else:
+            list(ex.map(lambda item: one(item, time.perf_counter()), plan))
+    return results, time.perf_counter() - started
+
+
+def summarize(results: Results, wall: float, args, url: str) -> dict:
+    stages = {}
+    for stage, values in sorted(results.samples.items()):
+        v = sorted(values)
+        errors = results.errors.get(stage, 0)
+        stages[stage] = {
+            "count": len(v),
+            "errors": errors,
+            "error_rate": round(errors / len(v), 4) if v else 0.0,
+            "throughput_per_sec": round(len(v) / wall, 3),
+            "mean_ms": round(sum(v) / len(v), 1),
+            "p50_ms": round(percentile(v, 50), 1),
+            "p95_ms": round(percentile(v, 95), 1),
+            "p99_ms": round(percentile(v, 99), 1),
+            "max_ms": round(v[-1], 1),
+        }
+    return {
+        "url": url,
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "url")},
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "wall_seconds": round(wall, 3),
+        "requests": args.requests,
+        "stages": stages,
+        "status_codes": dict(sorted(results.status_codes.items())),
+    }
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} uploads in {report['wall_seconds']:.1f}s")
+    print(f"{'stage':<14}{'count':>7}{'err%':>7}{'/s':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, s in report["stages"].items():
+        print(
+            f"{stage:<14}{s['count']:>7}{s['error_rate'] * 100:>6.1f}%{s['throughput_per_sec']:>8.2f}"
+            f"{s['p50_ms']:>9.1f}ms{s['p95_ms']:>8.1f}ms{s['p99_ms']:>8.1f}ms"
+        )
+    print("status codes:", report["status_codes"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test the upload service with synthetic documents.")
+    ap.add_argument("--url", help="running service (default: start a private one)")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=0.0, help="arrivals/sec (0 = closed loop)")
+    ap.add_argument("--pdf-share", type=float, default=0.5)
+    ap.add_argument("--pdf-pages", type=int, default=5)
+    ap.add_argument("--docx-paragraphs", type=int, default=60)
+    ap.add_argument("--code-ratio", type=float, default=0.3)
+    ap.add_argument("--distinct-docs", type=int, default=0)
+    ap.add_argument("--delete-share", type=float, default=0.2)
+    ap.add_argument("--teams", type=int, default=3)
+    ap.add_argument("--team", default="loadtest", help="team name prefix")
+    ap.add_argument("--pool-size", type=int, help="UPLOAD_POOL_SIZE for the private server")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="loadtest.json", help="JSON results file")
+    args = ap.parse_args()
+
+    docs = make_docs(args)
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            server, url = start_local_server(Path(tmp), args.pool_size)
+        try:
+            results, wall = run_load(url, args, docs)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(30)
+
+    report = summarize(results, wall, args, url)
+    print_report(report)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print("Wrote", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,9 @@ Goal:
   * `<2025>` / `<2` / random `<...>` being treated like JSX
   * weird lines causing "Unexpected character `2`" / `\` before name
 
-How it works (high level):
+How it works (high level), as passes over a doc_model.Document:
 1. Keeps YAML front matter (`--- ... ---`) untouched.
-2. Walks the rest of the file line by line.
+2. Leaves existing fenced blocks alone.
 3. Detects "code-looking" lines (Python/JS/PowerShell/CLI) OUTSIDE fences and
    groups them into fenced code blocks:
 
@@ -29,8 +29,11 @@ How it works (high level):
 Usage:
   - One file:
       python tools/mdx_safe.py docs/modules/module1/teamA/week1.md
-  - All docs under a directory:
-      python tools/mdx_safe.py docs/modules
+  - All docs under a directory (only files changed since the last run,
+    see doc_manifest.py; --force processes every file):
+      python tools/mdx_safe.py docs/modules [--force] [--jobs N]
+    Files are processed in parallel (batch_runner.py, default: one
+    process per core).
 """
 
 import sys
@@ -38,75 +41,44 @@ import re
 from pathlib import Path
 from typing import List
 
-# prefixes that mean "this is a runnable command"
-CLI_PREFIXES = (
-    "python ",
-    "pip ",
-    "npm ",
-    "node ",
-    "./",
-    ".\\",
-    "powershell ",
-    "pwsh ",
-    "mongodump",
-    "mongo ",
-    "set-executionpolicy",
+import doc_model
+from atomic_write import atomic_write_text
+from batch_runner import BatchStats, parse_jobs, run_batch
+from doc_manifest import DocManifest, parse_force, tool_version
+from line_classifier import CLI_PREFIXES, CODE, MDX, TEXT  # noqa: F401 (CLI_PREFIXES re-exported)
+from doc_model import (
+    Document, FencedCode, Heading,
+    body_lines, close_open_fence, map_text_lines, parse_lines, serialize, text_blocks,
 )
 
+TAG_RE = re.compile(r"</?([A-Za-z][A-Za-z0-9:_-]*)(\s[^>]*)?>")
+LT_DIGIT_RE = re.compile(r"<(\d)")
+LT_WORD_RE = re.compile(r"<([A-Za-z])")
+
+# sources whose changes invalidate the directory mode's manifest
+MANIFEST_FILES = ("mdx_safe.py", "doc_model.py", "line_classifier.py")
+
 
 def is_codey_line(line: str) -> bool:
     """
-    Heuristic: decide if a line looks like *real* code or a runnable command.
+    Heuristic: decide if a line looks like *real* code or a runnable command
+    (see line_classifier.MDX for the rules).
 
     We only use this OUTSIDE existing ``` fences.
     """
-    s = line.rstrip("\n")
-    stripped = s.lstrip()
-
-    # blank line by itself is not "code start"
-    if not stripped:
-        return False
-
-    # ---- 0) Numeric "step" lists like `11. How to run:`  (NOT code) ----
-    if re.match(r"\d+[\.)]\s", stripped):
-        return False
-
-    # ---- 1) Headings / bullet lists / quotes (NOT code) ----
-    # treat headings that start with "##" as docs headings
-    if stripped.startswith(("##", "-", "*", ">")):
-        return False
-
-    # NOTE: lines starting with single "#" we allow as code comments
-    # so they can stay inside PowerShell / Python snippets.
+    return MDX.is_code(line.rstrip("\n"))
 
-    # ---- 2) runnable commands (YES code snippet) ----
-    low = stripped.lower()
-    if low.startswith(CLI_PREFIXES):
-        return True
 
-    # ---- 3) Explicit language keywords at the start ----
-    if re.match(
-        r"\s*(import|from|class|def|for|while|try|except|finally|with|switch|public|private|protected|using)\b",
-        stripped,
-    ):
-        return True
-
-    # ---- 4) Indented lines are often code (inside blocks) ----
-    if line.startswith(("    ", "\t")):
-        return True
-
-    # ---- 5) Lines that look like assignments / function calls / dicts ----
-    if any(tok in stripped for tok in (" = ", "==", "!=", "()", "[]", "{}", ".find(", ".insert_", ".update_", "return ", "await ")):
-        return True
-
-    # ---- 6) Lines ending with ":" used as control-flow ----
-    if stripped.endswith(":") and any(
-        kw in stripped for kw in ("for ", "if ", "while ", "try", "except", "case ")
-    ):
-        return True
-
-    # OTHERWISE: treat as normal documentation text
-    return False
+def guess_language(line: str) -> str:
+    """Language for a snippet's fence, guessed from its first line (simple)."""
+    low = line.lstrip().lower()
+    if low.startswith(("set-executionpolicy", "powershell", "pwsh", "$")):
+        return "powershell"
+    if low.startswith(("npm ", "node ", "bash ", "./")):
+        return "bash"
+    if any(tok in line for tok in ("def ", "import ", "from ")):
+        return "python"
+    return "text"
 
 
 def guess_title_from_heading(heading_text: str, fallback: str) -> str:
@@ -132,114 +104,117 @@ def guess_title_from_heading(heading_text: str, fallback: str) -> str:
     return fallback
 
 
-def transform_body_lines(lines: List[str], filename: str) -> List[str]:
+def wrap_code_runs(doc: Document, filename: str) -> int:
     """
-    Transform the body (after front matter) into MDX-safe markdown.
+    Wrap runs of code-looking lines outside fences into ``` blocks.
 
-    - Keeps existing ``` or ~~~ fenced blocks intact.
-    - Outside those, wraps codey runs into ``` blocks.
-    - For normal text, strip HTML tags and fix `<2` style constructs.
-    - Tracks nearest heading text to use as snippet title.
+    A run starts at a codey line and takes following codey lines, blank
+    lines and `#` comments (headings included). Its title is the nearest
+    heading before it (see guess_title_from_heading), else the file name.
+    Returns the number of runs wrapped.
     """
-    new_lines: List[str] = []
-
-    in_fence = False
-    snippet_counter = 0
-    i = 0
-    n = len(lines)
-
     base_title = filename.rsplit(".", 1)[0]
     current_title = base_title
-
-    while i < n:
-        line = lines[i]
-        stripped = line.lstrip()
-
-        # Detect entering/exiting explicit code fences
-        if stripped.startswith("```") or stripped.startswith("~~~"):
-            in_fence = not in_fence
-            new_lines.append(line)
-            i += 1
-            continue
-
-        # Inside fence: leave content untouched
-        if in_fence:
-            new_lines.append(line)
-            i += 1
+    out: list = []
+    run = None
+    wrapped = 0
+
+    # one batch classification for every line outside fences
+    labels = MDX.classify([line for block in text_blocks(doc) for line in block.to_lines()])
+    k = 0
+
+    for block in doc.blocks:
+        if isinstance(block, FencedCode):
+            run = None
+            out.append(block)
             continue
 
         # Track headings to guess better snippet titles
-        heading_match = re.match(r"\s*#{1,6}\s+(.*)", line)
-        if heading_match:
-            heading_text = heading_match.group(1)
-            current_title = guess_title_from_heading(heading_text, base_title)
-            new_lines.append(line)
-            i += 1
+        if isinstance(block, Heading) and run is None:
+            current_title = guess_title_from_heading(block.text, base_title)
+            out.append(block)
+            k += 1
             continue
 
-        # Outside fence: detect a run of code-looking lines
-        if is_codey_line(line):
-            snippet_counter += 1
-
-            # Language guess (simple)
-            low = stripped.lower()
-            if low.startswith(("set-executionpolicy", "powershell", "pwsh", "$")):
-                lang = "powershell"
-            elif low.startswith(("npm ", "node ", "bash ", "./")):
-                lang = "bash"
-            elif any(tok in line for tok in ("def ", "import ", "from ")):
-                lang = "python"
-            else:
-                lang = "text"
-
-            title = current_title or base_title
-            new_lines.append(f"```{lang} title=\"{title}\"")
-
-            # consume consecutive codey lines + comments (# ...) + blank lines
-            while i < n:
-                cur = lines[i]
-                cur_strip = cur.lstrip()
-                if (
-                    is_codey_line(cur)
-                    or not cur_strip  # blank
-                    or cur_strip.startswith("#")  # code comments
-                ):
-                    new_lines.append(cur)
-                    i += 1
-                else:
-                    break
-
-            new_lines.append("```")
-            continue
-
-        # ---- Normal text line ----
-        safe = line
-
+        lines = block.to_lines()
+        kept: List[str] = []  # lines of this block outside runs
+        for line in lines:
+            label = labels[k]
+            k += 1
+            if run is not None:
+                # consume consecutive codey lines + comments (# ...) + blank lines
+                if label != TEXT:
+                    run.lines.append(line)
+                    continue
+                run = None
+
+            if label == CODE:
+                if kept:
+                    out.append(type(block)(kept))
+                    kept = []
+                wrapped += 1
+                title = current_title or base_title
+                run = FencedCode(f"```{guess_language(line)} title=\"{title}\"", [line])
+                out.append(run)
+                continue
+
+            kept.append(line)
+
+        if len(kept) == len(lines):
+            out.append(block)
+        elif kept:
+            out.append(type(block)(kept))
+
+    if wrapped:
+        doc.blocks = out
+    return wrapped
+
+
+def strip_tag_line(line: str) -> str:
+    # repeated until nothing changes: removing `<a>` from `<<a>b>` leaves a
+    # new tag `<b>` behind (every round that changes the line shortens it)
+    while "<" in line:
         # 1) Remove HTML-like tags: <a ...>, </a>, <p>, <div class="...">, etc.
-        safe = re.sub(
-            r"</?([A-Za-z][A-Za-z0-9:_-]*)(\s[^>]*)?>",
-            "",
-            safe,
-        )
-
+        new = TAG_RE.sub("", line)
         # 2) Deal with `<2` or `<2025` → remove `<`, keep the number/word
-        safe = re.sub(r"<(\d)", r"\1", safe)
-
+        new = LT_DIGIT_RE.sub(r"\1", new)
         # 3) For `<Something` where it's not a real HTML tag, drop `<`
-        safe = re.sub(r"<([A-Za-z])", r"\1", safe)
+        new = LT_WORD_RE.sub(r"\1", new)
+        if new == line:
+            break
+        line = new
+    return line
+
 
-        new_lines.append(safe)
-        i += 1
+def strip_tags(doc: Document) -> int:
+    """Normal text (not headings, not code): strip tags and stray `<`."""
+    return map_text_lines(doc, strip_tag_line, skip=(Heading,))
 
+
+def make_mdx_safe(doc: Document, filename: str) -> int:
+    """All mdx_safe passes; returns the number of changes made."""
+    changes = wrap_code_runs(doc, filename)
+    stripped = strip_tags(doc)
+    if stripped:
+        # a stripped tag can leave a code line behind (`<b>import os</b>`)
+        changes += stripped + wrap_code_runs(doc, filename)
     # Safety: ensure fences are balanced
-    fence_count = sum(
-        1 for l in new_lines
-        if l.lstrip().startswith("```") or l.lstrip().startswith("~~~")
-    )
-    if fence_count % 2 == 1:
-        new_lines.append("```")
+    changes += close_open_fence(doc)
+    return changes
 
-    return new_lines
+
+def transform_body_lines(lines: List[str], filename: str) -> List[str]:
+    """
+    Transform the body (after front matter) into MDX-safe markdown.
+
+    - Keeps existing ``` or ~~~ fenced blocks intact.
+    - Outside those, wraps codey runs into ``` blocks.
+    - For normal text, strip HTML tags and fix `<2` style constructs.
+    - Tracks nearest heading text to use as snippet title.
+    """
+    doc = Document(None, parse_lines(lines))
+    make_mdx_safe(doc, filename)
+    return body_lines(doc)
 
 
 def mdx_safe_file(path: Path) -> bool:
@@ -247,37 +222,11 @@ def mdx_safe_file(path: Path) -> bool:
     Make a single .md file MDX-safe.
     Returns True if file was changed.
     """
-    original_lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
-
-    if not original_lines:
-        return False
-
-    new_lines: List[str] = []
-
-    i = 0
-    n = len(original_lines)
-
-    # 1) Keep YAML front matter (`---` .. `---`) intact if present
-    if original_lines[0].strip() == "---":
-        new_lines.append(original_lines[0])
-        i = 1
-        while i < n:
-            new_lines.append(original_lines[i])
-            if original_lines[i].strip() == "---":
-                i += 1
-                break
-            i += 1
-
-    # 2) Transform the rest safely
-    body = original_lines[i:]
-    transformed_body = transform_body_lines(body, filename=path.name)
-    new_lines.extend(transformed_body)
-
-    new_text = "\n".join(new_lines)
-    orig_text = "\n".join(original_lines)
+    doc = doc_model.read(path)
 
-    if new_text != orig_text:
-        path.write_text(new_text, encoding="utf-8")
+    if make_mdx_safe(doc, filename=path.name):
+        doc.trailing_newline = False
+        atomic_write_text(path, serialize(doc))
         print(f"[OK] MDX-safe rewrite: {path}")
         return True
     else:
@@ -286,11 +235,13 @@ def mdx_safe_file(path: Path) -> bool:
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python tools/mdx_safe.py <file.md | directory>")
+    args, force = parse_force(sys.argv[1:])
+    args, jobs = parse_jobs(args)
+    if not args:
+        print("Usage: python tools/mdx_safe.py <file.md | directory> [--force] [--jobs N]")
         sys.exit(2)
 
-    target = Path(sys.argv[1])
+    target = Path(args[0])
 
     if target.is_file():
         if target.suffix.lower() != ".md":
@@ -300,11 +251,26 @@ def main():
         return
 
     if target.is_dir():
+        # only files changed since the last run (see doc_manifest.py),
+        # across BATCH_JOBS / --jobs processes (see batch_runner.py)
+        manifest = DocManifest.load(target, "mdx_safe", tool_version(MANIFEST_FILES))
+        todo = [p for p in sorted(target.rglob("*.md")) if force or not manifest.is_current(p)]
+        stats = BatchStats(jobs)
         changed = 0
-        for p in target.rglob("*.md"):
-            if mdx_safe_file(p):
+        for r in run_batch("mdx_safe:mdx_safe_file", [(p,) for p in todo], jobs):
+            stats.add(r)
+            print(r.output, end="")
+            if not r.ok:
+                print(f"[ERROR] {r.path}: {r.error}")
+                continue
+            if r.value:
                 changed += 1
-        print("Done. Total MD files changed:", changed)
+            manifest.record(r.path)
+        manifest.save()
+        print("Done. Total MD files changed:", changed, f"({manifest.summary()})")
+        print(stats.report())
+        if stats.failed:
+            sys.exit(1)
         return
 
     print("Path not found:", target)
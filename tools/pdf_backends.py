@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+tools/pdf_backends.py
+
+Text-extraction backends for convert_pdf_to_md.py. Every backend yields one
+string per page: lines ending in "\\n", the page ending in a form feed.
+
+    layout    pdfminer with layout analysis (LAParams): same text as
+              pdfminer's extract_text. The default.
+    nolayout  pdfminer without layout analysis: characters are read in
+              content-stream order and split into lines by baseline, words
+              by the gaps between glyphs. Much cheaper; fine for the
+              single-column, text-heavy PDFs we get.
+    pypdf     pypdf's extract_text, if pypdf is installed (pip install pypdf).
+    auto      times every available backend on the first AUTO_SAMPLE_PAGES
+              pages and picks the fastest one whose lines (ignoring blank
+              lines and trailing spaces) match the layout backend's.
+
+Config (env):
+    PDF_BACKEND            backend used when none is passed (default "layout")
+    PDF_AUTO_SAMPLE_PAGES  pages timed by "auto" (default 3)
+
+Usage:
+    python tools/pdf_backends.py input.pdf     # what "auto" would pick, and why
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams, LTChar, LTContainer, LTText, LTTextBox
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+from pdf_page_cache import PageCache, PageFingerprinter
+
+try:
+    import pypdf
+except ImportError:  # pypdf backend unavailable
+    pypdf = None
+
+DEFAULT_BACKEND = os.environ.get("PDF_BACKEND", "layout")
+AUTO_SAMPLE_PAGES = int(os.environ.get("PDF_AUTO_SAMPLE_PAGES", 3))
+
+# extract(page_index, pdfminer_page) -> page text
+Extractor = Callable[[int, PDFPage], str]
+
+
+def ltpage_text(ltpage) -> str:
+    """Text of one extract_pages() page, laid out exactly as extract_text does."""
+    parts: List[str] = []
+
+    def render(item):
+        if isinstance(item, LTContainer):
+            for child in item:
+                render(child)
+        elif isinstance(item, LTText):
+            parts.append(item.get_text())
+        if isinstance(item, LTTextBox):
+            parts.append("\n")
+
+    render(ltpage)
+    parts.append("\f")
+    return "".join(parts)
+
+
+def chars_text(ltpage) -> str:
+    """
+    Text of an LTPage built without layout analysis: a new line whenever the
+    baseline moves by more than half a glyph height (a blank line when it
+    drops by more than two lines), a space where two glyphs are further apart
+    than a tenth of their size.
+    """
+    parts: List[str] = []
+    prev = None
+
+    def walk(item):
+        nonlocal prev
+        if isinstance(item, LTContainer):
+            for child in item:
+                walk(child)
+            return
+        if not isinstance(item, LTChar):
+            return
+        if prev is not None:
+            size = max(prev.height, item.height, 1.0)
+            drop = prev.y0 - item.y0
+            if abs(drop) > size * 0.5:
+                parts.append("\n\n" if drop > size * 2.5 else "\n")
+            elif item.x0 - prev.x1 > max(item.width, item.height) * 0.1:
+                if not parts[-1].endswith(" ") and not item.get_text().startswith(" "):
+                    parts.append(" ")
+        parts.append(item.get_text())
+        prev = item
+
+    walk(ltpage)
+    if parts:
+        parts.append("\n")
+    parts.append("\f")
+    return "".join(parts)
+
+
+class PdfminerBackend:
+    name = "layout"
+    description = "pdfminer, full layout analysis"
+
+    def available(self) -> bool:
+        return True
+
+    def laparams(self) -> Optional[LAParams]:
+        return LAParams()
+
+    def render(self, ltpage) -> str:
+        return ltpage_text(ltpage)
+
+    def extractor(self, in_path: Path) -> Extractor:
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = PDFPageAggregator(rsrcmgr, laparams=self.laparams())
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+
+        def extract(index: int, page: PDFPage) -> str:
+            interpreter.process_page(page)
+            return self.render(device.get_result())
+
+        return extract
+
+
+class PdfminerNoLayoutBackend(PdfminerBackend):
+    name = "nolayout"
+    description = "pdfminer, no layout analysis"
+
+    def laparams(self) -> Optional[LAParams]:
+        return None
+
+    def render(self, ltpage) -> str:
+        return chars_text(ltpage)
+
+
+class PypdfBackend:
+    name = "pypdf"
+    description = "pypdf extract_text (pure Python)"
+
+    def available(self) -> bool:
+        return pypdf is not None
+
+    def extractor(self, in_path: Path) -> Extractor:
+        pages = pypdf.PdfReader(str(in_path)).pages
+
+        def extract(index: int, page: PDFPage) -> str:
+            text = pages[index].extract_text() or ""
+            if text and not text.endswith("\n"):
+                text += "\n"
+            return text + "\f"
+
+        return extract
+
+
+BACKENDS = {b.name: b for b in (PdfminerBackend(), PdfminerNoLayoutBackend(), PypdfBackend())}
+
+
+def available_backends() -> List[str]:
+    return [name for name, b in BACKENDS.items() if b.available()]
+
+
+def get_backend(name: str):
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend {name!r} (choose from {', '.join(BACKENDS)} or auto)")
+    if not backend.available():
+        raise ValueError(f"PDF backend {name!r} is not installed")
+    return backend
+
+
+def iter_page_texts(
+    in_path: Path,
+    page_numbers: Optional[Set[int]] = None,
+    cache: Optional[PageCache] = None,
+    backend: str = "layout",
+) -> Iterator[str]:
+    """
+    Text of each page in order, as produced by `backend` (form feed
+    included). With a cache, pages whose fingerprint is known skip
+    extraction entirely; entries are kept per backend.
+    """
+    impl = get_backend(backend)
+    extract = impl.extractor(in_path)
+    fingerprints = None
+    if cache is not None:
+        laparams = impl.laparams() if hasattr(impl, "laparams") else None
+        fingerprints = PageFingerprinter(backend, laparams)
+    with open(in_path, "rb") as fp:
+        for i, page in enumerate(PDFPage.get_pages(fp)):
+            if page_numbers is not None and i not in page_numbers:
+                continue
+            key = None
+            if cache is not None:
+                key = fingerprints.fingerprint(page)
+                text = cache.get(key)
+                if text is not None:
+                    yield text
+                    continue
+            text = extract(i, page)
+            if cache is not None:
+                cache.put(key, text)
+            yield text
+
+
+def line_structure(text: str) -> List[str]:
+    """The non-blank lines of some extracted text, trailing spaces dropped."""
+    return [line.rstrip() for line in text.splitlines() if line.strip()]
+
+
+def choose_backend(in_path: Path, sample_pages: int = AUTO_SAMPLE_PAGES) -> Tuple[str, Dict[str, dict]]:
+    """
+    The fastest available backend that reproduces the layout backend's lines
+    on the first `sample_pages` pages, plus what was measured for each:
+    {name: {"seconds": ..., "same_lines": ...}}.
+    """
+    sample = set(range(sample_pages))
+    trials: Dict[str, dict] = {}
+    reference = None
+    for name in available_backends():  # "layout" first: it is the reference
+        t0 = time.perf_counter()
+        text = "".join(iter_page_texts(in_path, sample, backend=name))
+        seconds = time.perf_counter() - t0
+        lines = line_structure(text)
+        if reference is None:
+            reference = lines
+        trials[name] = {"seconds": round(seconds, 4), "same_lines": lines == reference}
+    best = min((t["seconds"], name) for name, t in trials.items() if t["same_lines"])[1]
+    return best, trials
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__.split("Usage:", 1)[1])
+        sys.exit(2)
+    best, trials = choose_backend(Path(sys.argv[1]))
+    for name, t in trials.items():
+        print(f"{name:>9} {t['seconds']:>8.3f}s  lines {'match' if t['same_lines'] else 'DIFFER'}")
+    print("auto ->", best)
+
+
+if __name__ == "__main__":
+    main()
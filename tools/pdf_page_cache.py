@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+tools/pdf_page_cache.py
+
+Persistent per-page cache for PDF text extraction, used by
+convert_pdf_to_md.py. A re-uploaded PDF with a few edited pages only pays
+pdfminer layout analysis for the pages that changed.
+
+Key: sha256 over everything that decides a page's extracted text —
+the page's content streams, its resources (fonts, XObjects, ... hashed
+recursively, embedded font programs included), media/crop box, rotation,
+and the extractor settings (pdfminer version + every LAParams field +
+`variant`, the backend name).
+
+Layout (default root: tmp_uploads/pdf_page_cache):
+
+    ab/abcdef....txt.gz    the page's text as extract_text would produce it
+
+Eviction is size based: when the cache grows past max_bytes, the least
+recently used pages (by mtime, bumped on every hit) are removed until it
+is under 90% of the limit.
+
+Config (env):
+    PDF_PAGE_CACHE_DIR        cache directory (set to "" to disable)
+    PDF_PAGE_CACHE_MAX_BYTES  size limit (default 256 MiB)
+
+Usage:
+    python tools/pdf_page_cache.py stats
+    python tools/pdf_page_cache.py clear
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import pdfminer
+from pdfminer.psparser import PSLiteral
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+
+from atomic_write import atomic_write_bytes
+
+ROOT = Path(__file__).resolve().parent.parent
+_dir = os.environ.get("PDF_PAGE_CACHE_DIR")
+CACHE_DIR: Optional[Path] = (
+    ROOT / "tmp_uploads" / "pdf_page_cache" if _dir is None else (Path(_dir) if _dir else None)
+)
+CACHE_MAX_BYTES = int(os.environ.get("PDF_PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class PageFingerprinter:
+    """Fingerprints for the pages of one document (shared objects hashed once)."""
+
+    def __init__(self, variant: str = "", laparams=None):
+        # vars(), not repr(): LAParams' repr leaves out boxes_flow, detect_vertical, ...
+        settings = sorted(vars(laparams).items()) if laparams is not None else None
+        self.salt = f"pdfminer {pdfminer.__version__}|{variant}|{settings!r}".encode("utf-8")
+        self._memo: Dict[int, bytes] = {}
+
+    def _digest(self, obj, seen) -> bytes:
+        if isinstance(obj, PDFObjRef):
+            objid = obj.objid
+            if objid in self._memo:
+                return self._memo[objid]
+            if objid in seen:
+                return b"cycle:%d" % objid
+            seen.add(objid)
+            digest = self._digest(obj.resolve(), seen)
+            seen.discard(objid)
+            self._memo[objid] = digest
+            return digest
+
+        h = hashlib.sha256()
+        if isinstance(obj, PDFStream):
+            h.update(b"stream")
+            h.update(self._digest(obj.attrs, seen))
+            h.update(hashlib.sha256(obj.get_rawdata() or b"").digest())
+        elif isinstance(obj, dict):
+            h.update(b"dict")
+            for key in sorted(obj, key=str):
+                h.update(str(key).encode("utf-8", "replace"))
+                h.update(self._digest(obj[key], seen))
+        elif isinstance(obj, (list, tuple)):
+            h.update(b"list")
+            for item in obj:
+                h.update(self._digest(item, seen))
+        elif isinstance(obj, PSLiteral):
+            h.update(b"/" + str(obj.name).encode("utf-8", "replace"))
+        elif isinstance(obj, bytes):
+            h.update(b"bytes" + obj)
+        else:
+            h.update(repr(obj).encode("utf-8", "replace"))
+        return h.digest()
+
+    def fingerprint(self, page) -> str:
+        h = hashlib.sha256(self.salt)
+        h.update(repr((page.mediabox, page.cropbox, page.rotate)).encode())
+        for stream in page.contents:
+            h.update(self._digest(stream, set()))
+        h.update(self._digest(page.resources, set()))
+        return h.hexdigest()
+
+
+class PageCache:
+    def __init__(self, root: Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.txt.gz"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = gzip.decompress(path.read_bytes()).decode("utf-8")
+        except (OSError, EOFError, UnicodeDecodeError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # LRU: keep recently used pages
+        except OSError:
+            pass
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str):
+        atomic_write_bytes(self._path(key), gzip.compress(text.encode("utf-8"), compresslevel=6, mtime=0))
+        self.writes += 1
+
+    def size(self):
+        """(entries, bytes) currently on disk."""
+        entries = total = 0
+        for _, size, _ in self._files():
+            entries += 1
+            total += size
+        return entries, total
+
+    def _files(self):
+        if not self.root.is_dir():
+            return
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for f in files:
+                        if f.name.endswith(".txt.gz"):
+                            st = f.stat()
+                            yield st.st_mtime, st.st_size, f.path
+
+    def evict(self) -> int:
+        """Drop least recently used pages while over max_bytes; returns pages removed."""
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return 0
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def report(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "pages": lookups,
+            "page_cache_hits": self.hits,
+            "page_cache_misses": self.misses,
+            "page_cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def default_cache() -> Optional[PageCache]:
+    return PageCache(CACHE_DIR) if CACHE_DIR else None
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ("stats", "clear"):
+        print(__doc__.split("Usage:", 1)[1])
+        sys.exit(2)
+    if CACHE_DIR is None:
+        print("Page cache disabled (PDF_PAGE_CACHE_DIR is empty)")
+        return
+    cache = PageCache(CACHE_DIR)
+    if sys.argv[1] == "stats":
+        entries, total = cache.size()
+        print(f"{CACHE_DIR}: {entries} pages, {total} bytes (limit {cache.max_bytes})")
+    else:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print("Cleared", CACHE_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+tools/postprocess.py
+
+The post-conversion chain the upload service has always run, mdx_safe.py
+then sanitize_and_wrap.py, as passes over a single doc_model.Document. The
+sanitizer step never changed a file (that script has no __main__ entry
+point), so the only pass is make_mdx_safe; this reads the file once, parses
+it once and writes it once (atomically), with the same output as the two
+tools. The upload service's workers use postprocess_markdown and return the
+text, so the only write is the final one into docs/.
+
+Usage:
+    python tools/postprocess.py path/to/week1.md ["label"]
+
+The file name is the fallback snippet title (mdx_safe), so the upload
+service names its work file after the week. The label is accepted for the
+callers that pass one and is not used.
+"""
+
+import sys
+from pathlib import Path
+
+import doc_model
+from atomic_write import atomic_write_text_if_changed
+from mdx_safe import make_mdx_safe
+
+
+def postprocess_doc(doc: doc_model.Document, filename: str, label: str) -> dict:
+    changes = make_mdx_safe(doc, filename)
+    if changes:
+        # as mdx_safe_file writes it
+        doc.trailing_newline = False
+    return {"mdx_safe_changes": changes}
+
+
+def postprocess_text(text: str, filename: str, label: str) -> str:
+    doc = doc_model.parse(text)
+    postprocess_doc(doc, filename, label)
+    return doc_model.serialize(doc)
+
+
+def postprocess_markdown(md_path: Path, label: str) -> str:
+    """Read and post-process a converter's output; the file is left as is."""
+    md_path = Path(md_path)
+    doc = doc_model.read(md_path)
+    postprocess_doc(doc, md_path.name, label)
+    return doc_model.serialize(doc)
+
+
+def postprocess_file(md_path: Path, label: str) -> dict:
+    """Post-process one file in place (no write if nothing changed); returns what the passes did."""
+    md_path = Path(md_path)
+    doc = doc_model.read(md_path)
+    report = postprocess_doc(doc, md_path.name, label)
+    report["written"] = atomic_write_text_if_changed(md_path, doc_model.serialize(doc))
+    return report
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python tools/postprocess.py path/to/file.md ["label"]')
+        sys.exit(2)
+    target = Path(sys.argv[1])
+    if not target.is_file():
+        print("Path not found:", target)
+        sys.exit(3)
+    label = sys.argv[2] if len(sys.argv) >= 3 else target.name
+    report = postprocess_file(target, label)
+    print(f"[{'OK' if report['written'] else 'UNCHANGED'}] {target} -> {report['mdx_safe_changes']} mdx_safe changes")
+
+
+if __name__ == "__main__":
+    main()
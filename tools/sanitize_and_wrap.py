@@ -15,9 +15,10 @@ USAGE (single file):
 USAGE (whole folder tree):
     python tools/sanitize_and_wrap.py docs/modules
 
-In upload_service/upload_api.py you already call:
-    run_sanitizer(out_md, f"{team_slug} {week_id}")
-so every upload is sanitized automatically.
+Not part of the upload chain: the script has no __main__ entry point, so
+the upload service's and batch_sanitize.py's calls never changed a file,
+and escape_line would turn every "> quote" into "&gt; quote".
+batch_sanitize.py reports what sanitize_doc would change (pending_changes).
 """
 
 import sys
@@ -25,6 +26,10 @@ from pathlib import Path
 import re
 from typing import Tuple
 
+import doc_model
+from atomic_write import atomic_write_text_if_changed
+from doc_model import Document, fences, map_text_lines, parse, serialize, trim_end
+
 
 # --------------------------------------------------------
 # 1) Add title="..." to fenced code blocks
@@ -49,160 +54,116 @@ def add_title_to_fence(info_str: str, title: str, snippet_index: int) -> str:
         return f'{info_str} title="{full_title}"'
 
 
-def inject_titles_into_fences(md_text: str, original_label: str) -> Tuple[str, int]:
+def title_fences(doc: Document, original_label: str) -> int:
     """
-    Search md_text for fenced code blocks and add title attributes where missing.
-    Returns new_text, count_of_modified_fences.
+    Add title attributes to fenced code blocks that have none.
+    Returns the number of modified fences.
     We only touch the opening ``` line; contents remain unchanged.
+    Snippets are numbered over all closed ``` fences, titled or not.
     """
-    pattern = re.compile(
-        r'(^```[ \t]*([^\n`]*)\n)(.*?)(\n```)',
-        re.MULTILINE | re.DOTALL,
-    )
-
     snippet_count = 0
     modified = 0
-
-    def repl(match):
-        nonlocal snippet_count, modified
-        opening_line = match.group(1)
-        info = match.group(2)
-        code_body = match.group(3)
-        closing = match.group(4)
-
+    for fence in fences(doc):
+        opener = fence.opener
+        if not opener.startswith("```") or fence.closer is None or not fence.closer.startswith("```"):
+            continue
+        info = opener[3:].lstrip(" \t")
+        if "`" in info:
+            continue
         snippet_count += 1
         if "title=" in info:
-            return match.group(0)
-
+            continue
         new_info = add_title_to_fence(info, original_label, snippet_count)
-        new_opening = "```" + ((" " + new_info) if new_info else "") + "\n"
+        fence.opener = "```" + ((" " + new_info) if new_info else "")
         modified += 1
-        return new_opening + code_body + closing
-
-    new_text = pattern.sub(repl, md_text)
-    return new_text, modified
+    return modified
 
 
-# --------------------------------------------------------
-# 2) MDX safety pass (OUTSIDE code fences)
-# --------------------------------------------------------
-
-def sanitize_body_for_mdx(md_text: str) -> str:
+def inject_titles_into_fences(md_text: str, original_label: str) -> Tuple[str, int]:
     """
-    Line-based pass:
-    - Track fenced code blocks with ``` lines.
-    - INSIDE fences: keep everything 100% as-is (code must not be touched).
-    - OUTSIDE fences:
-        * indent lines starting with 'import ' or 'export ' so MDX
-          sees them as code, not real ESM.
-        * escape ALL `<` and `>` (except ones already &lt; / &gt;)
-          so MDX doesn't treat them as JSX/HTML.
+    Search md_text for fenced code blocks and add title attributes where missing.
+    Returns new_text, count_of_modified_fences.
     """
-    lines = md_text.splitlines()
-    out_lines = []
-    in_fence = False
-
-    fence_re = re.compile(r'^```')
-    import_re = re.compile(r'^(import|export)\b')
-    lt_re = re.compile(r'(?<!&lt;)<')
-    gt_re = re.compile(r'(?<!&gt;)>')
-
-    for line in lines:
-        stripped = line.lstrip()
-
-        # Toggle fence mode
-        if fence_re.match(stripped):
-            in_fence = not in_fence
-            out_lines.append(line)
-            continue
+    doc = parse(md_text, front_matter=False)
+    modified = title_fences(doc, original_label)
+    return serialize(doc), modified
 
-        if in_fence:
-            # Never touch code
-            out_lines.append(line)
-            continue
 
-        # ---------- OUTSIDE fences only ----------
+# --------------------------------------------------------
+# 2) MDX safety pass (OUTSIDE code fences)
+# --------------------------------------------------------
 
-        # 1) ESM: indent import/export to make them code, not MDX ESM
-        if import_re.match(stripped):
-            new_line = "    " + stripped
-        else:
-            new_line = line
+IMPORT_RE = re.compile(r'^(import|export)\b')
+LT_RE = re.compile(r'(?<!&lt;)<')
+GT_RE = re.compile(r'(?<!&gt;)>')
 
-        # 2) Escape all < and > so MDX doesn't think they are JSX/HTML tags
-        new_line = lt_re.sub('&lt;', new_line)
-        new_line = gt_re.sub('&gt;', new_line)
 
-        out_lines.append(new_line)
+def escape_line(line: str) -> str:
+    if "<" not in line and ">" not in line and "port" not in line:
+        return line
+    stripped = line.lstrip()
 
-    return "\n".join(out_lines)
+    # 1) ESM: indent import/export to make them code, not MDX ESM
+    if IMPORT_RE.match(stripped):
+        line = "    " + stripped
 
+    # 2) Escape all < and > so MDX doesn't think they are JSX/HTML tags
+    line = LT_RE.sub('&lt;', line)
+    return GT_RE.sub('&gt;', line)
 
-# --------------------------------------------------------
-# 3) Front-matter handling
-# --------------------------------------------------------
 
-def split_front_matter(text: str) -> Tuple[str, str]:
+def escape_for_mdx(doc: Document) -> int:
     """
-    If text starts with:
-
-        ---
-        ...
-        ---
-
-    Return (front_matter_with_delimiters, body)
-    Else: ("", text)
+    OUTSIDE fences (code is never touched):
+    - indent lines starting with 'import ' or 'export ' so MDX
+      sees them as code, not real ESM.
+    - escape ALL `<` and `>` (except ones already &lt; / &gt;)
+      so MDX doesn't treat them as JSX/HTML.
+    Returns the number of changed lines.
     """
-    if not text.lstrip().startswith("---"):
-        return "", text
+    return map_text_lines(doc, escape_line)
 
-    if not text.startswith("---"):
-        # Some BOM or leading spaces: don't try to be clever
-        return "", text
 
-    parts = text.split("\n")
-    if len(parts) < 3:
-        return "", text
+def sanitize_body_for_mdx(md_text: str) -> str:
+    doc = parse(md_text, front_matter=False)
+    escape_for_mdx(doc)
+    return serialize(doc)
 
-    end_index = None
-    for i in range(1, len(parts)):
-        if parts[i].strip() == "---":
-            end_index = i
-            break
 
-    if end_index is None:
-        return "", text
+def sanitize_doc(doc: Document, label: str) -> int:
+    """MDX-escape the body, then title the fences; returns fences titled."""
+    escape_for_mdx(doc)
+    titled = title_fences(doc, label)
+    # the sanitizer has always written "\n".join(lines): no final newline
+    # (and no trailing blank lines, so a second run changes nothing)
+    trim_end(doc)
+    return titled
 
-    fm_lines = parts[: end_index + 1]
-    body_lines = parts[end_index + 1 :]
-    fm_text = "\n".join(fm_lines)
-    body_text = "\n".join(body_lines)
-    return fm_text, body_text
 
+# --------------------------------------------------------
+# 3) Files
+# --------------------------------------------------------
 
 def sanitize_markdown_file(md_path: Path, label: str) -> int:
     """
     Sanitize a single .md file:
-    - split front matter
+    - keep front matter as is
     - MDX-sanitize body (imports, <2>, <2025-01-01>, etc.)
     - inject snippet titles into fenced code blocks
-    - write back
+    - write back, only if that changed anything
     Returns: number of code fences where title was added.
     """
-    original_text = md_path.read_text(encoding="utf-8")
-
-    front_matter, body = split_front_matter(original_text)
-
-    # Step 1: make body MDX-safe
-    safe_body = sanitize_body_for_mdx(body)
-
-    # Step 2: inject titles into fenced code blocks
-    final_body, changed = inject_titles_into_fences(safe_body, label)
+    doc = doc_model.read(md_path)
+    changed = sanitize_doc(doc, label)
+    atomic_write_text_if_changed(md_path, serialize(doc))
+    return changed
 
-    new_text = (front_matter + "\n" + final_body) if front_matter else final_body
 
-    md_path.write_text(new_text, encoding="utf-8")
-    return changed
+def pending_changes(md_path: Path, label: str) -> Tuple[int, int]:
+    """(lines escaped, fences titled) that sanitize_markdown_file would make; writes nothing."""
+    doc = doc_model.read(md_path)
+    escaped = escape_for_mdx(doc)
+    return escaped, title_fences(doc, label)
 
 
 # --------------------------------------------------------
@@ -239,4 +200,4 @@ def main():
             else:
                 print(f"[SKIP] {p} (no fences or already titled)")
         print("Done. Total fences modified:", total_changed)
-        return
\ No newline at end of file
+        return
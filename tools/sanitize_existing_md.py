@@ -10,6 +10,17 @@ Example:
 import sys
 from pathlib import Path
 import re
+from typing import List
+
+import doc_model
+from atomic_write import atomic_write_text_if_changed
+from doc_model import Builder, Document, FencedCode, fences, map_text_lines, serialize, text_blocks
+from line_classifier import CODE, INDENT
+
+PRE_OPEN_RE = re.compile(r'(?i)<pre[\s>]')
+PRE_CODE_RE = re.compile(r'(?i)<pre[^>]*>\s*<code[^>]*>([\s\S]*?)</code>\s*</pre>$')
+PRE_RE = re.compile(r'(?i)<pre[^>]*>([\s\S]*?)</pre>$')
+INDENT_RE = re.compile(r'^( {4}|\t)')
 
 def detect_language_snippet(code_snippet: str) -> str:
     """Very small heuristic to choose a language for Prism.
@@ -35,41 +46,110 @@ def detect_language_snippet(code_snippet: str) -> str:
         return "sql"
     return ""
 
-def add_title_to_fence(fence_open: str, title: str) -> str:
-    """Given opening fence like ``` or ```python, return with title attribute."""
-    # Normalize fence
-    m = re.match(r'^```([\w+-]*)', fence_open)
-    lang = m.group(1) if m else ""
-    lang_part = lang if lang else ""
-    if lang_part:
-        return f"```{lang_part} title=\"{title}\""
+def fence_header(lang: str, title: str) -> str:
+    if lang:
+        return f"```{lang} title=\"{title}\""
     else:
         return f"``` title=\"{title}\""
 
-def sanitize_text(text: str) -> str:
+def sanitize_line(line: str) -> str:
     # 1) comment top-level import/export lines (JS/TS) to avoid MDX ESM
-    text = re.sub(r'(?m)^\s*(import\s.*|export\s.*)$', r'<!-- SANITIZED: \1 -->', text)
+    line = re.sub(r'^\s*(import\s.*|export\s.*)$', r'<!-- SANITIZED: \1 -->', line)
 
     # 2) escape "<" followed by digit (e.g. "<2") that MDX may parse as JSX
-    text = re.sub(r'<(?=\d)', '&lt;', text)
+    line = re.sub(r'<(?=\d)', '&lt;', line)
 
     # 3) escape script/iframe open tags so they don't become HTML elements
-    text = re.sub(r'(?i)<\s*script', '&lt;script', text)
-    text = re.sub(r'(?i)<\s*/\s*script', '&lt;/script', text)
-    text = re.sub(r'(?i)<\s*iframe', '&lt;iframe', text)
-    text = re.sub(r'(?i)<\s*/\s*iframe', '&lt;/iframe', text)
-
-    # 4) replace stray raw backticks inside code blocks if necessary handled later
-    return text
+    line = re.sub(r'(?i)<\s*script', '&lt;script', line)
+    line = re.sub(r'(?i)<\s*/\s*script', '&lt;/script', line)
+    line = re.sub(r'(?i)<\s*iframe', '&lt;iframe', line)
+    line = re.sub(r'(?i)<\s*/\s*iframe', '&lt;/iframe', line)
+    return line
+
+def pre_blocks_to_fences(doc: Document, title: str) -> int:
+    """<pre>...</pre> (optionally wrapping <code>) outside fences -> fenced block."""
+    b = Builder()
+    pre: List[str] = []
+    made = 0
+    for node in doc.blocks:
+        if isinstance(node, FencedCode):
+            b.lines(pre)
+            pre = []
+            b.block(node)
+            continue
+        for line in node.to_lines():
+            if not pre and not PRE_OPEN_RE.match(line.lstrip()):
+                b.line(line)
+                continue
+            pre.append(line)
+            if "</pre>" not in line.lower():
+                continue
+            html = "\n".join(pre).strip()
+            m = PRE_CODE_RE.match(html) or PRE_RE.match(html)
+            if m:
+                inner_clean = m.group(1).strip('\n')
+                b.block(FencedCode(fence_header(detect_language_snippet(inner_clean), title),
+                                   inner_clean.split("\n")))
+                made += 1
+            else:
+                b.lines(pre)
+            pre = []
+    b.lines(pre)
+    if made:
+        doc.blocks = b.blocks
+    return made
+
+def indented_to_fences(doc: Document, title: str) -> int:
+    """Runs of lines indented by 4 spaces or a tab outside fences -> fenced block."""
+    b = Builder()
+    block_buf: List[str] = []
+    made = 0
+    # one batch classification for every line outside fences
+    labels = iter(INDENT.classify([line for node in text_blocks(doc) for line in node.to_lines()]))
+
+    def flush():
+        nonlocal made
+        if block_buf:
+            code_text = '\n'.join(block_buf).rstrip('\n')
+            b.block(FencedCode(fence_header(detect_language_snippet(code_text), title), code_text.split("\n")))
+            block_buf.clear()
+            made += 1
+
+    for node in doc.blocks:
+        if isinstance(node, FencedCode):
+            flush()
+            b.block(node)
+            continue
+        for line in node.to_lines():
+            if next(labels) == CODE:
+                block_buf.append(INDENT_RE.sub('', line))
+                continue
+            flush()
+            b.line(line)
+    flush()
+    if made:
+        doc.blocks = b.blocks
+    return made
+
+def title_all_fences(doc: Document, title: str) -> int:
+    """Give every closed fence a title and, if missing, a detected language."""
+    count = 0
+    for fence in fences(doc):
+        if fence.marker != "```" or fence.closer is None:
+            continue
+        mlang = re.match(r'^```([\w+-]+)?', fence.opener.lstrip())
+        lang = mlang.group(1) if mlang and mlang.group(1) else ""
+        if not lang:
+            # best-effort language detection from the code itself
+            lang = detect_language_snippet("\n".join(fence.lines))
+        fence.opener = fence_header(lang, title)
+        count += 1
+    return count
 
 def wrap_code_blocks(md_path: Path, original_filename: str):
-    text = md_path.read_text(encoding='utf-8')
-
-    # sanitize first
-    text = sanitize_text(text)
-
-    # Normalize windows CRLF -> LF for stable regex
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    # CRLF -> LF happens in parse
+    doc = doc_model.read(md_path)
+    title = Path(original_filename).name
 
     # We will support both converted code forms:
     # - triple backtick blocks (``` ... ```)
@@ -79,125 +159,16 @@ def wrap_code_blocks(md_path: Path, original_filename: str):
     # 1) convert <pre>...</pre> to fenced
     # 2) convert indented blocks to fenced
     # 3) ensure all fenced blocks have title attribute (use original_filename)
-    # 4) possibly add a language detection for empty fences
-
-    # 1) <pre>...</pre> -> fenced (preserve content)
-    def _pre_repl(m):
-        inner = m.group(1)
-        # trim trailing/leading newline
-        inner_clean = inner.strip('\n')
-        lang = detect_language_snippet(inner_clean)
-        lang_attr = lang if lang else ""
-        title = Path(original_filename).name
-        if lang_attr:
-            return f"\n```{lang_attr} title=\"{title}\"\n{inner_clean}\n```\n"
-        else:
-            return f"\n``` title=\"{title}\"\n{inner_clean}\n```\n"
-    text = re.sub(r'<pre[^>]*>\s*<code[^>]*>([\s\S]*?)</code>\s*</pre>', _pre_repl, text, flags=re.I)
-    text = re.sub(r'<pre[^>]*>([\s\S]*?)</pre>', _pre_repl, text, flags=re.I)
-
-    # 2) Convert indented code blocks (lines that start with 4 spaces or a tab)
-    lines = text.splitlines()
-    out_lines = []
-    in_block = False
-    block_buf = []
-    for line in lines:
-        if re.match(r'^( {4}|\t)', line):
-            block_buf.append(re.sub(r'^( {4}|\t)', '', line))
-            in_block = True
-            continue
-        else:
-            if in_block:
-                # flush buffer to fenced block
-                code_text = '\n'.join(block_buf).rstrip('\n')
-                lang = detect_language_snippet(code_text)
-                title = Path(original_filename).name
-                if lang:
-                    out_lines.append(f"```{lang} title=\"{title}\"")
-                else:
-                    out_lines.append(f"``` title=\"{title}\"")
-                out_lines.append(code_text)
-                out_lines.append("```")
-                block_buf = []
-                in_block = False
-            out_lines.append(line)
-    if in_block and block_buf:
-        code_text = '\n'.join(block_buf).rstrip('\n')
-        lang = detect_language_snippet(code_text)
-        title = Path(original_filename).name
-        if lang:
-            out_lines.append(f"```{lang} title=\"{title}\"")
-        else:
-            out_lines.append(f"``` title=\"{title}\"")
-        out_lines.append(code_text)
-        out_lines.append("```")
-
-    text = '\n'.join(out_lines)
-
-    # 3) Ensure all fenced blocks have a title attribute and language hint if missing
-    # Find opening fences like ``` or ```python or ``` python
-    def fence_repl(m):
-        fence = m.group(0)  # e.g. ``` or ```python
-        code_preview = m.group(1)[:200] if m.group(1) else ""
-        # detect language already in fence
-        mlang = re.match(r'^```([\w+-]+)?', fence)
-        lang = mlang.group(1) if mlang and mlang.group(1) else ""
-        title = Path(original_filename).name
-        if lang:
-            return f"```{lang} title=\"{title}\""
-        else:
-            # try to detect language from code_preview (best-effort)
-            guessed = detect_language_snippet(code_preview)
-            if guessed:
-                return f"```{guessed} title=\"{title}\""
-            else:
-                return f"``` title=\"{title}\""
-
-    # This is a bit tricky — to see code after fence we use regex with DOTALL capturing of (.*?) until next ```
-    # We'll rewrite all fences by scanning sequentially to avoid wrong multi-line matches.
-    parts = []
-    idx = 0
-    pattern = re.compile(r'```([\w+-]*)(?:\s*title=".*?")?\n', re.MULTILINE)
-    for m in pattern.finditer(text):
-        start = m.start()
-        # append text before fence
-        parts.append(text[idx:start])
-        # find the closing fence after this match
-        open_lang = m.group(1)
-        fence_open_end = m.end()
-        # find next closing ```
-        close_idx = text.find('\n```', fence_open_end)
-        if close_idx == -1:
-            # fallback: no closing fence, keep the rest as-is and break
-            rest = text[start:]
-            parts.append(rest)
-            idx = len(text)
-            break
-        # capture code inside
-        code_inside = text[fence_open_end:close_idx]
-        # build new fence header
-        title = Path(original_filename).name
-        if open_lang:
-            new_header = f"```{open_lang} title=\"{title}\"\n"
-        else:
-            guessed = detect_language_snippet(code_inside)
-            if guessed:
-                new_header = f"```{guessed} title=\"{title}\"\n"
-            else:
-                new_header = f"``` title=\"{title}\"\n"
-        parts.append(new_header)
-        parts.append(code_inside)
-        parts.append("\n```")
-        idx = close_idx + 4  # skip past closing fence (```)
-    if idx < len(text):
-        parts.append(text[idx:])
-    new_text = ''.join(parts)
-
-    # final sanitize again
-    new_text = sanitize_text(new_text)
-
-    md_path.write_text(new_text, encoding='utf-8')
-    print("Sanitized & wrapped:", md_path)
+    # 4) sanitize everything outside the fences
+    pre_blocks_to_fences(doc, title)
+    indented_to_fences(doc, title)
+    title_all_fences(doc, title)
+    map_text_lines(doc, sanitize_line)
+
+    if atomic_write_text_if_changed(md_path, serialize(doc)):
+        print("Sanitized & wrapped:", md_path)
+    else:
+        print("Unchanged:", md_path)
 
 def main():
     if len(sys.argv) < 3:
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+tools/synthetic_docs.py
+
+Generate synthetic DOCX / PDF uploads and converter-style markdown (no
+third-party deps) for benchmarks
+and load tests.
+
+Usage:
+    python tools/synthetic_docs.py docx out.docx [paragraphs] [code_ratio]
+    python tools/synthetic_docs.py pdf  out.pdf  [pages] [code_ratio]
+    python tools/synthetic_docs.py md   out.md   [lines] [code_ratio]
+
+code_ratio (0..1) controls how many paragraphs / lines look like code.
+"""
+
+import random
+import sys
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+PROSE = (
+    "The ingestion service reads files from the landing bucket and records "
+    "metadata for each batch before handing it to the OCR stage."
+)
+CODE_LINES = (
+    "from storage.mongo_client import get_db",
+    "def ensure_indexes(db):",
+    "    db.docs.create_index([(\"sha256\", 1)], unique=True)",
+    "    return db",
+    "result = client.find({\"team\": team_id})",
+    "for doc in result:",
+    "    print(doc[\"title\"])",
+)
+
+
+def _lines(count: int, code_ratio: float, seed: int):
+    rnd = random.Random(seed)
+    i = 0
+    while i < count:
+        if rnd.random() < code_ratio:
+            for line in CODE_LINES:
+                yield True, line
+            i += len(CODE_LINES)
+        else:
+            yield False, PROSE
+            i += 1
+
+
+# --------------------------------------------------------
+# DOCX
+# --------------------------------------------------------
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Default Extension="png" ContentType="image/png"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_IMAGE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+
+def png_bytes(width: int = 320, height: int = 240, seed: int = 0) -> bytes:
+    """A noisy RGB PNG (compresses badly, like a real screenshot with gradients)."""
+    import struct
+    import zlib
+
+    rnd = random.Random(seed)
+    rows = b"".join(b"\x00" + rnd.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def _drawing(rel_id: str, n: int) -> str:
+    return (
+        '<w:p><w:r><w:drawing>'
+        '<wp:inline xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing">'
+        f'<wp:extent cx="3048000" cy="2286000"/><wp:docPr id="{n}" name="Picture {n}" descr="Screenshot {n}"/>'
+        '<a:graphic xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+        '<a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        '<pic:pic xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:blipFill><a:blip r:embed="{rel_id}"/></pic:blipFill>'
+        '</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>'
+    )
+
+
+def docx_bytes(
+    paragraphs: int = 40,
+    code_ratio: float = 0.3,
+    seed: int = 0,
+    images: int = 0,
+    distinct_images: int = 2,
+) -> bytes:
+    """`images` screenshots are spread through the text, cycling through `distinct_images` PNGs."""
+    import io
+
+    body = [f'<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Synthetic week {seed}</w:t></w:r></w:p>']
+    every = max(1, paragraphs // images) if images else 0
+    placed = 0
+    for n, (is_code, text) in enumerate(_lines(paragraphs, code_ratio, seed)):
+        if images and placed < images and n >= placed * every and not is_code:
+            body.append(_drawing(f"rIdImg{placed % distinct_images}", placed + 1))
+            placed += 1
+        t = escape(text)
+        if is_code:
+            body.append(
+                '<w:p><w:r><w:rPr><w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/></w:rPr>'
+                f'<w:t xml:space="preserve">{t}</w:t></w:r></w:p>'
+            )
+        else:
+            body.append(f"<w:p><w:r><w:t>{t}</w:t></w:r></w:p>")
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}" xmlns:r="{_R_NS}"><w:body>{"".join(body)}</w:body></w:document>'
+    )
+    used = min(placed, distinct_images)
+    document_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(
+            f'<Relationship Id="rIdImg{i}" Type="{_IMAGE_REL}" Target="media/image{i}.png"/>' for i in range(used)
+        )
+        + "</Relationships>"
+    )
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        z.writestr("_rels/.rels", _RELS)
+        z.writestr("word/document.xml", document)
+        if used:
+            z.writestr("word/_rels/document.xml.rels", document_rels)
+            for i in range(used):
+                z.writestr(f"word/media/image{i}.png", png_bytes(seed=seed * 1000 + i))
+    return buf.getvalue()
+
+
+# --------------------------------------------------------
+# PDF
+# --------------------------------------------------------
+
+def _pdf_str(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_bytes(pages: int = 5, code_ratio: float = 0.3, seed: int = 0, lines_per_page: int = 40) -> bytes:
+    lines = list(_lines(pages * lines_per_page, code_ratio, seed))
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages tree, filled below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+    ]
+    kids = []
+    for p in range(pages):
+        chunk = lines[p * lines_per_page:(p + 1) * lines_per_page]
+        ops = ["BT", "14 TL", "50 800 Td"]
+        for is_code, text in chunk:
+            font = "/F2 9 Tf" if is_code else "/F1 10 Tf"
+            ops.append(f"{font} ({_pdf_str(text)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops)
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            "/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> "
+            f"/Contents {content_ref} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+# --------------------------------------------------------
+# Markdown (as a converter leaves it, before mdx_safe / sanitize)
+# --------------------------------------------------------
+
+MD_PROSE = (
+    PROSE,
+    "Batches older than <30 days> are archived; see <b>retention</b> below.",
+    "Run it after the <2025-01-01> cut-over, or use the <em>dry run</em> flag.",
+    "- retries back off exponentially (1s, 2s, 4s)",
+    '<a id="_Toc1234"></a>Results are written to the reports table.',
+)
+MD_HEADINGS = (
+    "## {n}. storage/mongo_client.py (DB connection & index ensures)",
+    "## {n}. How to run:",
+    "# Part {n}",
+)
+
+
+def markdown_text(lines: int = 500, code_ratio: float = 0.3, seed: int = 0) -> str:
+    """Converter-style markdown: headings, prose with stray tags, naked code, fences."""
+    rnd = random.Random(seed)
+    out = []
+    for n, (is_code, line) in enumerate(_lines(lines, code_ratio, seed)):
+        if is_code:
+            out.append(line)
+            continue
+        if n % 25 == 0:
+            out += [rnd.choice(MD_HEADINGS).format(n=n // 25 + 1), ""]
+        if n % 60 == 0:
+            out += ["```", *CODE_LINES[:3], "```", ""]
+        out += [rnd.choice(MD_PROSE), ""]
+    return "\n".join(out) + "\n"
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("docx", "pdf", "md"):
+        print("Usage: python tools/synthetic_docs.py <docx|pdf|md> out_path [size] [code_ratio]")
+        sys.exit(2)
+
+    kind, out_path = sys.argv[1], Path(sys.argv[2])
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else {"docx": 40, "pdf": 5, "md": 500}[kind]
+    code_ratio = float(sys.argv[4]) if len(sys.argv) > 4 else 0.3
+
+    if kind == "docx":
+        data = docx_bytes(size, code_ratio)
+    elif kind == "pdf":
+        data = pdf_bytes(size, code_ratio)
+    else:
+        data = markdown_text(size, code_ratio).encode("utf-8")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(data)
+    print("Wrote", out_path, f"({len(data)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# upload_service/__init__.py
+import sys
+from pathlib import Path
+
+# tools/ modules are imported by file name (same as when run as scripts)
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+if str(TOOLS) not in sys.path:
+    sys.path.insert(0, str(TOOLS))
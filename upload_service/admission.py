@@ -0,0 +1,157 @@
+# upload_service/admission.py
+"""
+Admission control for the conversion endpoints.
+
+At most `limit` requests are processed at once; up to `max_queue` more wait
+in line (FIFO). Anything beyond that is turned away immediately instead of
+slowing every request down:
+
+    429 + Retry-After   the queue is full
+    503 + Retry-After   a request waited in the queue longer than queue_timeout
+
+Retry-After is derived from the observed service time (an EWMA of how long
+an admitted request held its slot) and the number of requests ahead.
+
+    async with ADMISSION.slot():
+        ...receive / convert / write...
+
+A request that runs several conversions at once (a batch upload) takes one
+slot per conversion, up to the whole limit, and waits in the same queue:
+
+    async with ADMISSION.slot(len(entries)) as slots:
+        ...at most `slots` conversions at a time...
+
+Config (env):
+    UPLOAD_MAX_CONCURRENT       requests processed at once (default: pool size, min 1)
+    UPLOAD_MAX_QUEUE            requests allowed to wait (default 4 x concurrency)
+    UPLOAD_QUEUE_TIMEOUT_SECONDS  longest wait in the queue (default 120)
+"""
+import asyncio
+import collections
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Deque, Tuple
+
+from fastapi import HTTPException
+
+from .worker_pool import POOL_SIZE
+
+MAX_CONCURRENT = int(os.environ.get("UPLOAD_MAX_CONCURRENT", max(1, POOL_SIZE)))
+MAX_QUEUE = int(os.environ.get("UPLOAD_MAX_QUEUE", 4 * MAX_CONCURRENT))
+QUEUE_TIMEOUT = float(os.environ.get("UPLOAD_QUEUE_TIMEOUT_SECONDS", 120))
+
+EWMA_ALPHA = 0.2
+MAX_RETRY_AFTER = 600
+
+
+class AdmissionControl:
+    def __init__(
+        self,
+        limit: int = MAX_CONCURRENT,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+        initial_service_time: float = 5.0,
+    ):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.service_time = initial_service_time  # EWMA, seconds
+        self.running = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+        self._waiters: Deque[Tuple[asyncio.Future, int]] = collections.deque()  # (future, slots)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a request arriving now."""
+        ahead = sum(slots for _, slots in self._waiters) + self.running
+        estimate = self.service_time * math.ceil((ahead + 1) / max(self.limit, 1))
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def _reject(self, status: int, reason: str, message: str):
+        self.rejected[reason] += 1
+        retry = self.retry_after()
+        raise HTTPException(
+            status,
+            f"{message}; retry in {retry}s",
+            headers={"Retry-After": str(retry)},
+        )
+
+    async def _acquire(self, slots: int):
+        if self.running + slots <= self.limit and not self._waiters:
+            self.running += slots
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject(429, "queue_full", "Upload queue is full")
+
+        fut = asyncio.get_running_loop().create_future()
+        waiter = (fut, slots)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done():
+                return  # the slots were handed over just as we timed out
+            fut.cancel()
+            self._waiters.remove(waiter)
+            self._dispatch()  # a smaller request behind it may fit now
+            self._reject(503, "queue_timeout", "Server busy")
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self._release(slots)  # got the slots but the request was cancelled
+            else:
+                fut.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._dispatch()
+            raise
+
+    def _release(self, slots: int):
+        self.running -= slots
+        self._dispatch()
+
+    def _dispatch(self):
+        # hand free slots to the waiters in FIFO order, while the first fits
+        while self._waiters:
+            fut, slots = self._waiters[0]
+            if fut.done():
+                self._waiters.popleft()
+                continue
+            if self.running + slots > self.limit:
+                return
+            self._waiters.popleft()
+            self.running += slots
+            fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, slots: int = 1, record: bool = True):
+        """
+        Hold `slots` processing slots (at most the limit); yields how many.
+        `record=False` keeps unusual requests (e.g. whole-team batches) out
+        of the service-time estimate.
+        """
+        slots = max(1, min(slots, self.limit))
+        await self._acquire(slots)
+        started = time.monotonic()
+        try:
+            yield slots
+        finally:
+            if record:
+                elapsed = time.monotonic() - started
+                self.service_time += EWMA_ALPHA * (elapsed - self.service_time)
+            self._release(slots)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "service_time_s": round(self.service_time, 3),
+            "retry_after_s": self.retry_after(),
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,135 @@
+# upload_service/batch.py
+"""
+Helpers for POST /upload/batch/ (onboard a whole team in one request).
+
+- expand a ZIP into per-document entries (size-capped, hashed, sniffed)
+- infer the week from names like `week5.docx`, `Week-05 design.pdf`, `05.docx`
+- commit all converted markdown together: every file is staged next to its
+  target first, then all of them are renamed into place in one quick pass
+  (rolled back if one of the renames fails)
+"""
+import os
+import re
+import shutil
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from atomic_write import stage_bytes, temp_path
+
+from .ingest import MAX_UPLOAD_BYTES, copy_and_hash
+
+MAX_BATCH_ENTRIES = int(os.environ.get("UPLOAD_BATCH_MAX_ENTRIES", 64))
+
+WEEK_RE = re.compile(r"week[\s_-]*0*(\d{1,2})(?!\d)", re.IGNORECASE)
+LEADING_NUM_RE = re.compile(r"^0*(\d{1,2})(?!\d)")
+
+
+def infer_week(filename: str, mapping: Dict[str, str]) -> Optional[str]:
+    """Week string for `filename`: explicit mapping first, then the name."""
+    name = PurePosixPath(filename).name
+    if name in mapping:
+        return mapping[name]
+    stem = PurePosixPath(name).stem
+    m = WEEK_RE.search(stem) or LEADING_NUM_RE.match(stem)
+    return m.group(1) if m else None
+
+
+def extract_zip(zip_path: Path, dest_dir: Path, allowed: set) -> List[dict]:
+    """
+    Unpack allowed members of `zip_path` into `dest_dir`.
+
+    Returns one entry per member: {"file", "path", "sha256", "bytes"} or
+    {"file", "error"}. Directories and macOS metadata are skipped silently.
+    """
+    entries: List[dict] = []
+    try:
+        zf = zipfile.ZipFile(zip_path)
+    except zipfile.BadZipFile:
+        raise HTTPException(400, "Uploaded .zip is not a valid zip archive")
+
+    with zf:
+        members = [
+            info for info in zf.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and not PurePosixPath(info.filename).name.startswith(".")
+        ]
+        if len(members) > MAX_BATCH_ENTRIES:
+            raise HTTPException(413, f"Zip has {len(members)} files, limit is {MAX_BATCH_ENTRIES}")
+
+        for info in members:
+            name = PurePosixPath(info.filename).name
+            ext = PurePosixPath(name).suffix.lower()
+            if ext not in allowed:
+                entries.append({"file": name, "error": "Only .docx or .pdf allowed"})
+                continue
+            if info.file_size > MAX_UPLOAD_BYTES:
+                entries.append({"file": name, "error": f"File is {info.file_size} bytes, limit is {MAX_UPLOAD_BYTES} bytes"})
+                continue
+            dest = dest_dir / f"{uuid.uuid4().hex}{ext}"
+            try:
+                with zf.open(info) as src:
+                    received = copy_and_hash(src, dest)
+            except HTTPException as e:
+                entries.append({"file": name, "error": e.detail})
+                continue
+            entries.append({
+                "file": name,
+                "path": received.path,
+                "sha256": received.sha256,
+                "bytes": received.size,
+            })
+    return entries
+
+
+def _keep_old(path: Path) -> Optional[Path]:
+    """Hard link (or copy) of path's current content for a rollback; None if it is new."""
+    if not path.exists():
+        return None
+    keep = temp_path(path)
+    try:
+        os.link(path, keep)
+    except OSError:
+        shutil.copy2(path, keep)
+    return keep
+
+
+def commit_all(writes: List[Tuple[Path, str]], before_replace: Callable[[Path], None]):
+    """
+    Write every (path, text) pair as one unit: stage all temp files first
+    (nothing in docs/ changes if any staging write fails), then rename them
+    into place back to back. If a rename (or before_replace) fails, the
+    files already replaced get their old content back and new ones are
+    removed, so docs/ holds all of the batch or none of it.
+    """
+    staged: List[Tuple[Path, Path]] = []
+    try:
+        for out_md, text in writes:
+            staged.append((stage_bytes(out_md, text.encode("utf-8")), out_md))
+    except BaseException:
+        for tmp, _ in staged:
+            tmp.unlink(missing_ok=True)
+        raise
+
+    replaced: List[Tuple[Path, Optional[Path]]] = []  # (target, its old content)
+    try:
+        for tmp, out_md in staged:
+            before_replace(out_md)
+            replaced.append((out_md, _keep_old(out_md)))
+            os.replace(tmp, out_md)
+    except BaseException:
+        for out_md, old in reversed(replaced):
+            if old is None:
+                out_md.unlink(missing_ok=True)
+            else:
+                os.replace(old, out_md)
+        for tmp, _ in staged:
+            tmp.unlink(missing_ok=True)
+        raise
+    for _, old in replaced:
+        if old is not None:
+            old.unlink(missing_ok=True)
@@ -0,0 +1,154 @@
+# upload_service/catalog.py
+"""
+In-memory catalog of docs/modules/<module>/<team>/weekN.md.
+
+Built once at startup with os.scandir (each doc is read once to hash it and
+tell stubs from real uploads), then kept current by the upload/delete
+handlers, so listing endpoints never touch the filesystem.
+
+States:
+    stub       scaffold_docs.py template ("_No document uploaded yet._")
+    deleted    stub written by /delete/ ("... Previous upload was deleted.")
+    uploaded   anything else
+"""
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+WEEK_FILE_RE = re.compile(r"^week(\d+)\.md$")
+
+STUB_MARKER = "_No document uploaded yet."
+DELETED_MARKER = "Previous upload was deleted."
+
+STATES = ("stub", "deleted", "uploaded")
+
+
+class DocEntry(NamedTuple):
+    module: str
+    team: str
+    week: int
+    path: str       # relative to the repo root, posix
+    state: str
+    size: int
+    sha256: str
+    mtime: float
+
+
+def classify(text: str) -> str:
+    if DELETED_MARKER in text:
+        return "deleted"
+    if STUB_MARKER in text:
+        return "stub"
+    return "uploaded"
+
+
+class DocCatalog:
+    def __init__(self, docs_base: Path, base: Path):
+        self.docs_base = docs_base
+        self.base = base
+        self._docs: Dict[Tuple[str, str, int], DocEntry] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def _entry(self, module: str, team: str, week: int, path: Path, data: bytes, mtime: float) -> DocEntry:
+        return DocEntry(
+            module=module,
+            team=team,
+            week=week,
+            path=path.relative_to(self.base).as_posix(),
+            state=classify(data.decode("utf-8", "replace")),
+            size=len(data),
+            sha256=hashlib.sha256(data).hexdigest(),
+            mtime=mtime,
+        )
+
+    def build(self) -> int:
+        """(Re)scan docs/modules; returns the number of docs found."""
+        docs: Dict[Tuple[str, str, int], DocEntry] = {}
+        if self.docs_base.is_dir():
+            with os.scandir(self.docs_base) as modules:
+                for mod in modules:
+                    if not mod.is_dir():
+                        continue
+                    with os.scandir(mod.path) as teams:
+                        for team in teams:
+                            if not team.is_dir():
+                                continue
+                            with os.scandir(team.path) as files:
+                                for f in files:
+                                    m = WEEK_FILE_RE.match(f.name)
+                                    if not m or not f.is_file():
+                                        continue
+                                    with open(f.path, "rb") as fh:
+                                        data = fh.read()
+                                    week = int(m.group(1))
+                                    docs[(mod.name, team.name, week)] = self._entry(
+                                        mod.name, team.name, week, Path(f.path), data, f.stat().st_mtime
+                                    )
+        with self._lock:
+            self._docs = docs
+            self.built = True
+        return len(docs)
+
+    def update(self, md_path: Path, text: Optional[str] = None):
+        """
+        Record the doc just written at docs/modules/<module>/<team>/weekN.md
+        (pass the text that was written to skip reading it back).
+        """
+        m = WEEK_FILE_RE.match(md_path.name)
+        if not m:
+            return
+        module, team = md_path.parent.parent.name, md_path.parent.name
+        week = int(m.group(1))
+        data = md_path.read_bytes() if text is None else text.encode("utf-8")
+        try:
+            mtime = md_path.stat().st_mtime
+        except OSError:
+            mtime = 0.0
+        entry = self._entry(module, team, week, md_path, data, mtime)
+        with self._lock:
+            self._docs[(module, team, week)] = entry
+
+    def update_many(self, writes: List[Tuple[Path, str]]):
+        """update() for every (md_path, text) a batch upload committed."""
+        for md_path, text in writes:
+            self.update(md_path, text)
+
+    def list(
+        self,
+        module: Optional[str] = None,
+        team: Optional[str] = None,
+        state: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[int, List[DocEntry]]:
+        """Matching docs sorted by module/team/week: (total, one page)."""
+        with self._lock:
+            docs = list(self._docs.values())
+        team = team.lower() if team else None
+        docs = [
+            d for d in docs
+            if (module is None or d.module == module)
+            and (team is None or d.team.lower() == team)
+            and (state is None or d.state == state)
+        ]
+        docs.sort(key=lambda d: (d.module, d.team.lower(), d.week))
+        return len(docs), docs[offset:offset + limit]
+
+    def team_status(self, module: str, team: str) -> dict:
+        _, docs = self.list(module=module, team=team, limit=len(self._docs))
+        counts = {s: 0 for s in STATES}
+        for d in docs:
+            counts[d.state] += 1
+        return {
+            "module": module,
+            "team": team,
+            "counts": counts,
+            "weeks": [
+                {"week": d.week, "state": d.state, "path": d.path, "size": d.size, "mtime": d.mtime}
+                for d in docs
+            ],
+        }
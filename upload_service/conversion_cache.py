@@ -0,0 +1,159 @@
+# upload_service/conversion_cache.py
+"""
+Content-addressed cache for the convert -> mdx_safe chain.
+
+Key: (sha256 of the uploaded file, pipeline version, title prefix).
+The pipeline version is a hash of the tool sources (and of the converter
+settings that change output, like PDF_BACKEND), so editing a converter or
+mdx_safe invalidates every cached entry automatically.
+
+Concurrent requests for the same key share a single in-flight conversion
+(single-flight): the first caller converts, the others await its result.
+A cancelled conversion is not shared: its waiters retry.
+
+Config (env):
+    CONVERSION_CACHE_MAX_ENTRIES  max cached documents (default 256)
+    CONVERSION_CACHE_MAX_BYTES    max total cached markdown (default 64 MiB)
+"""
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+CACHE_MAX_ENTRIES = int(os.environ.get("CONVERSION_CACHE_MAX_ENTRIES", 256))
+CACHE_MAX_BYTES = int(os.environ.get("CONVERSION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# every tool whose output ends up in the cached markdown
+PIPELINE_FILES = (
+    "convert_docx_to_md.py",
+    "docx_fastpath.py",
+    "docx_images.py",
+    "convert_pdf_to_md.py",
+    "pdf_backends.py",
+    "doc_model.py",
+    "line_classifier.py",
+    "mdx_safe.py",
+    "postprocess.py",
+)
+# env settings of those tools that change their output
+PIPELINE_ENV = ("PDF_BACKEND", "DOCX_FAST_PATH", "DOCX_IMAGE_DIR", "DOCX_IMAGE_URL", "DOCX_IMAGE_MAX_PX")
+
+CacheKey = Tuple[str, str, str]
+
+
+def pipeline_version(tools_dir: Path, files=PIPELINE_FILES) -> str:
+    """Short hash over the tool sources (and settings) that make up the pipeline."""
+    h = hashlib.sha256()
+    for var in PIPELINE_ENV:
+        h.update(f"{var}={os.environ.get(var, '')}".encode())
+    for name in files:
+        p = tools_dir / name
+        h.update(name.encode())
+        if p.exists():
+            h.update(p.read_bytes())
+    return h.hexdigest()[:16]
+
+
+class ConversionCache:
+    """Size-bounded LRU of converted markdown with single-flight misses."""
+
+    def __init__(
+        self,
+        version: str,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def key(self, sha256: str, title_prefix: str) -> CacheKey:
+        return (sha256, self.version, title_prefix)
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        md = self._entries.get(key)
+        if md is not None:
+            self._entries.move_to_end(key)
+        return md
+
+    def put(self, key: CacheKey, md: str):
+        size = len(md.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # never evict everything for one huge document
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.encode("utf-8"))
+        self._entries[key] = md
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.encode("utf-8"))
+            self.evictions += 1
+
+    async def get_or_convert(
+        self,
+        key: CacheKey,
+        convert: Callable[[], Awaitable[str]],
+    ) -> Tuple[str, str]:
+        """
+        Return (markdown, source) where source is "hit", "shared" or "miss".
+        Failures are not cached; every waiter of a failed conversion gets
+        the same exception. If the converting request is cancelled (client
+        gone), its waiters look again and one of them converts.
+        """
+        while True:
+            md = self.get(key)
+            if md is not None:
+                self.hits += 1
+                return md, "hit"
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            # asyncio.wait: a cancelled waiter leaves `pending` alone, and a
+            # cancelled conversion does not cancel the waiters
+            await asyncio.wait((pending,))
+            if not pending.cancelled():
+                self.shared += 1
+                return pending.result(), "shared"
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            md = await convert()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            self.put(key, md)
+            fut.set_result(md)
+            return md, "miss"
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.shared) / lookups if lookups else 0.0,
+        }
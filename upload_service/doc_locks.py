@@ -0,0 +1,98 @@
+# upload_service/doc_locks.py
+"""
+Per-document locks: one lock per (module, team, week).
+
+Different documents never wait on each other; two requests that would both
+write docs/modules/<module>/<team>/<week>.md are serialized. Each lock is an
+asyncio.Lock (requests inside this process) plus an flock() on
+tmp_uploads/.locks/<module>__<team>__<week>.lock, so several uvicorn workers
+sharing the docs tree are serialized too.
+
+    async with DOC_LOCKS.hold(("module1", "teama", "week1")):
+        ...backup + write...
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+DocKey = Tuple[str, str, str]
+
+
+class DocLocks:
+    def __init__(self, lock_dir: Path):
+        self.lock_dir = lock_dir
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[DocKey, asyncio.Lock] = {}
+        self._waiters: Dict[DocKey, int] = {}
+        self._files: Dict[DocKey, object] = {}
+
+    def _lock_file(self, key: DocKey):
+        f = (self.lock_dir / ("__".join(key) + ".lock")).open("a")
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    @staticmethod
+    def _unlock_file(f):
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+    async def _acquire(self, key: DocKey):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._forget(key)
+            raise
+        locking = asyncio.ensure_future(asyncio.to_thread(self._lock_file, key))
+        try:
+            # shielded: if the request is cancelled the thread still gets the
+            # flock, and its file must be closed or the doc stays locked
+            self._files[key] = await asyncio.shield(locking)
+        except asyncio.CancelledError:
+            locking.add_done_callback(lambda done: self._abandon(key, done))
+            raise
+        except BaseException:
+            lock.release()
+            self._forget(key)
+            raise
+
+    def _abandon(self, key: DocKey, locking: asyncio.Future):
+        """Cancelled while flock() was pending: once the thread has it, let go."""
+        if not locking.cancelled() and locking.exception() is None:
+            self._unlock_file(locking.result())
+        self._locks[key].release()
+        self._forget(key)
+
+    async def _release(self, key: DocKey):
+        f = self._files.pop(key)
+        await asyncio.to_thread(self._unlock_file, f)
+        self._locks[key].release()
+        self._forget(key)
+
+    def _forget(self, key: DocKey):
+        self._waiters[key] -= 1
+        if self._waiters[key] == 0:
+            del self._waiters[key]
+            del self._locks[key]
+
+    @asynccontextmanager
+    async def hold(self, *keys: DocKey):
+        """Hold the locks for all `keys` (taken in sorted order: no deadlocks)."""
+        acquired = []
+        try:
+            for key in sorted(set(keys)):
+                await self._acquire(key)
+                acquired.append(key)
+            yield
+        finally:
+            for key in reversed(acquired):
+                await self._release(key)
@@ -0,0 +1,161 @@
+# upload_service/ingest.py
+"""
+Streaming upload ingestion.
+
+The multipart body is consumed once, in fixed-size chunks. Every chunk feeds
+a SHA-256 digest, the first chunk is sniffed for the expected magic bytes,
+and the running size is checked against a cap, so bad or oversized files are
+rejected before anything reaches the converters. If the server already
+spooled the upload to a named file on disk it is hard-linked into place
+instead of copied.
+
+Config (env):
+    UPLOAD_MAX_BYTES   reject uploads larger than this (default 50 MiB)
+    UPLOAD_CHUNK_BYTES read/write chunk size (default 1 MiB)
+"""
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from typing import NamedTuple, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+MAX_UPLOAD_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+
+# .docx is a zip container; .pdf starts with its version header
+MAGIC = {
+    ".docx": b"PK\x03\x04",
+    ".pdf": b"%PDF-",
+    ".zip": b"PK\x03\x04",
+}
+
+
+class ReceivedUpload(NamedTuple):
+    path: Path
+    size: int
+    sha256: str
+
+
+def sniff(first_chunk: bytes, ext: str):
+    magic = MAGIC.get(ext)
+    if magic and not first_chunk.startswith(magic):
+        raise HTTPException(415, f"File content does not look like a {ext} file")
+
+
+def too_large(size: int, max_bytes: int):
+    return HTTPException(413, f"Upload is {size} bytes, limit is {max_bytes} bytes")
+
+
+def spooled_path(fileobj):
+    """Path of the on-disk spool file behind an UploadFile, if it has one."""
+    raw = getattr(fileobj, "_file", fileobj)  # SpooledTemporaryFile -> real file
+    name = getattr(raw, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return Path(name)
+    return None
+
+
+class ChunkCheck:
+    """Sniff, size cap and SHA-256, fed one chunk at a time (blocking and async loops)."""
+
+    def __init__(self, ext: str, max_bytes: int):
+        self.ext = ext
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk: bytes):
+        if self.size == 0:
+            sniff(chunk, self.ext)
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise too_large(self.size, self.max_bytes)
+        self.digest.update(chunk)
+
+    def result(self) -> Tuple[int, str]:
+        """(size, sha256) once the stream is done."""
+        if self.size == 0:
+            raise HTTPException(400, "Uploaded file is empty")
+        return self.size, self.digest.hexdigest()
+
+
+def hash_stream(src, ext: str, max_bytes: int, chunk_size: int = CHUNK_SIZE, out=None):
+    """
+    Blocking chunk loop over a readable file object: sniff, cap, hash and
+    (optionally) copy every chunk to `out`. Returns (size, sha256).
+    """
+    check = ChunkCheck(ext, max_bytes)
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        check.update(chunk)
+        if out is not None:
+            out.write(chunk)
+    return check.result()
+
+
+def _hash_in_place(src: Path, ext: str, max_bytes: int, chunk_size: int):
+    with src.open("rb") as f:
+        return hash_stream(f, ext, max_bytes, chunk_size)
+
+
+def copy_and_hash(src, dest: Path, max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = CHUNK_SIZE) -> ReceivedUpload:
+    """Blocking variant of receive_upload for file objects (e.g. zip members)."""
+    try:
+        with dest.open("wb") as out:
+            size, sha = hash_stream(src, dest.suffix.lower(), max_bytes, chunk_size, out)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return ReceivedUpload(dest, size, sha)
+
+
+async def receive_upload(
+    file: UploadFile,
+    dest: Path,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = CHUNK_SIZE,
+) -> ReceivedUpload:
+    """
+    Store `file` at `dest` and return (path, size, sha256).
+
+    Raises HTTPException 413 (too large) or 415 (wrong magic bytes); nothing
+    is left behind at `dest` in that case.
+    """
+    ext = dest.suffix.lower()
+
+    # cheap early exit when the client declared the size
+    if file.size is not None and file.size > max_bytes:
+        raise too_large(file.size, max_bytes)
+
+    src = spooled_path(file.file)
+    if src is not None:
+        # already on disk: one read pass for hash/sniff, then link it into
+        # place (the server still owns and later deletes its spool name)
+        size, sha = await asyncio.to_thread(_hash_in_place, src, ext, max_bytes, chunk_size)
+        try:
+            await asyncio.to_thread(os.link, src, dest)
+            return ReceivedUpload(dest, size, sha)
+        except OSError:
+            pass  # other filesystem: fall back to the streaming copy below
+        await file.seek(0)
+
+    check = ChunkCheck(ext, max_bytes)
+    out = await asyncio.to_thread(dest.open, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            check.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+        await asyncio.to_thread(out.close)
+        size, sha = check.result()
+    except BaseException:
+        out.close()
+        dest.unlink(missing_ok=True)
+        raise
+    return ReceivedUpload(dest, size, sha)
@@ -0,0 +1,244 @@
+# upload_service/metrics.py
+"""
+Minimal Prometheus metrics for the upload service (text exposition format,
+no client library needed). GET /metrics renders REGISTRY.
+
+    timer = StageTimer(module, team)            # one per request
+    with timer.stage("convert"):
+        ...
+    timer.timings -> {"convert": 812.4, ...}    # ms, also returned to clients
+
+Label values come from the request (module / team slug), so keep the set of
+teams small.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels, extra: Labels = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple((name, str(labels.get(name, ""))) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are computed at scrape time: fn() -> [(labels, value)]."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]], kind: str = "gauge"):
+        super().__init__(name, help_text)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self.fn():
+            key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+            lines.append(f"{self.name}{_fmt_labels(key)} {_fmt_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', _fmt_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {row[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(row[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()) -> Gauge:
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def callback(self, name, help_text, fn, kind: str = "gauge") -> CallbackGauge:
+        return self.register(CallbackGauge(name, help_text, fn, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "upload_stage_seconds",
+    "Time spent in each upload pipeline stage.",
+    ("stage", "module", "team"),
+)
+UPLOADS = REGISTRY.counter(
+    "uploads_total",
+    "Finished upload requests by file type and outcome (ok, rejected, failed).",
+    ("file_type", "outcome", "module", "team"),
+)
+DELETES = REGISTRY.counter(
+    "deletes_total",
+    "Finished delete requests by outcome.",
+    ("outcome", "module", "team"),
+)
+BYTES_IN = REGISTRY.counter(
+    "upload_bytes_in_total",
+    "Bytes of uploaded DOCX/PDF accepted.",
+    ("file_type", "module", "team"),
+)
+BYTES_OUT = REGISTRY.counter(
+    "upload_bytes_out_total",
+    "Bytes of markdown written to docs/modules.",
+    ("module", "team"),
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "conversion_cache_lookups_total",
+    "Conversion cache lookups by result (hit, shared, miss).",
+    ("result", "module", "team"),
+)
+CONVERT_PEAK_RSS = REGISTRY.histogram(
+    "conversion_peak_rss_bytes",
+    "Peak resident memory of the worker during one conversion.",
+    ("file_type",),
+    buckets=tuple(mb * 1024 * 1024 for mb in (32, 64, 128, 256, 512, 1024, 2048, 4096)),
+)
+CONVERT_CPU_SECONDS = REGISTRY.histogram(
+    "conversion_cpu_seconds",
+    "CPU time (user + system) of one conversion.",
+    ("file_type",),
+)
+CONVERSION_LIMITS = REGISTRY.counter(
+    "conversion_limit_exceeded_total",
+    "Conversions stopped by the sandbox (timeout, memory, cpu).",
+    ("limit", "file_type"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "upload_requests_in_flight",
+    "Upload requests currently being processed (single and batch).",
+    ("endpoint",),
+)
+
+
+class StageTimer:
+    """Per-request stage timing: feeds STAGE_SECONDS and keeps timings in ms."""
+
+    def __init__(self, module: str = "", team: str = ""):
+        self.module = module
+        self.team = team
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        return {"module": self.module, "team": self.team}
+
+    def record(self, name: str, seconds: float):
+        STAGE_SECONDS.observe(seconds, stage=name, **self.labels)
+        self.timings[name] = round(self.timings.get(name, 0) + seconds * 1000, 1)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
@@ -0,0 +1,103 @@
+# upload_service/preview.py
+"""
+Rendered output for POST /preview/ (dry run: nothing under docs/ changes).
+
+The converted markdown itself comes from the shared ConversionCache, so a
+preview warms the cache for the real upload of the same file. This module
+keeps the final rendered bodies (markdown with front-matter, or HTML) in a
+small LRU keyed by ETag. The ETag is derived from the conversion key
+(upload sha256, pipeline version, title prefix) plus the format, so a
+matching If-None-Match is answered with 304 before anything is converted.
+
+HTML rendering needs the optional `markdown` package (pip install markdown).
+
+Config (env):
+    PREVIEW_CACHE_MAX_ENTRIES  rendered previews kept (default 128)
+"""
+import hashlib
+import html
+import os
+import re
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import markdown
+except ImportError:  # HTML previews disabled
+    markdown = None
+
+PREVIEW_CACHE_MAX_ENTRIES = int(os.environ.get("PREVIEW_CACHE_MAX_ENTRIES", 128))
+
+FORMATS = {
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+
+FRONT_MATTER_RE = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+
+
+def html_available() -> bool:
+    return markdown is not None
+
+
+def preview_etag(conversion_key: Tuple[str, ...], fmt: str) -> str:
+    """Strong ETag value (without quotes) for one preview."""
+    h = hashlib.sha256("\0".join(conversion_key + (fmt,)).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or any(t.removeprefix("W/").strip('"') == etag for t in candidates)
+
+
+def render_html(md: str) -> str:
+    """Markdown (with front-matter) -> standalone HTML page."""
+    title = "Preview"
+    m = FRONT_MATTER_RE.match(md)
+    if m:
+        for line in m.group(0).splitlines():
+            if line.startswith("title:"):
+                title = line.split(":", 1)[1].strip()
+        md = md[m.end():]
+    body = markdown.markdown(md, extensions=["fenced_code", "tables"])
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title></head>\n<body>\n{body}\n</body></html>\n"
+    )
+
+
+class PreviewCache:
+    """LRU of etag -> (body, media type)."""
+
+    def __init__(self, max_entries: int = PREVIEW_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> Optional[Tuple[str, str]]:
+        entry = self._entries.get(etag)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(etag)
+        return entry
+
+    def put(self, etag: str, body: str, media_type: str):
+        self._entries[etag] = (body, media_type)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
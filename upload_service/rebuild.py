@@ -0,0 +1,508 @@
+# upload_service/rebuild.py
+"""
+Debounced site rebuilds driven by upload/delete events.
+
+Every change is appended to a change log (JSONL) and wakes the scheduler:
+
+    await REBUILD.notify("upload", "docs/modules/module1/teama/week1.md")
+
+The scheduler waits until no change has arrived for REBUILD_DEBOUNCE_SECONDS
+(but never longer than REBUILD_MAX_WAIT_SECONDS after the first pending
+change), then runs one build for everything pending. Changes that arrive
+while a build is running are collected into a single follow-up build, so
+at most one build runs at a time and a burst of N uploads costs at most two.
+
+Several uvicorn workers share one change log. Sequence numbers come from a
+counter in <log>.lock, taken under flock() with every append, and exactly
+one worker (the holder of the flock() on <log>.owner) replays the log and
+runs builds; it picks up the other workers' changes (and their POST
+/rebuild/ requests) by reading the log every REBUILD_POLL_SECONDS. When the
+owner exits, another worker takes over.
+
+Each finished build is written to the change log too, so after a restart
+any changes newer than the last successful build are rebuilt. A successful
+build compacts the log down to that build plus the changes after it; a
+failed build is retried after REBUILD_RETRY_SECONDS, doubling per failure.
+
+Config (env):
+    REBUILD_CMD                build command, run in the repo root
+                               (default "npm run build"; empty disables
+                               rebuilds and the change log)
+    REBUILD_DEBOUNCE_SECONDS   quiet period before building (default 30)
+    REBUILD_MAX_WAIT_SECONDS   upper bound on debouncing (default 300)
+    REBUILD_TIMEOUT_SECONDS    kill a build that runs longer (default 1800)
+    REBUILD_RETRY_SECONDS      first retry after a failed build (default 30)
+    REBUILD_RETRY_MAX_SECONDS  longest retry delay (default 1800)
+    REBUILD_POLL_SECONDS       how often the owner reads other workers'
+                               changes, and others try to take over (default 2)
+"""
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Deque, List, Optional, Sequence
+
+from atomic_write import atomic_write_text
+
+from .metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, which owns the log
+    fcntl = None
+
+REBUILD_CMD = os.environ.get("REBUILD_CMD", "npm run build")
+DEBOUNCE_SECONDS = float(os.environ.get("REBUILD_DEBOUNCE_SECONDS", 30))
+MAX_WAIT_SECONDS = float(os.environ.get("REBUILD_MAX_WAIT_SECONDS", 300))
+TIMEOUT_SECONDS = float(os.environ.get("REBUILD_TIMEOUT_SECONDS", 1800))
+RETRY_SECONDS = float(os.environ.get("REBUILD_RETRY_SECONDS", 30))
+RETRY_MAX_SECONDS = float(os.environ.get("REBUILD_RETRY_MAX_SECONDS", 1800))
+POLL_SECONDS = float(os.environ.get("REBUILD_POLL_SECONDS", 2))
+
+OUTPUT_TAIL_LINES = 40
+HISTORY = 20
+STOP_SECONDS = 10  # longest stop() waits for the scheduler tasks
+
+BUILD_SECONDS = REGISTRY.histogram(
+    "site_rebuild_seconds",
+    "Duration of site rebuilds by outcome.",
+    ("outcome",),
+    buckets=(5, 10, 30, 60, 120, 300, 600, 1200, 1800),
+)
+CHANGES_PER_BUILD = REGISTRY.histogram(
+    "site_rebuild_changes",
+    "Number of coalesced changes per rebuild.",
+    (),
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+
+
+class RebuildScheduler:
+    def __init__(
+        self,
+        cwd: Path,
+        log_path: Path,
+        cmd: str = REBUILD_CMD,
+        debounce: float = DEBOUNCE_SECONDS,
+        max_wait: float = MAX_WAIT_SECONDS,
+        timeout: float = TIMEOUT_SECONDS,
+        retry: float = RETRY_SECONDS,
+        retry_max: float = RETRY_MAX_SECONDS,
+        poll: float = POLL_SECONDS,
+    ):
+        self.cwd = cwd
+        self.log_path = log_path
+        self.cmd = cmd.strip()
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.retry = retry
+        self.retry_max = retry_max
+        self.poll = poll
+
+        self.owner = False         # this process replays the log and builds
+        self.seq = 0               # last change sequence number
+        self.built_seq = 0         # changes up to here are in the last good build
+        self.state = "idle"        # idle | waiting | building
+        self.pending: List[dict] = []
+        self.current: Optional[dict] = None
+        self.history: Deque[dict] = collections.deque(maxlen=HISTORY)
+        self.builds = {"ok": 0, "failed": 0}
+        self.failures = 0          # failed builds in a row
+
+        self._first_pending = 0.0
+        self._last_change = 0.0
+        self._force = False
+        self._stopping = False
+        self._offset = 0           # bytes of the log already read (owner)
+        self._owner_file = None
+        self._thread_lock = threading.Lock()
+        self._retry: Optional[asyncio.TimerHandle] = None
+        self._retry_at = 0.0
+        self._reading = asyncio.Lock()  # log reads / compaction, in order
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cmd)
+
+    # ---- change log (blocking, always called through asyncio.to_thread) ----
+
+    def _sidecar(self, suffix: str) -> Path:
+        return self.log_path.with_name(self.log_path.name + suffix)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Thread lock + flock on <log>.lock (all workers append to the log);
+        yields the lock file, which holds the last sequence number handed out.
+        """
+        with self._thread_lock:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._sidecar(".lock").open("a+", encoding="utf-8") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield lock_file
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, records: List[dict]):
+        # caller holds the lock
+        with self.log_path.open("a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, sort_keys=True) + "\n")
+
+    def _read_lines(self, offset: int):
+        """(complete records from byte `offset` on, offset after the last complete line)."""
+        try:
+            with self.log_path.open("rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+        end = data.rfind(b"\n") + 1  # a torn last line (crash mid-write) is left out
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, offset + end
+
+    def _append_changes(self, event: str, paths: Sequence[str], at: float) -> List[dict]:
+        """Number the changes from the shared counter and append them."""
+        with self._locked() as counter:
+            counter.seek(0)
+            last = counter.read().strip()
+            if last.isdigit():
+                seq = int(last)
+            else:
+                # first append with this log: continue after what it holds
+                logged, _ = self._read_lines(0)
+                seq = max([r.get("seq", r.get("through_seq", 0)) for r in logged] + [0])
+            records = []
+            for path in paths:
+                seq += 1
+                records.append({"seq": seq, "event": event, "path": path, "at": at})
+            self._write(records)
+            counter.truncate(0)
+            counter.write(str(seq))
+            counter.flush()
+        return records
+
+    def _append(self, records: List[dict]):
+        with self._locked():
+            self._write(records)
+
+    def _read_new(self) -> List[dict]:
+        """Records appended (by any worker) since the last read."""
+        with self._locked():
+            records, self._offset = self._read_lines(self._offset)
+        return records
+
+    def _replay(self) -> List[dict]:
+        """Restore seq / built_seq from the log; return changes not yet built."""
+        self._offset = 0
+        changes = []
+        for rec in self._read_new():
+            if rec.get("event") == "build":
+                if rec.get("ok"):
+                    self.built_seq = max(self.built_seq, rec["through_seq"])
+            elif "seq" in rec:
+                self.seq = max(self.seq, rec["seq"])
+                changes.append(rec)
+        return [c for c in changes if c["seq"] > self.built_seq]
+
+    def _compact(self, build: dict, read_seq: int):
+        """
+        Rewrite the log as `build` plus the changes it did not include, and
+        move the read offset past the changes this process already has.
+        """
+        with self._locked():
+            records, _ = self._read_lines(0)
+            lines = [json.dumps(build, sort_keys=True) + "\n"]
+            offset = len(lines[0].encode("utf-8"))
+            for rec in records:
+                if rec.get("seq", 0) > build["through_seq"]:
+                    line = json.dumps(rec, sort_keys=True) + "\n"
+                    lines.append(line)
+                    if rec["seq"] <= read_seq:
+                        offset += len(line.encode("utf-8"))
+            atomic_write_text(self.log_path, "".join(lines))
+            self._offset = offset
+
+    def _try_own(self) -> bool:
+        """Take the flock on <log>.owner without waiting; True if this process holds it."""
+        if fcntl is None:
+            return True
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        f = self._sidecar(".owner").open("a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._owner_file = f
+        return True
+
+    def _disown(self):
+        if self._owner_file is not None:
+            fcntl.flock(self._owner_file, fcntl.LOCK_UN)
+            self._owner_file.close()
+            self._owner_file = None
+
+    # ---- lifecycle ----
+
+    async def start(self):
+        if self._watcher is not None:
+            return
+        self._wake = asyncio.Event()
+        self._stopping = False
+        if await asyncio.to_thread(self._try_own):
+            await self._take_over()
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        self._stopping = True
+        if self._wake is not None:
+            self._wake.set()
+        tasks = {t for t in (self._watcher, self._task) if t is not None}
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            _, stuck = await asyncio.wait(tasks, timeout=STOP_SECONDS)
+            if stuck:
+                print(f"Rebuild scheduler: {len(stuck)} task(s) still running after {STOP_SECONDS}s; not waiting")
+        self._watcher = self._task = None
+        if self._retry is not None:
+            self._retry.cancel()
+            self._retry = None
+        await asyncio.to_thread(self._disown)
+        self.owner = False
+
+    async def _take_over(self):
+        self.owner = True
+        unbuilt = await asyncio.to_thread(self._replay)
+        if unbuilt:
+            self._add_pending(unbuilt)
+        self._task = asyncio.create_task(self._run())
+
+    async def _watch(self):
+        """Owner: pick up other workers' records. Others: take over when the owner goes."""
+        while True:
+            await asyncio.sleep(self.poll)
+            try:
+                if self.owner:
+                    await self._pick_up()
+                elif await asyncio.to_thread(self._try_own):
+                    print("Rebuild scheduler: this worker now owns", self.log_path)
+                    await self._take_over()
+            except OSError as e:
+                print("Rebuild scheduler: change log not readable:", e)
+
+    async def _pick_up(self):
+        async with self._reading:
+            records = await asyncio.to_thread(self._read_new)
+            changes = [r for r in records if r.get("seq", 0) > self.seq]
+            if changes:
+                self._add_pending(changes)
+        if any(r.get("event") == "request" for r in records):
+            self._build_now()
+
+    def _add_pending(self, changes: List[dict]):
+        self.seq = max(self.seq, changes[-1]["seq"])
+        if not self.pending:
+            self._first_pending = time.monotonic()
+        self._last_change = time.monotonic()
+        self.pending.extend(changes)
+        self._wake.set()
+
+    async def notify(self, event: str, *paths: str):
+        """Record a change to the docs tree and schedule a rebuild (no-op when disabled)."""
+        if not paths or not self.enabled:
+            return
+        records = await asyncio.to_thread(self._append_changes, event, paths, time.time())
+        if self.owner:
+            await self._pick_up()
+        else:
+            self.seq = max(self.seq, records[-1]["seq"])
+
+    async def request_now(self):
+        """Build as soon as the current build (if any) finishes, skipping the debounce."""
+        if self.owner:
+            self._build_now()
+        else:
+            # the owning worker sees this within REBUILD_POLL_SECONDS
+            await asyncio.to_thread(self._append, [{"event": "request", "at": time.time()}])
+
+    def _retry_build(self):
+        self._retry = None
+        self._build_now()
+
+    def _build_now(self):
+        self._force = True
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---- scheduler loop ----
+
+    async def _wait_wake(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a wake-up, at most `timeout` seconds; False once stop() was
+        called. asyncio.wait, unlike wait_for on 3.10/3.11, never swallows
+        a cancel that lands as the event fires.
+        """
+        waiter = asyncio.ensure_future(self._wake.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            waiter.cancel()
+        self._wake.clear()
+        return not self._stopping
+
+    async def _run(self):
+        while not self._stopping:
+            if not await self._wait_wake():
+                return
+            if not self.pending and not self._force:
+                continue
+
+            # debounce: wait for a quiet period, bounded by max_wait
+            self.state = "waiting"
+            while not self._force:
+                deadline = min(
+                    self._last_change + self.debounce,
+                    self._first_pending + self.max_wait,
+                )
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if not await self._wait_wake(remaining):
+                    return
+
+            self._force = False
+            batch, self.pending = self.pending, []
+            if not self.enabled:
+                self.state = "idle"
+                continue
+            if self._retry is not None:
+                self._retry.cancel()
+                self._retry = None
+            await self._build(batch)
+            self.state = "idle"
+
+    async def _build(self, batch: List[dict]):
+        through_seq = self.seq
+        self.state = "building"
+        self.current = {
+            "started_at": time.time(),
+            "changes": len(batch),
+            "through_seq": through_seq,
+        }
+        started = time.monotonic()
+        tail: Deque[str] = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        returncode = None
+        error = None
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                self.cmd,
+                cwd=str(self.cwd),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            collect = asyncio.ensure_future(self._collect(proc, tail))
+            try:
+                done, _ = await asyncio.wait({collect}, timeout=self.timeout)
+                if done:
+                    returncode = await proc.wait()
+                else:
+                    collect.cancel()
+                    proc.kill()
+                    await proc.wait()
+                    error = f"timed out after {self.timeout:.0f}s"
+            except asyncio.CancelledError:
+                collect.cancel()
+                proc.kill()
+                await proc.wait()
+                raise
+        except OSError as e:
+            error = f"could not start build: {e}"
+
+        duration = time.monotonic() - started
+        ok = returncode == 0 and error is None
+        result = dict(
+            self.current,
+            duration_s=round(duration, 2),
+            ok=ok,
+            returncode=returncode,
+            error=error,
+            output_tail=list(tail),
+        )
+        self.current = None
+        self.history.appendleft(result)
+        self.builds["ok" if ok else "failed"] += 1
+        BUILD_SECONDS.observe(duration, outcome="ok" if ok else "failed")
+        CHANGES_PER_BUILD.observe(len(batch))
+        record = {
+            "event": "build",
+            "through_seq": through_seq,
+            "ok": ok,
+            "duration_s": result["duration_s"],
+            "at": time.time(),
+        }
+        if ok:
+            self.built_seq = through_seq
+            self.failures = 0
+            print(f"Rebuild ok in {duration:.1f}s ({len(batch)} changes)")
+            async with self._reading:
+                await asyncio.to_thread(self._compact, record, self.seq)
+            return
+
+        # keep the changes and try again later (sooner if more changes arrive)
+        self.pending = batch + self.pending
+        if len(self.pending) == len(batch):
+            self._first_pending = self._last_change = time.monotonic()
+        self.failures += 1
+        delay = min(self.retry * 2 ** (self.failures - 1), self.retry_max)
+        self._retry = asyncio.get_running_loop().call_later(delay, self._retry_build)
+        self._retry_at = time.time() + delay
+        print(f"Rebuild FAILED in {duration:.1f}s ({len(batch)} changes), retrying in {delay:g}s")
+        await asyncio.to_thread(self._append, [record])
+
+    @staticmethod
+    async def _collect(proc, tail: Deque[str]):
+        async for raw in proc.stdout:
+            tail.append(raw.decode("utf-8", "replace").rstrip())
+
+    # ---- status ----
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "command": self.cmd,
+            "owner": self.owner,
+            "pid": os.getpid(),
+            "state": self.state,
+            "debounce_s": self.debounce,
+            "max_wait_s": self.max_wait,
+            "last_change_seq": self.seq,
+            "built_through_seq": self.built_seq,
+            "pending_changes": len(self.pending),
+            "pending_paths": sorted({c["path"] for c in self.pending}),
+            "current": self.current,
+            "builds": dict(self.builds),
+            "failures_in_a_row": self.failures,
+            "retry_in_s": round(max(0.0, self._retry_at - time.time()), 1) if self._retry else None,
+            "history": [
+                {k: v for k, v in b.items() if k != "output_tail"} for b in self.history
+            ],
+            "last_output": self.history[0]["output_tail"] if self.history else [],
+        }
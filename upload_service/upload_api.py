@@ -1,10 +1,27 @@
 # upload_service/upload_api.py
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
-import shutil, uuid, subprocess, re
-from typing import Optional
+import asyncio, json, os, shutil, signal, time, uuid, subprocess, re
+from typing import List, Optional
+
+from .admission import AdmissionControl
+from .batch import commit_all, extract_zip, infer_week
+from .catalog import STATES, DocCatalog
+from .conversion_cache import ConversionCache, pipeline_version
+from .doc_locks import DocLocks
+from .ingest import receive_upload
+from .metrics import (
+    BYTES_IN, BYTES_OUT, CACHE_LOOKUPS, CONVERSION_LIMITS, CONVERT_CPU_SECONDS,
+    CONVERT_PEAK_RSS, DELETES, IN_FLIGHT, REGISTRY, UPLOADS, StageTimer,
+)
+from .preview import FORMATS, PreviewCache, etag_matches, html_available, preview_etag, render_html
+from .rebuild import RebuildScheduler
+from .worker_pool import (
+    JOB_TIMEOUT, ConversionTimeout, ConverterPool, CpuLimitExceeded, JobStats,
+    WorkerError, limit_child_process,
+)
 
 BASE = Path(__file__).resolve().parent.parent
 DOCS_BASE = BASE / "docs" / "modules"   # docs/modules/moduleX/teamY/weekN.md
@@ -13,19 +30,57 @@ TMP = BASE / "tmp_uploads"
 TRASH = BASE / "deleted_docs"
 BACKUP = BASE / "backups"
 
+# tools/ is on sys.path (see upload_service/__init__.py)
+from atomic_write import atomic_write_text  # noqa: E402
+from backup_store import BackupStore  # noqa: E402
+
 TMP.mkdir(parents=True, exist_ok=True)
 TRASH.mkdir(parents=True, exist_ok=True)
 BACKUP.mkdir(parents=True, exist_ok=True)
 
 ALLOWED = {".docx", ".pdf"}
+BATCH_MAX_BYTES = int(os.environ.get("UPLOAD_BATCH_MAX_BYTES", 200 * 1024 * 1024))
 VALID_MODULES = {"module1", "module2", "module3", "module4"}
 
+# HTTP status per sandbox error code (also sent as X-Error-Code)
+CONVERSION_ERROR_STATUS = {
+    "conversion_failed": 500,
+    "conversion_timeout": 504,
+    "conversion_cpu_limit": 504,
+    "conversion_memory_limit": 507,
+}
+
+# content-addressed backups of overwritten docs (backups/store)
+BACKUPS = BackupStore(BACKUP / "store")
+
+# one lock per (module, team, week): same doc serialized, others parallel
+DOC_LOCKS = DocLocks(TMP / ".locks")
+
+# bounded concurrency + queue for conversions (429/503 + Retry-After beyond)
+ADMISSION = AdmissionControl()
+
+# warm converter processes (UPLOAD_POOL_SIZE=0 -> one subprocess per stage)
+POOL = ConverterPool()
+
+# converted markdown keyed by (upload sha256, tool version, title prefix)
+CACHE = ConversionCache(pipeline_version(TOOLS))
+
+# docs/modules index for the listing endpoints (built at startup)
+CATALOG = DocCatalog(DOCS_BASE, BASE)
+
+# rendered /preview/ bodies by ETag (markdown comes from CACHE)
+PREVIEWS = PreviewCache()
+
+# debounced `npm run build` after uploads/deletes (REBUILD_CMD="" disables)
+REBUILD = RebuildScheduler(BASE, Path(os.environ.get("REBUILD_CHANGE_LOG", TMP / "changes.jsonl")))
+
 app = FastAPI(title="Docs Upload API")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 
@@ -45,34 +100,191 @@ def module_for_week(week_num: int) -> str:
     raise HTTPException(400, "week must be 1..16")
 
 
-def run_converter(in_path: Path, out_path: Path):
-    """DOCX/PDF -> markdown (no front-matter)."""
-    if in_path.suffix.lower() == ".docx":
-        subprocess.run(
-            ["python", str(TOOLS / "convert_docx_to_md.py"), str(in_path), str(out_path)],
-            check=True,
-        )
+def parse_week(week: str) -> int:
+    """'week5', '5', 'week-05' -> 5"""
+    week_clean = week.lower().replace("week", "").replace("-", "").strip()
+    if not week_clean.isdigit():
+        raise HTTPException(400, "week must be like 'week5', '5', or 'week-05'")
+    return int(week_clean)
+
+
+@app.on_event("startup")
+async def start_background():
+    if POOL.enabled:
+        POOL.start()
+    n = await asyncio.to_thread(CATALOG.build)
+    print(f"Catalog: {n} docs under {DOCS_BASE.relative_to(BASE)}")
+    await REBUILD.start()
+
+
+@app.on_event("shutdown")
+async def stop_background():
+    await REBUILD.stop()
+    POOL.shutdown()
+
+
+async def run_tool(script: str, *args: str):
+    """
+    Run tools/<script> in an asyncio subprocess (event loop stays free),
+    under the same timeout / memory / CPU caps as the worker pool.
+    """
+    cmd = ["python", str(TOOLS / script), *args]
+    preexec = limit_child_process if os.name == "posix" else None
+    proc = await asyncio.create_subprocess_exec(*cmd, preexec_fn=preexec)
+    try:
+        returncode = await asyncio.wait_for(proc.wait(), JOB_TIMEOUT or None)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise ConversionTimeout(f"{script} timed out after {JOB_TIMEOUT:g}s")
+    if os.name == "posix" and returncode == -signal.SIGXCPU:
+        raise CpuLimitExceeded(f"{script} exceeded the CPU limit")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+async def run_converter(in_path: Path, out_path: Path) -> Optional[JobStats]:
+    """DOCX/PDF -> markdown (no front-matter); resource use when run on the pool."""
+    if in_path.suffix.lower() in ALLOWED and POOL.enabled:
+        return await asyncio.to_thread(POOL.convert, in_path, out_path)
+    elif in_path.suffix.lower() == ".docx":
+        await run_tool("convert_docx_to_md.py", str(in_path), str(out_path))
     elif in_path.suffix.lower() == ".pdf":
-        subprocess.run(
-            ["python", str(TOOLS / "convert_pdf_to_md.py"), str(in_path), str(out_path)],
-            check=True,
-        )
+        await run_tool("convert_pdf_to_md.py", str(in_path), str(out_path))
     else:
         raise HTTPException(400, "Unsupported file type (only .docx/.pdf)")
 
 
-def run_sanitizer(md_path: Path, title_prefix: str):
-    """Auto-wrap code into ```python fences (snippet style)."""
-    sanitizer = TOOLS / "sanitize_and_wrap.py"
-    if not sanitizer.exists():
-        print("Sanitizer missing:", sanitizer)
-        return
-    subprocess.run(
-        ["python", str(sanitizer), str(md_path), title_prefix],
-        check=True,
+async def run_postprocess(md_path: Path, title_prefix: str) -> str:
+    """MDX-safe pass over one parsed document (tools/postprocess.py); returns the markdown."""
+    if POOL.enabled:
+        # the worker reads and parses the file once and hands the text back
+        return await asyncio.to_thread(POOL.postprocess, md_path, title_prefix)
+    await run_tool("postprocess.py", str(md_path), title_prefix)
+    return await asyncio.to_thread(read_markdown, md_path)
+
+
+def record_conversion_stats(file_type: str, stats: JobStats):
+    CONVERT_PEAK_RSS.observe(stats.peak_rss_bytes, file_type=file_type)
+    CONVERT_CPU_SECONDS.observe(stats.cpu_seconds, file_type=file_type)
+    print(
+        f"Converted {file_type} in {stats.wall_seconds:.2f}s "
+        f"(cpu {stats.cpu_seconds:.2f}s, peak rss {stats.peak_rss_bytes / 2**20:.0f} MiB)"
     )
 
 
+async def convert_pipeline(in_path: Path, week_id: str, title_prefix: str, timer: StageTimer) -> str:
+    """
+    convert -> postprocess (mdx_safe) in a private work dir;
+    return the markdown (no front-matter). The work file is named weekN.md
+    because mdx_safe uses the file name as its fallback snippet title.
+    """
+    work_dir = TMP / uuid.uuid4().hex
+    work_md = work_dir / f"{week_id}.md"
+    await asyncio.to_thread(work_dir.mkdir, parents=True)
+    try:
+        # call converter -> markdown
+        file_type = in_path.suffix.lower().lstrip(".")
+        try:
+            with timer.stage("convert"):
+                stats = await run_converter(in_path, work_md)
+        except subprocess.CalledProcessError as e:
+            raise HTTPException(500, f"Conversion failed: {e}", headers={"X-Error-Code": "conversion_failed"})
+        except WorkerError as e:
+            if e.code != WorkerError.code:
+                CONVERSION_LIMITS.inc(limit=e.code, file_type=file_type)
+            if e.stats is not None and e.stats.peak_rss_bytes:
+                # killed workers (timeout / crash) report no usage
+                record_conversion_stats(file_type, e.stats)
+            raise HTTPException(
+                CONVERSION_ERROR_STATUS[e.code],
+                f"Conversion failed ({e.code}): {e}",
+                headers={"X-Error-Code": e.code},
+            )
+        if stats is not None:
+            record_conversion_stats(file_type, stats)
+
+        # ✅ MDX-safe pass on the generated markdown (no front-matter yet)
+        try:
+            with timer.stage("postprocess"):
+                return await run_postprocess(work_md, title_prefix)
+        except (subprocess.CalledProcessError, WorkerError) as e:
+            print("Post-processing failed (keeping raw markdown anyway):", e)
+
+        return await asyncio.to_thread(read_markdown, work_md)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+
+# ---- blocking file I/O, always called through asyncio.to_thread ----
+
+def backup_existing(out_md: Path):
+    """Record the current markdown in the backup store before overwrite."""
+    if out_md.exists():
+        key = out_md.relative_to(BASE).as_posix()
+        sha = BACKUPS.save(key, out_md.read_bytes())
+        print(f"Backed up existing md -> {key}@{sha[:12]}")
+
+
+def remove_quietly(path: Path):
+    try:
+        path.unlink()
+    except Exception:
+        pass
+
+
+def add_front_matter(text: str, w: int, week_id: str, team_slug: str) -> str:
+    """Prepend Docusaurus front-matter if the markdown has none yet."""
+    if text.lstrip().startswith("---"):
+        return text
+    nice_week = f"Week {w:02d}"
+    nice_team = team_slug.replace("-", " ").title()
+    fm = f"""---
+id: {week_id}
+title: {nice_week} — {nice_team}
+sidebar_label: {nice_week}
+---
+
+"""
+    return fm + text
+
+
+def read_markdown(md_path: Path) -> str:
+    return md_path.read_text(encoding="utf-8") if md_path.exists() else ""
+
+
+def write_markdown(md_path: Path, text: str):
+    atomic_write_text(md_path, text)
+
+
+def move_to_trash_and_stub(md_path: Path, mod: str, team_slug: str, week_id: str) -> Path:
+    trash_name = f"{mod}_{team_slug}_{week_id}_{uuid.uuid4().hex}.md"
+    trash_path = TRASH / trash_name
+    # keep the doc in place until the stub replaces it atomically, so
+    # readers never see the file missing
+    try:
+        os.link(md_path, trash_path)
+    except OSError:
+        shutil.copy2(str(md_path), str(trash_path))
+    print(f"Moved {md_path} -> {trash_path}")
+
+    nice_week = week_id.replace("-", " ").title()
+    nice_team = team_slug.replace("-", " ").title()
+    stub = f"""---
+id: {week_id}
+title: {nice_week} — {nice_team}
+sidebar_label: {nice_week}
+---
+
+_No document uploaded yet. Previous upload was deleted._
+
+[Upload documentation for this week](/upload?module={mod}&team={team_slug}&week={week_id})
+"""
+    atomic_write_text(md_path, stub)
+    print("Wrote stub at", md_path)
+    return trash_path
+
+
 @app.get("/form", response_class=HTMLResponse)
 def html_form():
     return """
@@ -100,88 +312,426 @@ async def upload(
 
     week can be "week1", "week-01", "1", etc.
     """
+    timer = StageTimer(team=slug(team))
+    file_type = Path(file.filename or "").suffix.lower().lstrip(".") or "unknown"
+    outcome = "failed"
+    IN_FLIGHT.inc(endpoint="upload")
+    try:
+        w = parse_week(week)
+        timer.module = module_for_week(w)  # before admission_wait is recorded
+        # rejected before it can take (or queue for) a slot
+        if Path(file.filename or "").suffix.lower() not in ALLOWED:
+            raise HTTPException(400, "Only .docx or .pdf allowed")
+        queued_at = time.perf_counter()
+        async with ADMISSION.slot():
+            timer.record("admission_wait", time.perf_counter() - queued_at)
+            result = await process_upload(team, w, file, timer)
+        outcome = "ok"
+        return JSONResponse(result)
+    except HTTPException as e:
+        if e.headers and "Retry-After" in e.headers:
+            outcome = "overloaded"
+        else:
+            outcome = "rejected" if e.status_code < 500 else "failed"
+        raise
+    finally:
+        IN_FLIGHT.dec(endpoint="upload")
+        UPLOADS.inc(file_type=file_type, outcome=outcome, **timer.labels)
+
+
+async def process_upload(team: str, w: int, file: UploadFile, timer: StageTimer) -> dict:
     team_slug = slug(team)
-    week_clean = week.lower().replace("week", "").replace("-", "").strip()
-    if not week_clean.isdigit():
-        raise HTTPException(400, "week must be like 'week5', '5', or 'week-05'")
-    w = int(week_clean)
-    module = module_for_week(w)
+    module = timer.module
     week_id = f"week{w}"
 
-    ext = Path(file.filename).suffix.lower()
-    if ext not in ALLOWED:
-        raise HTTPException(400, "Only .docx or .pdf allowed")
+    ext = Path(file.filename).suffix.lower()  # checked by upload()
 
     dest_dir = DOCS_BASE / module / team_slug
-    dest_dir.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(dest_dir.mkdir, parents=True, exist_ok=True)
     out_md = dest_dir / f"{week_id}.md"
 
-    # backup existing md (simple .bak copy) before overwrite
-    if out_md.exists():
-        bak_name = f"{week_id}__{uuid.uuid4().hex}.md.bak"
-        bak_path = BACKUP / bak_name
-        shutil.copy2(str(out_md), str(bak_path))
-        print("Backed up existing md ->", bak_path)
-
-    # save tmp upload
+    # stream the upload into tmp (hash + magic sniff + size cap on the way)
     tmp_name = TMP / f"{uuid.uuid4().hex}{ext}"
-    with tmp_name.open("wb") as f_tmp:
-        shutil.copyfileobj(file.file, f_tmp)
-
-    # call converter -> markdown
-    try:
-        run_converter(tmp_name, out_md)
-    except subprocess.CalledProcessError as e:
-        try:
-            tmp_name.unlink()
-        except:
-            pass
-        raise HTTPException(500, f"Conversion failed: {e}")
+    with timer.stage("receive"):
+        received = await receive_upload(file, tmp_name)
+    BYTES_IN.inc(received.size, file_type=ext.lstrip("."), **timer.labels)
 
-    # ✅ MDX-safe pass on the generated markdown
+    # convert (or reuse an identical earlier / in-flight conversion)
+    title_prefix = f"{team_slug} {week_id}"
     try:
-        subprocess.run(
-            ["python", str(TOOLS / "mdx_safe.py"), str(out_md)],
-            check=True,
+        text, cache_status = await CACHE.get_or_convert(
+            CACHE.key(received.sha256, title_prefix),
+            lambda: convert_pipeline(tmp_name, week_id, title_prefix, timer),
         )
-    except subprocess.CalledProcessError as e:
-        print("mdx_safe failed (keeping raw markdown anyway):", e)
+    finally:
+        await asyncio.to_thread(remove_quietly, tmp_name)
+    CACHE_LOOKUPS.inc(result=cache_status, **timer.labels)
+
+    with timer.stage("front_matter"):
+        text = add_front_matter(text, w, week_id, team_slug)
+    lock_started = time.perf_counter()
+    async with DOC_LOCKS.hold((module, team_slug, week_id)):
+        timer.record("lock_wait", time.perf_counter() - lock_started)
+        # backup existing md before overwrite; rejected or failed uploads
+        # never get this far
+        with timer.stage("backup"):
+            await asyncio.to_thread(backup_existing, out_md)
+        # write the final markdown once (temp file + atomic rename)
+        with timer.stage("write"):
+            await asyncio.to_thread(write_markdown, out_md, text)
+        await asyncio.to_thread(CATALOG.update, out_md, text)
+    BYTES_OUT.inc(len(text.encode("utf-8")), **timer.labels)
+
+    rel = out_md.relative_to(BASE).as_posix()
+    print("Saved converted markdown:", rel, f"(cache {cache_status})")
+    await REBUILD.notify("upload", rel)
+    return {
+        "ok": True,
+        "saved": rel,
+        "sha256": received.sha256,
+        "bytes": received.size,
+        "cache": cache_status,
+        "timings_ms": timer.timings,
+    }
+
+
+@app.post("/upload/batch/")
+async def upload_batch(
+    team: str = Form(...),
+    files: List[UploadFile] = File(...),
+    mapping: Optional[str] = Form(None),
+):
+    """
+    Upload many weeks at once: one .zip and/or several .docx/.pdf files.
+
+    The week of each file comes from `mapping` (JSON object
+    {"file name": "week5", ...}) or else from its name (week5.docx,
+    Week-05.pdf, 05.docx). Files convert in parallel on the worker pool,
+    charged to admission control as one slot per file (up to the limit);
+    all successful results are then written to docs/modules together, and
+    a per-file report is returned.
+    """
+    team_slug = slug(team)
+    IN_FLIGHT.inc(endpoint="batch")
+    try:
+        return await process_batch(team_slug, files, mapping)
+    finally:
+        IN_FLIGHT.dec(endpoint="batch")
+
 
-    # remove tmp
+async def process_batch(team_slug: str, files: List[UploadFile], mapping: Optional[str]):
     try:
-        tmp_name.unlink()
-    except Exception:
-        pass
-    # auto-snippet (wrap code) on raw markdown (no front-matter yet)
+        week_map = json.loads(mapping) if mapping else {}
+    except ValueError:
+        raise HTTPException(400, "mapping must be a JSON object of file name -> week")
+    if not isinstance(week_map, dict):
+        raise HTTPException(400, "mapping must be a JSON object of file name -> week")
+
+    batch_dir = TMP / uuid.uuid4().hex
+    await asyncio.to_thread(batch_dir.mkdir, parents=True)
     try:
-        title_prefix = f"{team_slug} {week_id}"
-        run_sanitizer(out_md, title_prefix)
-    except subprocess.CalledProcessError as e:
-        print("Sanitizer failed:", e)
+        # 1) receive every upload (zip members are unpacked as entries)
+        entries: List[dict] = []
+        for f in files:
+            name = Path(f.filename or "").name
+            ext = Path(name).suffix.lower()
+            try:
+                if ext == ".zip":
+                    zip_path = batch_dir / f"{uuid.uuid4().hex}.zip"
+                    await receive_upload(f, zip_path, max_bytes=BATCH_MAX_BYTES)
+                    entries.extend(await asyncio.to_thread(extract_zip, zip_path, batch_dir, ALLOWED))
+                elif ext in ALLOWED:
+                    received = await receive_upload(f, batch_dir / f"{uuid.uuid4().hex}{ext}")
+                    entries.append({
+                        "file": name,
+                        "path": received.path,
+                        "sha256": received.sha256,
+                        "bytes": received.size,
+                    })
+                else:
+                    entries.append({"file": name, "error": "Only .docx, .pdf or .zip allowed"})
+            except HTTPException as e:
+                entries.append({"file": name, "error": e.detail})
+
+        # 2) map entries to module/team/week (first file wins per week)
+        targets = set()
+        for e in entries:
+            if "error" in e:
+                continue
+            try:
+                week = infer_week(e["file"], week_map)
+                if week is None:
+                    raise HTTPException(400, "cannot infer week from file name; add it to mapping")
+                w = parse_week(str(week))
+                e["module"] = module_for_week(w)
+                e["week"] = f"week{w}"
+                e["w"] = w
+            except HTTPException as ex:
+                e["error"] = ex.detail
+                continue
+            e["timer"] = StageTimer(e["module"], team_slug)
+            if (e["module"], e["week"]) in targets:
+                e["error"] = f"duplicate file for {e['week']}"
+                continue
+            targets.add((e["module"], e["week"]))
+
+        # 3) convert the entries concurrently, as many at once as the batch
+        #    holds admission slots (kept out of the per-upload service time)
+        async def convert_entry(e: dict, running: asyncio.Semaphore):
+            title_prefix = f"{team_slug} {e['week']}"
+            timer = e["timer"]
+            try:
+                async with running:
+                    text, e["cache"] = await CACHE.get_or_convert(
+                        CACHE.key(e["sha256"], title_prefix),
+                        lambda: convert_pipeline(e["path"], e["week"], title_prefix, timer),
+                    )
+            except HTTPException as ex:
+                e["error"] = ex.detail
+                e["outcome"] = "rejected" if ex.status_code < 500 else "failed"
+                if ex.headers and "X-Error-Code" in ex.headers:
+                    e["error_code"] = ex.headers["X-Error-Code"]
+                return None
+            CACHE_LOOKUPS.inc(result=e["cache"], **timer.labels)
+            out_md = DOCS_BASE / e["module"] / team_slug / f"{e['week']}.md"
+            return out_md, add_front_matter(text, e["w"], e["week"], team_slug)
+
+        todo = [e for e in entries if "error" not in e]
+        converted = []
+        if todo:
+            async with ADMISSION.slot(len(todo), record=False) as slots:
+                running = asyncio.Semaphore(slots)
+                converted = await asyncio.gather(*(convert_entry(e, running) for e in todo))
+
+        # 4) one commit for the whole batch
+        writes = [c for c in converted if c is not None]
+        keys = [(e["module"], team_slug, e["week"]) for e, c in zip(todo, converted) if c is not None]
+        commit = StageTimer(team=team_slug)
+        with commit.stage("batch_commit"):
+            async with DOC_LOCKS.hold(*keys):
+                await asyncio.to_thread(commit_all, writes, backup_existing)
+            await asyncio.to_thread(CATALOG.update_many, writes)
+        for e, c in zip(todo, converted):
+            if c is not None:
+                e["saved"] = c[0].relative_to(BASE).as_posix()
+                BYTES_OUT.inc(len(c[1].encode("utf-8")), **e["timer"].labels)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, batch_dir, True)
+
+    for e in entries:
+        labels = e["timer"].labels if "timer" in e else {"module": "", "team": team_slug}
+        file_type = Path(e["file"]).suffix.lower().lstrip(".") or "unknown"
+        if "sha256" in e:
+            BYTES_IN.inc(e["bytes"], file_type=file_type, **labels)
+        outcome = "ok" if "saved" in e else e.get("outcome", "rejected")
+        UPLOADS.inc(file_type=file_type, outcome=outcome, **labels)
+
+    await REBUILD.notify("upload", *(e["saved"] for e in entries if "saved" in e))
+
+    report = [
+        {k: v for k, v in e.items() if k not in ("path", "w", "timer", "outcome")}
+        for e in entries
+    ]
+    print(f"Batch upload for {team_slug}: {len(writes)}/{len(entries)} saved")
+    return JSONResponse({
+        "ok": all("error" not in e for e in entries),
+        "saved": len(writes),
+        "results": report,
+    })
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return JSONResponse(CACHE.stats())
+
+
+def preview_response(etag: str, body: str, media_type: str, cache_status: str) -> Response:
+    return Response(
+        body,
+        media_type=media_type,
+        headers={"ETag": f'"{etag}"', "Cache-Control": "no-cache", "X-Preview-Cache": cache_status},
+    )
 
-    # delete tmp
-    try:
-        tmp_name.unlink()
-    except Exception:
-        pass
 
-    # now add front-matter if missing
-    text = out_md.read_text(encoding="utf-8") if out_md.exists() else ""
-    if not text.lstrip().startswith("---"):
-        nice_week = f"Week {w:02d}"
-        nice_team = team_slug.replace("-", " ").title()
-        fm = f"""---
-id: {week_id}
-title: {nice_week} — {nice_team}
-sidebar_label: {nice_week}
----
+@app.post("/preview/")
+async def preview(
+    team: str = Form(...),
+    week: str = Form(...),
+    file: UploadFile = File(...),
+    format: str = Form("markdown"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Dry run of /upload/: same convert -> mdx_safe chain and
+    front-matter, but nothing is written under docs/ and no backup is made.
 
-"""
-        out_md.write_text(fm + text, encoding="utf-8")
+    format: "markdown" (default) or "html" (needs the `markdown` package).
+    The response carries an ETag; send it back as If-None-Match to get a
+    304, or fetch the cached body again with GET /preview/<etag>.
+    """
+    if format not in FORMATS:
+        raise HTTPException(400, f"format must be one of {sorted(FORMATS)}")
+    if format == "html" and not html_available():
+        raise HTTPException(501, "HTML previews need the `markdown` package (pip install markdown)")
+
+    team_slug = slug(team)
+    w = parse_week(week)
+    week_id = f"week{w}"
+    ext = Path(file.filename or "").suffix.lower()
+    if ext not in ALLOWED:
+        raise HTTPException(400, "Only .docx or .pdf allowed")
+
+    timer = StageTimer(module_for_week(w), team_slug)
+    async with ADMISSION.slot():
+        tmp_name = TMP / f"{uuid.uuid4().hex}{ext}"
+        with timer.stage("receive"):
+            received = await receive_upload(file, tmp_name)
+        try:
+            title_prefix = f"{team_slug} {week_id}"
+            key = CACHE.key(received.sha256, title_prefix)
+            etag = preview_etag(key, format)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": f'"{etag}"'})
+
+            cached = PREVIEWS.get(etag)
+            if cached is not None:
+                return preview_response(etag, *cached, "hit")
+
+            text, cache_status = await CACHE.get_or_convert(
+                key, lambda: convert_pipeline(tmp_name, week_id, title_prefix, timer)
+            )
+        finally:
+            await asyncio.to_thread(remove_quietly, tmp_name)
+
+    md = add_front_matter(text, w, week_id, team_slug)
+    body = await asyncio.to_thread(render_html, md) if format == "html" else md
+    PREVIEWS.put(etag, body, FORMATS[format])
+    return preview_response(etag, body, FORMATS[format], f"miss (conversion {cache_status})")
+
+
+@app.get("/preview/{etag}")
+async def preview_cached(etag: str, if_none_match: Optional[str] = Header(None)):
+    """A preview rendered earlier, by ETag (404 once it has been evicted)."""
+    # async: PREVIEWS is only touched from the event loop, never from threads
+    cached = PREVIEWS.get(etag)
+    if cached is None:
+        # whatever If-None-Match says: * only matches a body that exists
+        raise HTTPException(404, "Preview not cached (POST the file to /preview/ again)")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": f'"{etag}"'})
+    return preview_response(etag, *cached, "hit")
+
+
+@app.get("/docs/")
+def list_docs(
+    module: Optional[str] = None,
+    team: Optional[str] = None,
+    state: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Paginated listing from the in-memory catalog (no filesystem access)."""
+    if state is not None and state not in STATES:
+        raise HTTPException(400, f"state must be one of {list(STATES)}")
+    total, docs = CATALOG.list(module, team, state, offset, limit)
+    return JSONResponse({
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "items": [d._asdict() for d in docs],
+    })
+
+
+@app.get("/docs/{module}/{team}/status")
+def team_status(module: str, team: str):
+    """Per-week state (stub / uploaded / deleted) for one team in one module."""
+    status = CATALOG.team_status(module.lower(), team)
+    if not status["weeks"]:
+        raise HTTPException(404, f"No docs for {team} in {module}")
+    return JSONResponse(status)
+
+
+@app.get("/rebuild/status")
+def rebuild_status():
+    return JSONResponse(REBUILD.status())
+
+
+@app.post("/rebuild/")
+async def rebuild_now():
+    """Start a site build now (after the running one, if any), skipping the debounce."""
+    if not REBUILD.enabled:
+        raise HTTPException(409, "Rebuilds are disabled (REBUILD_CMD is empty)")
+    # async: the scheduler's asyncio.Event must be set from the event loop
+    await REBUILD.request_now()
+    return JSONResponse({"ok": True, "state": REBUILD.state})
 
-    rel = str(out_md.relative_to(BASE))
-    print("Saved converted markdown:", rel)
-    return JSONResponse({"ok": True, "saved": rel})
+
+@app.get("/admission/stats")
+def admission_stats():
+    return JSONResponse(ADMISSION.stats())
+
+
+def _admission_samples():
+    stats = ADMISSION.stats()
+    for field in ("limit", "max_queue", "running", "queued", "service_time_s", "retry_after_s"):
+        yield {"field": field}, stats[field]
+
+
+def _rejection_samples():
+    for reason, count in ADMISSION.stats()["rejected"].items():
+        yield {"reason": reason}, count
+
+
+def _pool_samples():
+    yield {"state": "queued"}, POOL.waiting
+    yield {"state": "busy"}, POOL.busy
+    yield {"state": "size"}, POOL.size
+
+
+def _cache_samples():
+    stats = CACHE.stats()
+    for field in ("entries", "bytes", "hits", "shared", "misses", "evictions", "hit_rate"):
+        yield {"field": field}, stats[field]
+
+
+def _preview_samples():
+    stats = PREVIEWS.stats()
+    for field in ("entries", "hits", "misses", "hit_rate"):
+        yield {"field": field}, stats[field]
+
+
+REGISTRY.callback(
+    "upload_admission",
+    "Admission control: slots in use, queue length, service-time estimate.",
+    _admission_samples,
+)
+REGISTRY.callback(
+    "upload_admission_rejected_total",
+    "Requests turned away by admission control (queue_full -> 429, queue_timeout -> 503).",
+    _rejection_samples,
+    kind="counter",
+)
+REGISTRY.callback(
+    "converter_pool_workers",
+    "Converter pool: callers queued for a worker, busy workers, pool size.",
+    _pool_samples,
+)
+REGISTRY.callback(
+    "conversion_cache",
+    "Conversion cache state (same numbers as /cache/stats).",
+    _cache_samples,
+)
+REGISTRY.callback(
+    "preview_cache",
+    "Rendered /preview/ bodies: entries, lookups by result, hit rate.",
+    _preview_samples,
+)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of the counters/histograms in metrics.py."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/delete/")
@@ -202,35 +752,20 @@ async def delete_doc(
         raise HTTPException(400, f"module must be one of {sorted(VALID_MODULES)}")
 
     team_slug = slug(team)
-    week_clean = week.lower().replace("week", "").replace("-", "").strip()
-    if not week_clean.isdigit():
-        raise HTTPException(400, "week must be like 'week5', '5', or 'week-05'")
-    w = int(week_clean)
+    w = parse_week(week)
     week_id = f"week{w}"
 
     md_path = DOCS_BASE / mod / team_slug / f"{week_id}.md"
-    if not md_path.exists():
-        raise HTTPException(404, f"No markdown found to delete at {md_path}")
-
-    trash_name = f"{mod}_{team_slug}_{week_id}_{uuid.uuid4().hex}.md"
-    trash_path = TRASH / trash_name
-    shutil.move(str(md_path), str(trash_path))
-    print(f"Moved {md_path} -> {trash_path}")
-
-    nice_week = week_id.replace("-", " ").title()
-    nice_team = team_slug.replace("-", " ").title()
-    stub = f"""---
-id: {week_id}
-title: {nice_week} — {nice_team}
-sidebar_label: {nice_week}
----
-
-_No document uploaded yet. Previous upload was deleted._
-
-[Upload documentation for this week](/upload?module={mod}&team={team_slug}&week={week_id})
-"""
-    md_path.parent.mkdir(parents=True, exist_ok=True)
-    md_path.write_text(stub, encoding="utf-8")
-    print("Wrote stub at", md_path)
-
-    return JSONResponse({"ok": True, "moved_to": str(trash_path.relative_to(BASE))})
\ No newline at end of file
+    timer = StageTimer(mod, team_slug)
+    async with DOC_LOCKS.hold((mod, team_slug, week_id)):
+        if not await asyncio.to_thread(md_path.exists):
+            DELETES.inc(outcome="not_found", **timer.labels)
+            raise HTTPException(404, f"No markdown found to delete at {md_path}")
+
+        with timer.stage("delete"):
+            trash_path = await asyncio.to_thread(move_to_trash_and_stub, md_path, mod, team_slug, week_id)
+        await asyncio.to_thread(CATALOG.update, md_path)
+    DELETES.inc(outcome="ok", **timer.labels)
+    await REBUILD.notify("delete", md_path.relative_to(BASE).as_posix())
+
+    return JSONResponse({"ok": True, "moved_to": trash_path.relative_to(BASE).as_posix()})
@@ -0,0 +1,410 @@
+# upload_service/worker_pool.py
+"""
+Warm converter worker pool for the upload service.
+
+Every pipeline stage used to be a fresh `python tools/<script>.py` process,
+so each upload paid interpreter startup + mammoth/pdfminer imports three or
+four times. Here a few long-lived worker processes import the tools once and
+then serve jobs over a pipe:
+
+    pool = ConverterPool(size=2, max_jobs=50)
+    pool.convert(in_path, out_md)          # convert_docx_to_md / convert_pdf_to_md -> JobStats
+    pool.mdx_safe(out_md)                  # mdx_safe.mdx_safe_file
+    pool.postprocess(out_md, "teama week1") # tools/postprocess.py; returns the text
+
+Workers are recycled after `max_jobs` jobs so slow leaks in the converters
+never pile up. A new worker says "ready" once its imports are done, and a
+job's timeout only starts after that, so a replacement worker's start-up
+is never counted against the job that runs on it.
+
+Every job runs sandboxed: a wall-clock timeout (the worker is killed and
+replaced when it expires), an address-space cap (RLIMIT_AS, set once per
+worker) and a per-job CPU budget (RLIMIT_CPU soft limit moved forward before
+each job). A worker that hit a limit is replaced as well. Each job reports
+its wall time, CPU time and peak RSS (JobStats).
+
+Config (env):
+    UPLOAD_POOL_SIZE         number of workers (default: min(4, cpu count));
+                             0 disables the pool (one subprocess per stage)
+    UPLOAD_POOL_MAX_JOBS     recycle a worker after this many jobs (default 50)
+    CONVERT_TIMEOUT_SECONDS  wall-clock limit per job (default 120; 0 = none)
+    CONVERT_MAX_MEMORY_MB    address-space cap per worker (default 2048; 0 = none)
+    CONVERT_MAX_CPU_SECONDS  CPU-time limit per job (default 120; 0 = none)
+"""
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: timeouts only
+    resource = None
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+
+POOL_SIZE = int(os.environ.get("UPLOAD_POOL_SIZE", min(4, os.cpu_count() or 1)))
+POOL_MAX_JOBS = int(os.environ.get("UPLOAD_POOL_MAX_JOBS", 50))
+JOB_TIMEOUT = float(os.environ.get("CONVERT_TIMEOUT_SECONDS", 120))
+MAX_MEMORY_MB = int(os.environ.get("CONVERT_MAX_MEMORY_MB", 2048))
+MAX_CPU_SECONDS = int(os.environ.get("CONVERT_MAX_CPU_SECONDS", 120))
+# a worker that has not finished its imports by then is replaced
+READY_TIMEOUT = 60
+# shutdown() waits this long for busy workers, then kills them
+SHUTDOWN_TIMEOUT = 10
+
+
+class JobStats(NamedTuple):
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_bytes: int
+
+
+class WorkerError(RuntimeError):
+    """A job failed inside a worker (or the worker died while running it)."""
+
+    code = "conversion_failed"
+
+    def __init__(self, message: str, stats: Optional[JobStats] = None):
+        super().__init__(message)
+        self.stats = stats
+
+
+class ConversionTimeout(WorkerError):
+    """The job ran past the wall-clock timeout; its worker was killed."""
+
+    code = "conversion_timeout"
+
+
+class MemoryLimitExceeded(WorkerError):
+    code = "conversion_memory_limit"
+
+
+class CpuLimitExceeded(WorkerError):
+    code = "conversion_cpu_limit"
+
+
+class _CpuBudgetSpent(BaseException):
+    """Raised by the SIGXCPU handler inside a worker (BaseException so the
+    converters' own `except Exception` blocks cannot swallow it)."""
+
+
+def _on_sigxcpu(signum, frame):
+    raise _CpuBudgetSpent()
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM, so the peak is per job
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _apply_memory_limit(max_memory_mb: int):
+    if resource is None or max_memory_mb <= 0:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = max_memory_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _set_cpu_budget(seconds: Optional[float]):
+    """Soft RLIMIT_CPU = CPU used so far + seconds (None: no limit)."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = hard if seconds is None else int(_cpu_seconds() + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def limit_child_process(max_memory_mb: int = MAX_MEMORY_MB, max_cpu_seconds: int = MAX_CPU_SECONDS):
+    """preexec_fn for one-shot tool subprocesses (pool disabled): same caps."""
+    _apply_memory_limit(max_memory_mb)
+    if resource is not None and max_cpu_seconds > 0:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_seconds, hard))
+
+
+def _worker_main(conn, tools_dir: str, max_memory_mb: int = 0, max_cpu_seconds: int = 0):
+    """Worker process: import the tools once, then serve (name, args) jobs."""
+    sys.path.insert(0, tools_dir)
+    import convert_docx_to_md
+    import convert_pdf_to_md
+    import mdx_safe
+    import postprocess
+
+    # limits go on after the imports so they only bound the jobs
+    _apply_memory_limit(max_memory_mb)
+    if resource is not None and max_cpu_seconds > 0:
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+
+    jobs = {
+        "convert_docx": convert_docx_to_md.convert_docx_to_md,
+        "convert_pdf": convert_pdf_to_md.convert_pdf_to_md,
+        "mdx_safe": mdx_safe.mdx_safe_file,
+        "postprocess": postprocess.postprocess_markdown,
+    }
+    conn.send(("ready",))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        name, args = msg
+        t0 = time.perf_counter()
+        cpu0 = _cpu_seconds() if resource is not None else 0.0
+        _reset_peak_rss()
+        if max_cpu_seconds > 0:
+            _set_cpu_budget(max_cpu_seconds)
+        try:
+            result = jobs[name](*args)
+            reply = ("ok", result)
+        except MemoryError:
+            reply = ("memory", f"exceeded the {max_memory_mb} MB memory cap", "")
+        except _CpuBudgetSpent:
+            reply = ("cpu", f"exceeded the {max_cpu_seconds}s CPU limit", "")
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}", traceback.format_exc())
+        finally:
+            if max_cpu_seconds > 0:
+                _set_cpu_budget(None)
+        stats = JobStats(
+            wall_seconds=time.perf_counter() - t0,
+            cpu_seconds=(_cpu_seconds() - cpu0) if resource is not None else 0.0,
+            peak_rss_bytes=_peak_rss(),
+        )
+        conn.send(reply + (stats,))
+
+
+class _Worker:
+    def __init__(self, ctx, max_memory_mb: int = 0, max_cpu_seconds: int = 0):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_worker_main,
+            args=(child, str(TOOLS), max_memory_mb, max_cpu_seconds),
+            daemon=True,
+        )
+        self.proc.start()
+        child.close()
+        self.jobs = 0
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Wait for the worker's "ready"; False if it died or is not ready within `timeout` seconds."""
+        if not self.ready:
+            try:
+                self.ready = self.conn.poll(timeout) and self.conn.recv() == ("ready",)
+            except (EOFError, OSError):
+                return False
+        return self.ready
+
+    def call(self, name: str, args: tuple, timeout: Optional[float] = None):
+        """Send one job; None if no reply arrived within `timeout` seconds."""
+        self.conn.send((name, args))
+        if timeout and not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+
+class ConverterPool:
+    """Fixed-size pool of warm converter processes (thread-safe, blocking API)."""
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        max_jobs: int = POOL_MAX_JOBS,
+        timeout: float = JOB_TIMEOUT,
+        max_memory_mb: int = MAX_MEMORY_MB,
+        max_cpu_seconds: int = MAX_CPU_SECONDS,
+    ):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_cpu_seconds = max_cpu_seconds
+        self._ctx = mp.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = set()  # every live worker, idle or busy
+        self._lock = threading.RLock()
+        self._started = False
+        self.waiting = 0  # callers queued for an idle worker
+
+    @property
+    def busy(self) -> int:
+        return self.size - self._idle.qsize() if self._started else 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._new_worker())
+            self._started = True
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Stop every worker; ones still busy after `timeout` seconds are killed (their jobs fail)."""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+        deadline = time.monotonic() + timeout
+        while self._workers and time.monotonic() < deadline:
+            try:
+                worker = self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._drop(worker)
+            worker.stop()
+        with self._lock:
+            stragglers = list(self._workers)
+            self._workers.clear()
+        for worker in stragglers:
+            print(f"[pool] worker {worker.proc.pid} still busy after {timeout:g}s, killed")
+            worker.stop(timeout=0)
+
+    def _new_worker(self) -> _Worker:
+        worker = _Worker(self._ctx, self.max_memory_mb, self.max_cpu_seconds)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _drop(self, worker: _Worker):
+        with self._lock:
+            self._workers.discard(worker)
+
+    def _replace(self, worker: _Worker, timeout: float = 5.0) -> Optional[_Worker]:
+        """Stop `worker` and start its successor (None once the pool is shut down)."""
+        self._drop(worker)
+        worker.stop(timeout)
+        return self._new_worker() if self._started else None
+
+    def call(self, name: str, *args):
+        """Run job `name` on an idle worker and return its result."""
+        return self.call_with_stats(name, *args)[0]
+
+    def call_with_stats(self, name: str, *args):
+        """Like call(), but returns (result, JobStats)."""
+        self.start()
+        with self._lock:
+            self.waiting += 1
+        try:
+            worker = self._idle.get()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        try:
+            if not worker.wait_ready(READY_TIMEOUT):
+                old, worker = worker, self._replace(worker, timeout=0)
+                exitcode = old.proc.exitcode
+                raise WorkerError(f"worker did not start for {name} (exit code {exitcode})", JobStats(0.0, 0.0, 0))
+            # the timeout covers the job only, not the worker's start-up
+            started = time.perf_counter()
+            try:
+                reply = worker.call(name, args, self.timeout)
+            except (EOFError, OSError):
+                # worker died mid-job: replace it and report the failure
+                old, worker = worker, self._replace(worker, timeout=1)
+                exitcode = old.proc.exitcode
+                stats = JobStats(time.perf_counter() - started, 0.0, 0)
+                msg = f"worker crashed while running {name} (exit code {exitcode})"
+                # with a memory cap, SIGABRT / SIGSEGV (allocation failed
+                # outside Python code) or SIGKILL (OOM killer) mean it ran
+                # out of memory
+                if self.max_memory_mb > 0 and exitcode in (-signal.SIGABRT, -signal.SIGKILL, -signal.SIGSEGV):
+                    raise MemoryLimitExceeded(msg, stats)
+                raise WorkerError(msg, stats)
+
+            if reply is None:
+                # stuck (e.g. pdfminer layout analysis): kill, replace, fail
+                worker = self._replace(worker, timeout=0)
+                stats = JobStats(time.perf_counter() - started, 0.0, 0)
+                raise ConversionTimeout(f"{name} timed out after {self.timeout:g}s", stats)
+
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs or reply[0] in ("memory", "cpu"):
+                worker = self._replace(worker)
+        finally:
+            with self._lock:
+                # not tracked any more: shutdown() gave up on it and killed it
+                keep = worker in self._workers
+            if keep:
+                self._idle.put(worker)
+            elif worker is not None:
+                worker.stop(timeout=0)
+
+        status, stats = reply[0], reply[-1]
+        if status == "memory":
+            raise MemoryLimitExceeded(f"{name} {reply[1]}", stats)
+        if status == "cpu":
+            raise CpuLimitExceeded(f"{name} {reply[1]}", stats)
+        if status == "error":
+            print(reply[2])
+            raise WorkerError(reply[1], stats)
+        return reply[1], stats
+
+    # ---- convenience wrappers (one per pipeline stage) ----
+
+    def convert(self, in_path: Path, out_path: Path) -> JobStats:
+        """DOCX/PDF -> markdown (no front-matter); returns the job's resource use."""
+        suffix = Path(in_path).suffix.lower()
+        if suffix == ".docx":
+            return self.call_with_stats("convert_docx", str(in_path), str(out_path))[1]
+        if suffix == ".pdf":
+            return self.call_with_stats("convert_pdf", str(in_path), str(out_path))[1]
+        raise ValueError(f"Unsupported file type: {suffix}")
+
+    def mdx_safe(self, md_path: Path) -> bool:
+        return self.call("mdx_safe", Path(md_path))
+
+    def postprocess(self, md_path: Path, label: str) -> str:
+        """The upload post-processing in one read / parse; returns the markdown."""
+        return self.call("postprocess", Path(md_path), label)